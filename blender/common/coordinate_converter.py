@@ -3,6 +3,8 @@ from math import tan, atan, pi
 from mathutils import Matrix, Quaternion, Euler, Vector
 from typing import Tuple, List
 
+from . import keyframe_converter
+
 
 def pos_cm_to_m(pos: Tuple[float, float, float]) -> Vector:
     # From centimeter to meter
@@ -72,31 +74,9 @@ def frame_from_blender(frame):
     return frame * 100
 
 def transform_location_to_blender(original_coords: Matrix, original_parent_coords: Vector, values: List[Vector], parent_exist: bool):
+    return list(map(Vector, keyframe_converter.transform_location_to_blender(
+        original_coords, original_parent_coords, values, parent_exist)))
 
-    head = original_coords
-
-    parent_head = Vector()
-    if parent_exist:
-        parent_head = original_parent_coords
-
-    loc,rot,sca = head.decompose()
-
-    pre_mat = (
-        Matrix.Translation(loc).inverted()
-        @ rot.to_matrix().to_4x4().inverted()
-    )
-
-    post_mat = (
-        rot.to_matrix().to_4x4()
-        @ Matrix.Translation(loc)
-    )
-
-    values = list(map(lambda x: (pre_mat @ Matrix.Translation(pos_cm_to_m(x) - loc + parent_head) @ post_mat).to_translation(), values))
-
-    return values
 
 def transform_rotation_to_blender(rot: Quaternion, values: List[Quaternion]):
-
-    values = list(map(lambda x: rot @ Quaternion([x[3],x[0],x[1],x[2]]).inverted(), values))
-
-    return values
\ No newline at end of file
+    return list(map(Quaternion, keyframe_converter.transform_rotation_to_blender(rot, values)))
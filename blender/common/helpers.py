@@ -2,6 +2,7 @@ import array
 import struct
 
 import bpy
+import numpy as np
 
 XFBIN_TEXTURES_OBJ = '#XFBIN Textures'
 XFBIN_ANMS_OBJ = '#XFBIN Animations'
@@ -25,3 +26,11 @@ def format_hex_str(value: str, size: int):
         pass
     else:
         return int_to_hex_str(val, size)
+
+
+def foreach_get_array(collection, attribute: str, dtype, *shape: int) -> np.ndarray:
+    """Returns an attribute of every item of a bpy collection as an array with a row of the given shape for each item."""
+    array = np.empty(len(collection) * int(np.prod(shape, dtype=np.int64)), dtype)
+    collection.foreach_get(attribute, array)
+
+    return array.reshape(-1, *shape)
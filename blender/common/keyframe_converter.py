@@ -0,0 +1,157 @@
+"""Array versions of the coordinate conversions used for importing animations.
+
+Frames and values are NumPy arrays with a row for each keyframe, and quaternions are stored as (w, x, y, z) like mathutils.
+This module does not depend on Blender, so it can be used (and tested) outside of it.
+"""
+
+import numpy as np
+
+# Sensor width used for converting the camera's field of view to Blender's focal length
+CAMERA_SENSOR_WIDTH = 36.0
+
+
+def frames_to_blender(frames) -> np.ndarray:
+    return np.asarray(frames, np.float64) * 0.01
+
+
+def pos_cm_to_m_array(values) -> np.ndarray:
+    # From centimeter to meter
+    return np.asarray(values, np.float64) * 0.01
+
+
+def focal_to_blender_array(fov, sensor_width: float = CAMERA_SENSOR_WIDTH) -> np.ndarray:
+    return (sensor_width / 2) / np.tan(np.radians(fov) / 2)
+
+
+def quat_multiply(a, b) -> np.ndarray:
+    """Multiplies two arrays of quaternions (or a quaternion and an array of quaternions) element-wise."""
+    a, b = np.asarray(a, np.float64), np.asarray(b, np.float64)
+
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+
+    return np.stack((aw * bw - ax * bx - ay * by - az * bz,
+                     aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw), axis=-1)
+
+
+def quat_inverted(q) -> np.ndarray:
+    q = np.asarray(q, np.float64)
+    return q * np.array((1, -1, -1, -1)) / (q * q).sum(axis=-1, keepdims=True)
+
+
+def quat_normalized(q) -> np.ndarray:
+    q = np.asarray(q, np.float64)
+    length = np.sqrt((q * q).sum(axis=-1, keepdims=True))
+
+    return np.divide(q, length, out=np.array(np.broadcast_to((1.0, 0.0, 0.0, 0.0), q.shape)), where=length != 0)
+
+
+def quat_rotation_difference(q1, q2) -> np.ndarray:
+    """Returns the rotation from q1 to q2, same as mathutils' Quaternion.rotation_difference."""
+    return quat_multiply(quat_inverted(quat_normalized(q1)), quat_normalized(q2))
+
+
+def quat_rotate_vectors(q, vectors) -> np.ndarray:
+    """Rotates an array of vectors by a (normalized) quaternion, same as mathutils' Vector.rotate."""
+    return np.asarray(vectors, np.float64) @ quat_to_matrix(q).T
+
+
+def quat_to_matrix(q) -> np.ndarray:
+    w, x, y, z = quat_normalized(q)
+
+    return np.array(((1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)),
+                     (2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)),
+                     (2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y))))
+
+
+def euler_zyx_to_quaternion(eulers) -> np.ndarray:
+    """Converts an array of (x, y, z) euler angles in radians with ZYX order into quaternions,
+    same as mathutils' Euler(angles, 'ZYX').to_quaternion().
+    """
+    eulers = np.asarray(eulers, np.float64)
+    half_cos = np.cos(eulers / 2)
+    half_sin = np.sin(eulers / 2)
+
+    zeros = np.zeros(len(eulers))
+    qx = np.stack((half_cos[:, 0], half_sin[:, 0], zeros, zeros), axis=-1)
+    qy = np.stack((half_cos[:, 1], zeros, half_sin[:, 1], zeros), axis=-1)
+    qz = np.stack((half_cos[:, 2], zeros, zeros, half_sin[:, 2]), axis=-1)
+
+    # Z is applied first, then Y, then X
+    return quat_multiply(quat_multiply(qx, qy), qz)
+
+
+def anm_quat_to_blender(values) -> np.ndarray:
+    # ANM quaternions are stored as (x, y, z, w)
+    values = np.asarray(values, np.float64)
+    return values[:, (3, 0, 1, 2)]
+
+
+def decompose_matrix(matrix):
+    """Returns the location, rotation matrix and scale of a 4x4 matrix, same as mathutils' Matrix.decompose (but without converting the rotation)."""
+    matrix = np.asarray(matrix, np.float64)
+
+    loc = matrix[:3, 3].copy()
+    sca = np.linalg.norm(matrix[:3, :3], axis=0)
+
+    if np.linalg.det(matrix[:3, :3]) < 0:
+        sca = -sca
+
+    return loc, matrix[:3, :3] / sca, sca
+
+
+def transform_location_to_blender(original_coords, original_parent_coords, values, parent_exist: bool) -> np.ndarray:
+    """Array version of coordinate_converter.transform_location_to_blender, where original_coords is a 4x4 matrix."""
+    loc, rot, _ = decompose_matrix(original_coords)
+
+    parent_head = np.asarray(original_parent_coords, np.float64) if parent_exist else np.zeros(3)
+
+    # Moving to the bone's space and back only leaves the inverse rotation of the offset
+    return (pos_cm_to_m_array(values) - loc + parent_head) @ rot
+
+
+def transform_rotation_to_blender(rot, values) -> np.ndarray:
+    """Array version of coordinate_converter.transform_rotation_to_blender."""
+    return quat_multiply(rot, quat_inverted(anm_quat_to_blender(values)))
+
+
+def convert_anm_values(data_path: str, values) -> np.ndarray:
+    """Converts the values of a camera or light curve to Blender's units."""
+    values = np.asarray(values)
+
+    if data_path == 'location':
+        return pos_cm_to_m_array(values)
+    if data_path == 'rotation_euler':
+        return np.radians(values.astype(np.float64))
+    if data_path == 'rotation_quaternion':
+        return quat_inverted(anm_quat_to_blender(values))
+    if data_path == 'scale':
+        return np.abs(values.astype(np.float64))
+    if data_path == 'data.lens':
+        # The first value is the frame (see anm.create_curve_arrays)
+        return focal_to_blender_array(values[:, 1:2].astype(np.float64))
+
+    return values
+
+
+def convert_anm_values_transformed(data_path: str, values, loc, rot, sca) -> np.ndarray:
+    """Converts the values of a bone curve to Blender's units, relative to the bone's rest location, rotation (as a quaternion) and scale."""
+    values = np.asarray(values)
+    rot = np.asarray(rot, np.float64)
+
+    if data_path == 'location':
+        inverse_rot = quat_inverted(quat_normalized(rot))
+        return quat_rotate_vectors(inverse_rot, pos_cm_to_m_array(values) - np.asarray(loc, np.float64))
+
+    if data_path == 'rotation_euler':
+        return quat_rotation_difference(rot, euler_zyx_to_quaternion(np.radians(values.astype(np.float64))))
+
+    if data_path == 'rotation_quaternion':
+        return quat_rotation_difference(rot, quat_inverted(anm_quat_to_blender(values)))
+
+    if data_path == 'scale':
+        return np.abs(values.astype(np.float64) / np.asarray(sca, np.float64))
+
+    return values
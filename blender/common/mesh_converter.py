@@ -0,0 +1,432 @@
+"""Array versions of the mesh conversions used for importing and exporting NUD meshes.
+
+Attributes are NumPy arrays with a row for each vertex or loop of the Blender mesh, as used by foreach_get and foreach_set.
+This module does not depend on Blender, so it can be used (and tested) outside of it.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Number of bones that can deform each NUD vertex
+MAX_VERTEX_BONES = 4
+
+
+def positions_from_blender(co, matrix) -> np.ndarray:
+    """Converts vertex coordinates to centimeters after multiplying them by a 4x4 matrix as row vectors,
+    same as coordinate_converter.pos_scaled_from_blender(co @ matrix).
+    """
+    co = np.asarray(co, np.float64).reshape(-1, 3)
+    matrix = np.asarray(matrix, np.float64)
+
+    return ((co @ matrix[:3, :3] + matrix[3, :3]) * 100).astype(np.float32)
+
+
+def uvs_from_blender(uvs) -> np.ndarray:
+    uvs = np.array(uvs, np.float32)
+    uvs[..., 1] = 1.0 - uvs[..., 1]
+
+    return uvs
+
+
+def colors_from_blender(colors) -> np.ndarray:
+    # Same as int(c * 255) for each channel
+    return (np.asarray(colors, np.float32) * 255).astype(np.int32)
+
+
+def bitangents_from_tangents(normals, tangents, bitangent_signs) -> np.ndarray:
+    return np.cross(normals, tangents) * np.asarray(bitangent_signs, np.float32).reshape(-1, 1)
+
+
+def select_bone_weights(vertex_indices, group_indices, weights, vertex_count: int, group_bones,
+                        max_bones: int = MAX_VERTEX_BONES) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the bone IDs and weights of the (up to) max_bones most deforming bones of each vertex, in descending
+    order of weight and normalized so they sum to 1.\n
+    vertex_indices, group_indices and weights have an item for each vertex group a vertex is in, and group_bones has the
+    bone ID of each vertex group (or -1 for groups that are not bones, which are ignored).\n
+    Vertices that are not in any bone group get bone 0 with the weights (0, 0, 0, 1).
+    """
+    group_bones = np.asarray(group_bones, np.int64)
+    vertex_indices = np.asarray(vertex_indices, np.int64)
+    group_indices = np.asarray(group_indices, np.int64)
+    weights = np.asarray(weights, np.float32)
+
+    bones = group_bones[group_indices] if len(group_indices) else np.zeros(0, np.int64)
+    valid = bones >= 0
+
+    # Only use a column for each bone that any of the vertices has
+    used_bones, columns = np.unique(bones[valid], return_inverse=True)
+    width = max(len(used_bones), max_bones)
+
+    dense = np.zeros((vertex_count, width), np.float32)
+    dense[vertex_indices[valid], columns.ravel()] = weights[valid]
+
+    column_bones = np.zeros(width, np.int64)
+    column_bones[:len(used_bones)] = used_bones
+
+    if width > max_bones:
+        top = np.argpartition(-dense, max_bones - 1, axis=1)[:, :max_bones]
+    else:
+        top = np.broadcast_to(np.arange(width), (vertex_count, width))
+
+    # Sort the selected bones by their weights
+    top_weights = np.take_along_axis(dense, top, axis=1)
+    order = np.argsort(-top_weights, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_weights = np.take_along_axis(top_weights, order, axis=1)
+
+    bone_ids = np.where(top_weights > 0, column_bones[top], 0)
+
+    weight_sums = top_weights.sum(axis=1, keepdims=True)
+    bone_weights = np.divide(top_weights, weight_sums, out=np.zeros_like(top_weights), where=weight_sums > 0)
+
+    # Unweighted vertices are fully deformed by the first bone
+    bone_weights[weight_sums[:, 0] <= 0, -1] = 1.0
+
+    return bone_ids, bone_weights
+
+
+def deduplicate_rows(columns: Iterable[Optional[np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Finds the unique rows of a set of arrays with the same number of rows (None arrays are skipped).\n
+    Returns the index of the first occurrence of each unique row, in order of first occurrence, and the index of the
+    unique row of each row.
+    """
+    columns = [np.asarray(c, np.float32).reshape(len(c), -1) for c in columns if c is not None]
+
+    # Adding zero turns -0.0 into 0.0, so that both are packed to the same bytes
+    rows = np.ascontiguousarray(np.concatenate(columns, axis=1)) + np.float32(0)
+    packed = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+
+    _, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+
+    return number_by_first_occurrence(first, inverse)
+
+
+def number_by_first_occurrence(first: np.ndarray, inverse: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Renumbers the unique values returned by np.unique (which are sorted) in order of their first occurrence.\n
+    Returns the index of the first occurrence of each unique value, in order of first occurrence, and the new number of
+    the unique value of each item.
+    """
+    order = np.argsort(first)
+    numbers = np.empty_like(order)
+    numbers[order] = np.arange(len(order))
+
+    return first[order], numbers[inverse.ravel()]
+
+
+def make_mesh_arrays(triangle_loops, loop_vertices, positions, normals=None, tangents=None, bitangents=None,
+                     colors=None, uvs=None, bone_ids=None, bone_weights=None) -> Tuple[Dict[str, Optional[np.ndarray]], np.ndarray]:
+    """Creates the vertex arrays (see NudMesh.set_vertex_arrays) and faces of a NUD mesh from the triangles of a mesh.\n
+    triangle_loops has the 3 loop indices of each triangle, and loop_vertices has the vertex index of each loop.
+    positions, bone_ids and bone_weights have a row for each vertex, while the rest of the attributes (which can be None)
+    have a row for each loop (uvs has a row of (channel count, 2) UVs).\n
+    Loops of the triangles that have the same attributes become a single vertex, in order of their first use.
+    """
+    loops = np.asarray(triangle_loops, np.int64).ravel()
+    vertices = np.asarray(loop_vertices, np.int64)[loops]
+
+    def loop_attribute(array, dtype) -> Optional[np.ndarray]:
+        return np.asarray(array, dtype)[loops] if array is not None else None
+
+    def vertex_attribute(array, dtype) -> Optional[np.ndarray]:
+        return np.asarray(array, dtype)[vertices] if array is not None else None
+
+    arrays = {
+        'position': vertex_attribute(positions, np.float32),
+        'normal': loop_attribute(normals, np.float32),
+        'bitangent': loop_attribute(bitangents, np.float32),
+        'tangent': loop_attribute(tangents, np.float32),
+        'color': loop_attribute(colors, np.int32),
+        'uv': loop_attribute(uvs, np.float32),
+        'bone_ids': vertex_attribute(bone_ids, np.int64),
+        'bone_weights': vertex_attribute(bone_weights, np.float32),
+    }
+
+    if arrays['uv'] is not None and arrays['uv'].shape[1] == 0:
+        arrays['uv'] = None
+
+    first, indices = deduplicate_rows(arrays.values())
+
+    return ({name: (array[first] if array is not None else None) for (name, array) in arrays.items()},
+            indices.reshape(-1, 3))
+
+
+def cluster_triangles(faces, positions, max_vertices: int, max_faces: int) -> List[np.ndarray]:
+    """Splits a set of triangles into clusters that each use at most max_vertices vertices and have at most max_faces
+    triangles, and returns the triangle indices of each cluster.\n
+    Each cluster is grown breadth first from a seed triangle through the triangles that share a vertex with it, so
+    clusters are connected patches that reuse their vertices as much as possible. Seeds are taken in order of the
+    triangle centers along the longest axis of the mesh, so clusters that run out of connected triangles continue with
+    the nearest unassigned ones.
+    """
+    if max_vertices < 3 or max_faces < 1:
+        raise ValueError(f'Clusters must have room for at least 1 triangle (got {max_vertices} vertices and {max_faces} faces)')
+
+    faces = np.asarray(faces, np.int64).reshape(-1, 3)
+    positions = np.asarray(positions, np.float32)
+    triangle_count = len(faces)
+
+    if triangle_count == 0:
+        return list()
+
+    centers = positions[faces].mean(axis=1)
+    axis = int(np.argmax(np.ptp(centers, axis=0)))
+    seed_order = np.argsort(centers[:, axis], kind='stable').tolist()
+
+    # Triangles that use each vertex, as offsets into a list of triangle indices sorted by vertex
+    corners = faces.ravel()
+    offsets = np.zeros(len(positions) + 1, np.int64)
+    np.cumsum(np.bincount(corners, minlength=len(positions)), out=offsets[1:])
+    offsets = offsets.tolist()
+    vertex_triangles = (np.argsort(corners, kind='stable') // 3).tolist()
+
+    face_list = faces.tolist()
+    assigned = [False] * triangle_count
+    vertex_cluster = [-1] * len(positions)
+
+    clusters = list()
+    seed_index = 0
+
+    while seed_index < triangle_count:
+        cluster = len(clusters)
+        triangles = list()
+        vertex_count = 0
+        queue = deque()
+
+        while len(triangles) < max_faces:
+            if not queue:
+                # Continue from the next seed, unless the cluster does not have room for it
+                while seed_index < triangle_count and assigned[seed_order[seed_index]]:
+                    seed_index += 1
+
+                if seed_index == triangle_count:
+                    break
+
+                seed = seed_order[seed_index]
+                if vertex_count + sum(vertex_cluster[v] != cluster for v in set(face_list[seed])) > max_vertices:
+                    break
+
+                queue.append(seed)
+
+            triangle = queue.popleft()
+            if assigned[triangle]:
+                continue
+
+            face = face_list[triangle]
+            new_vertices = {v for v in face if vertex_cluster[v] != cluster}
+
+            # Leave triangles that do not fit for another cluster
+            if vertex_count + len(new_vertices) > max_vertices:
+                continue
+
+            assigned[triangle] = True
+            triangles.append(triangle)
+
+            vertex_count += len(new_vertices)
+            for v in new_vertices:
+                vertex_cluster[v] = cluster
+
+            for v in face:
+                queue.extend(t for t in vertex_triangles[offsets[v]:offsets[v + 1]] if not assigned[t])
+
+        if triangles:
+            clusters.append(np.array(triangles, np.int64))
+
+    return clusters
+
+
+def compact_mesh_arrays(arrays: Dict[str, Optional[np.ndarray]], faces) -> Tuple[Dict[str, Optional[np.ndarray]], np.ndarray]:
+    """Returns the vertex arrays with only the vertices used by the faces, in order of their first use, and the faces
+    with the new vertex indices.
+    """
+    faces = np.asarray(faces, np.int64).reshape(-1, 3)
+
+    used, first, inverse = np.unique(faces.ravel(), return_index=True, return_inverse=True)
+    _, indices = number_by_first_occurrence(first, inverse)
+    vertices = used[np.argsort(first)]
+
+    return ({name: (array[vertices] if array is not None else None) for (name, array) in arrays.items()},
+            indices.reshape(-1, 3))
+
+
+def split_mesh_arrays(arrays: Dict[str, Optional[np.ndarray]], faces, max_vertices: int,
+                      max_faces: int) -> List[Tuple[Dict[str, Optional[np.ndarray]], np.ndarray]]:
+    """Splits the vertex arrays and faces of a mesh into meshes that have at most max_vertices vertices and max_faces
+    faces (see cluster_triangles). Meshes that are within the limits are returned as they are.
+    """
+    faces = np.asarray(faces).reshape(-1, 3)
+
+    if len(arrays['position']) <= max_vertices and len(faces) <= max_faces:
+        return [(arrays, faces)]
+
+    return [compact_mesh_arrays(arrays, faces[triangles])
+            for triangles in cluster_triangles(faces, arrays['position'], max_vertices, max_faces)]
+
+
+def positions_to_blender(positions) -> np.ndarray:
+    # From centimeters to meters, same as coordinate_converter.pos_scaled_to_blender
+    return np.asarray(positions, np.float32).reshape(-1, 3) * np.float32(0.01)
+
+
+def uvs_to_blender(uvs) -> np.ndarray:
+    uvs = np.array(uvs, np.float32)
+    uvs[..., 1] = 1.0 - uvs[..., 1]
+
+    return uvs
+
+
+def colors_to_blender(colors) -> np.ndarray:
+    return np.asarray(colors, np.float32) / np.float32(255)
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Normalizes each row of an array, leaving rows with a length of 0 as they are (same as Vector.normalized)."""
+    vectors = np.asarray(vectors, np.float32)
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return np.divide(vectors, lengths, out=np.zeros_like(vectors), where=lengths > 0)
+
+
+def make_blender_mesh_arrays(meshes: Sequence[Tuple[Dict[str, Optional[np.ndarray]], np.ndarray]],
+                             material_indices: Sequence[int]) -> Dict[str, np.ndarray]:
+    """Combines the vertex arrays (see NudMesh.get_vertex_arrays) and faces of NUD meshes into the arrays of a single
+    Blender mesh, with the vertices of each mesh after the ones of the previous meshes.\n
+    Triangles that are degenerate, use vertices that do not exist, or use the same vertices as a previous triangle are
+    skipped, same as when adding them to a bmesh. Returns a dictionary of:
+        position        (v, 3) vertex coordinates in meters
+        normal          (v, 3) normalized vertex normals (0 for meshes without normals)
+        faces           (f, 3) vertex indices of the triangles
+        material_index  (f) material index of each triangle, from material_indices
+        color           (f * 3, 4) loop colors from 0 to 1 (white for meshes without colors)
+        uv              (f * 3, uv channel count, 2) loop UVs (0 for channels that a mesh does not have)
+        vertex_offsets  (len(meshes) + 1) index of the first vertex of each mesh, and the total number of vertices
+    """
+    vertex_counts = [len(arrays['position']) for (arrays, _) in meshes]
+    vertex_offsets = np.zeros(len(meshes) + 1, np.int64)
+    np.cumsum(vertex_counts, out=vertex_offsets[1:])
+    vertex_count = int(vertex_offsets[-1])
+
+    uv_count = max([arrays['uv'].shape[1] for (arrays, _) in meshes if arrays['uv'] is not None], default=0)
+
+    positions = np.zeros((vertex_count, 3), np.float32)
+    normals = np.zeros((vertex_count, 3), np.float32)
+    colors = np.ones((vertex_count, 4), np.float32)
+    uvs = np.zeros((vertex_count, uv_count, 2), np.float32)
+
+    all_faces = list()
+    all_materials = list()
+
+    for (arrays, faces), start, count, material_index in zip(meshes, vertex_offsets.tolist(), vertex_counts, material_indices):
+        vertices = slice(start, start + count)
+
+        positions[vertices] = positions_to_blender(arrays['position'])
+        if arrays['normal'] is not None:
+            normals[vertices] = normalize_rows(arrays['normal'])
+        if arrays['color'] is not None:
+            colors[vertices] = colors_to_blender(arrays['color'])
+        if arrays['uv'] is not None:
+            uvs[vertices, :arrays['uv'].shape[1]] = uvs_to_blender(arrays['uv'])
+
+        faces = np.asarray(faces, np.int64).reshape(-1, 3)
+        valid = (faces < count).all(axis=1) & (faces[:, 0] != faces[:, 1]) & \
+            (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+
+        all_faces.append(faces[valid] + start)
+        all_materials.append(np.full(np.count_nonzero(valid), material_index, np.int32))
+
+    faces = np.concatenate(all_faces) if all_faces else np.zeros((0, 3), np.int64)
+    materials = np.concatenate(all_materials) if all_materials else np.zeros(0, np.int32)
+
+    # Keep the first triangle of each set of vertices, in their original order
+    if len(faces):
+        _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+        first.sort()
+        faces = faces[first]
+        materials = materials[first]
+
+    loop_vertices = faces.ravel()
+
+    return {
+        'position': positions,
+        'normal': normals,
+        'faces': faces,
+        'material_index': materials,
+        'color': colors[loop_vertices],
+        'uv': uvs[loop_vertices],
+        'vertex_offsets': vertex_offsets,
+    }
+
+
+def make_vertex_group_weights(meshes: Sequence[Dict[str, Optional[np.ndarray]]], bone_groups,
+                              default_groups: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the vertex indices, vertex group indices and weights of the vertices of NUD meshes (see
+    make_blender_mesh_arrays for the vertex indices).\n
+    bone_groups has the vertex group index of each bone ID, and the vertices of meshes without bone weights are fully
+    weighted to the vertex group in default_groups. Bones with a weight of 0 and negative vertex group indices are
+    skipped, and if a vertex has the same vertex group more than once, the last weight is kept.
+    """
+    bone_groups = np.asarray(bone_groups, np.int64)
+
+    all_vertices = list()
+    all_groups = list()
+    all_weights = list()
+    start = 0
+
+    for arrays, default_group in zip(meshes, default_groups):
+        count = len(arrays['position'])
+        vertices = np.arange(start, start + count)
+        start += count
+
+        if arrays['bone_weights'] is None:
+            all_vertices.append(vertices)
+            all_groups.append(np.full(count, default_group, np.int64))
+            all_weights.append(np.ones(count, np.float32))
+            continue
+
+        weights = np.asarray(arrays['bone_weights'], np.float32)
+        weighted = weights > 0
+
+        all_vertices.append(np.broadcast_to(vertices[:, None], weights.shape)[weighted])
+        all_groups.append(bone_groups[np.asarray(arrays['bone_ids'], np.int64)[weighted]])
+        all_weights.append(weights[weighted])
+
+    if not all_vertices:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32)
+
+    vertices = np.concatenate(all_vertices)
+    groups = np.concatenate(all_groups)
+    weights = np.concatenate(all_weights)
+
+    valid = groups >= 0
+    vertices, groups, weights = vertices[valid], groups[valid], weights[valid]
+
+    # Keep the last weight of each vertex and group, by keeping the first one in reverse order
+    keys = vertices * (int(groups.max(initial=0)) + 1) + groups
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = np.sort(len(keys) - 1 - last)
+
+    return vertices[last], groups[last], weights[last]
+
+
+def iter_vertex_group_weights(vertices, groups, weights) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """Yields each vertex group index and weight in the given vertex weights, along with the vertex indices that have
+    that weight in that group. Used for adding the weights to Blender vertex groups with as few calls as possible.
+    """
+    vertices = np.asarray(vertices, np.int64)
+    groups = np.asarray(groups, np.int64)
+    weights = np.asarray(weights, np.float32)
+
+    if len(vertices) == 0:
+        return
+
+    order = np.lexsort((vertices, weights, groups))
+    groups = groups[order]
+    weights = weights[order]
+    vertices = vertices[order]
+
+    starts = np.flatnonzero(np.concatenate(([True], (groups[1:] != groups[:-1]) | (weights[1:] != weights[:-1]))))
+    ends = np.append(starts[1:], len(order))
+
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield int(groups[start]), float(weights[start]), vertices[start:end]
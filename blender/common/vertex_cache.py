@@ -0,0 +1,139 @@
+"""Post-transform vertex cache optimization of triangle meshes, using the Tipsify algorithm from
+"Fast Triangle Reordering for Vertex Locality and Reduced Overdraw" (Sander, Nehab and Barczak, 2007).
+
+Meshes are given as vertex arrays (see NudMesh.get_vertex_arrays) and (n, 3) arrays of triangle vertex indices.
+This module does not depend on Blender, so it can be used (and tested) outside of it.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .mesh_converter import compact_mesh_arrays
+
+# Size of the simulated FIFO vertex cache
+DEFAULT_CACHE_SIZE = 16
+
+
+def count_cache_misses(faces, cache_size: int = DEFAULT_CACHE_SIZE) -> int:
+    """Returns the number of vertices that are transformed when drawing the triangles with a FIFO vertex cache."""
+    cache_times = dict()
+    time = 0
+
+    for v in np.asarray(faces).ravel().tolist():
+        # A vertex is still cached if fewer than cache_size vertices were added to the cache after it
+        if time - cache_times.get(v, -cache_size - 1) > cache_size:
+            cache_times[v] = time
+            time += 1
+
+    return time
+
+
+def get_cache_metrics(faces, vertex_count: int, cache_size: int = DEFAULT_CACHE_SIZE) -> Tuple[float, float]:
+    """Returns the average cache miss ratio (transformed vertices per triangle) and the average transform to vertex
+    ratio (transformed vertices per vertex) of a mesh. The best possible ATVR is 1.
+    """
+    misses = count_cache_misses(faces, cache_size)
+    face_count = len(np.asarray(faces).reshape(-1, 3))
+
+    return (misses / face_count if face_count else 0.0), (misses / vertex_count if vertex_count else 0.0)
+
+
+def tipsify(faces, vertex_count: int, cache_size: int = DEFAULT_CACHE_SIZE) -> np.ndarray:
+    """Returns an order of the triangles that reuses the vertices in a FIFO cache of the given size.\n
+    Triangles are emitted in fans around a vertex, and the next fan vertex is the one among the vertices of the last
+    fan that will still be cached after emitting all of its triangles, or the most recently used vertex with triangles
+    left when none of them will.
+    """
+    faces = np.asarray(faces, np.int64).reshape(-1, 3)
+    face_count = len(faces)
+
+    if face_count == 0:
+        return np.zeros(0, np.int64)
+
+    # Triangles that use each vertex, as offsets into a list of triangle indices sorted by vertex
+    corners = faces.ravel()
+    live_counts = np.bincount(corners, minlength=vertex_count)
+    offsets = np.zeros(vertex_count + 1, np.int64)
+    np.cumsum(live_counts, out=offsets[1:])
+
+    offsets = offsets.tolist()
+    vertex_triangles = (np.argsort(corners, kind='stable') // 3).tolist()
+    live_counts = live_counts.tolist()
+
+    face_list = faces.tolist()
+    emitted = [False] * face_count
+    cache_times = [0] * vertex_count
+    dead_ends = list()
+
+    order = list()
+    time = cache_size + 1
+    cursor = 0
+
+    def skip_dead_end() -> int:
+        nonlocal cursor
+
+        # Continue from the most recently used vertex that still has triangles, or the next vertex in order
+        while dead_ends:
+            v = dead_ends.pop()
+            if live_counts[v] > 0:
+                return v
+
+        while cursor < vertex_count:
+            if live_counts[cursor] > 0:
+                return cursor
+            cursor += 1
+
+        return -1
+
+    fan = skip_dead_end()
+
+    while fan >= 0:
+        candidates = list()
+
+        for t in vertex_triangles[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+
+            emitted[t] = True
+            order.append(t)
+
+            for v in face_list[t]:
+                dead_ends.append(v)
+                candidates.append(v)
+                live_counts[v] -= 1
+
+                if time - cache_times[v] > cache_size:
+                    cache_times[v] = time
+                    time += 1
+
+        # Pick the candidate that has been in the cache the longest but will still be cached after its fan
+        best_vertex = -1
+        best_priority = -1
+
+        for v in candidates:
+            if live_counts[v] > 0:
+                priority = 0
+                if time - cache_times[v] + 2 * live_counts[v] <= cache_size:
+                    priority = time - cache_times[v]
+
+                if priority > best_priority:
+                    best_vertex = v
+                    best_priority = priority
+
+        fan = best_vertex if best_vertex >= 0 else skip_dead_end()
+
+    return np.array(order, np.int64)
+
+
+def optimize_vertex_cache(arrays: Dict[str, Optional[np.ndarray]], faces,
+                          cache_size: int = DEFAULT_CACHE_SIZE) -> Tuple[Dict[str, Optional[np.ndarray]], np.ndarray]:
+    """Reorders the triangles of a mesh for the vertex cache (see tipsify), and its vertices in order of their first use
+    by the reordered triangles. Returns the new vertex arrays and faces.
+    """
+    faces = np.asarray(faces, np.int64).reshape(-1, 3)
+
+    if len(faces) == 0:
+        return arrays, faces
+
+    return compact_mesh_arrays(arrays, faces[tipsify(faces, len(arrays['position']), cache_size)])
@@ -7,6 +7,7 @@ import time
 
 import bmesh
 import bpy
+import numpy as np
 from bpy.props import (BoolProperty, CollectionProperty, EnumProperty,
                        StringProperty)
 from bpy.types import (Armature, EditBone, Mesh, MeshLoop, MeshLoopTriangle,
@@ -29,18 +30,22 @@ from ..xfbin_lib.xfbin.structure.nucc import (ClumpModelGroup, CoordNode,
 from ..xfbin_lib.xfbin.structure.nud import (Nud, NudMaterial,
                                              NudMaterialProperty,
                                              NudMaterialTexture, NudMesh,
-                                             NudMeshGroup, NudVertex)
+                                             NudMeshGroup)
 from ..xfbin_lib.xfbin.structure.nut import Nut, NutTexture
 from ..xfbin_lib.xfbin.structure.texture_converter import convert_texture
 from ..xfbin_lib.xfbin.structure.xfbin import Xfbin
 from ..xfbin_lib.xfbin.util.binary_reader.binary_reader.binary_reader import (
     BinaryReader, Endian)
-from ..xfbin_lib.xfbin.util.iterative_dict import IterativeDict
 from ..xfbin_lib.xfbin.xfbin_reader import read_xfbin
 from ..xfbin_lib.xfbin.xfbin_writer import write_xfbin_to_path
 from .common.coordinate_converter import *
 from .common.helpers import (XFBIN_DYNAMICS_OBJ, XFBIN_TEXTURES_OBJ,
-                             hex_str_to_int)
+                             foreach_get_array, hex_str_to_int)
+from .common.mesh_converter import (bitangents_from_tangents,
+                                    colors_from_blender, make_mesh_arrays,
+                                    positions_from_blender, select_bone_weights,
+                                    split_mesh_arrays, uvs_from_blender)
+from .common.vertex_cache import count_cache_misses, optimize_vertex_cache
 from .panels.clump_panel import (ClumpModelGroupPropertyGroup,
                                  ClumpPropertyGroup)
 from .panels.common import BoolPropertyGroup
@@ -158,6 +163,13 @@ class ExportXfbin(Operator, ExportHelper):
         type=BoolPropertyGroup,
     )
 
+    optimize_vertex_cache: BoolProperty(
+        name='Optimize vertex cache',
+        description='If True, will reorder the triangles and vertices of each mesh so that the GPU transforms fewer vertices when drawing them.\n'
+        'Makes exporting slower, and reports the average cache miss ratio (ACMR) and transform to vertex ratio (ATVR) before and after',
+        default=False,
+    )
+
     export_dynamics: BoolProperty(
         name='Export Dynamics (Physics)',
         description='',
@@ -184,6 +196,7 @@ class ExportXfbin(Operator, ExportHelper):
                 box.prop(self, 'export_meshes')
                 if self.export_meshes:
                     box.prop(self, 'export_specific_meshes')
+                    box.prop(self, 'optimize_vertex_cache')
 
                 box.prop(self, 'export_bones')
 
@@ -272,6 +285,7 @@ class XfbinExporter:
         self.inject_to_clump = export_settings.get('inject_to_clump')
         self.export_specific_meshes = export_settings.get('export_specific_meshes')
         self.meshes_to_export = export_settings.get('meshes_to_export')
+        self.optimize_vertex_cache = export_settings.get('optimize_vertex_cache')
         self.export_dynamics = export_settings.get('export_dynamics')
 
 
@@ -326,6 +340,9 @@ class XfbinExporter:
                     old_clump = self.xfbin.get_chunk_page(clump)
 
                     if old_clump:
+                        # The clump's chunks are modified in place, so the page has to be written again
+                        old_clump[1].mark_dirty()
+
                         # There should be only 1 clump per page anyway
                         old_clump: NuccChunkClump = old_clump[1].get_chunks_by_type(NuccChunkClump)[0]
                     else:
@@ -365,8 +382,8 @@ class XfbinExporter:
                             if new_model is not None:
                                 model.copy_from(new_model)
 
-        # Write the xfbin
-        write_xfbin_to_path(self.xfbin, self.filepath)
+        # Write the xfbin, copying the pages that were not changed when injecting
+        write_xfbin_to_path(self.xfbin, self.filepath, self.inject_to_xfbin)
         
 
     def make_clump(self, armature_obj: Object, context) -> NuccChunkClump:
@@ -691,162 +708,127 @@ class XfbinExporter:
             #calculate tangents
             mesh.calc_tangents()
 
-            mesh_vertices = mesh.vertices
-            mesh_loops = mesh.loops
-
             # Get the vertex groups
             v_groups = obj.vertex_groups
 
             #get the first color layer and if it doesn't exist make one
-            if len(mesh.color_attributes) > 0:
-                color_layer = mesh.color_attributes[0].data
-            else:
-                color_layer = mesh.vertex_colors.new(name='Color', type = "BYTE_COLOR", domain = "CORNER")
-                color_layer = mesh.color_attributes[0].data
-
-            #try to get the first 4 uv layers
-            uv_layers = list()
-
-            for i, uv_layer in enumerate(mesh.uv_layers):
-                uv_layers.append(uv_layer.data)
-                if i == 3:
-                    break
-
-           # create a list for each material
-           # mat_meshes = [list() for mat in mesh.materials]
-
-            mat_meshes = {mat.name: list() for mat in mesh.materials}
-
-            for tri_loops in mesh.loop_triangles:
-                tri_loops: MeshLoopTriangle
-                 
-                #get the material index
-                mat_index = tri_loops.material_index
-
-                mat_meshes[mesh.materials[mat_index].name].append(tri_loops)
-            
-            for mat_name, mesh in mat_meshes.items():
-
-                faces = [None] * len(mesh)
-                face_index = 0
-                vertices = [None] * len(mesh)
-                vertex_index = 0
-
-                for tri_loops in mesh:
-                    tri_loops: MeshLoopTriangle
-
-                    verts = vertices[vertex_index] = list()
-                    vertex_index += 1
-
-                    for l_index in tri_loops.loops:
-                        l: MeshLoop = mesh_loops[l_index]
-                        v_index = l.vertex_index
-                        v: MeshVertex = mesh_vertices[v_index]
-
-                        # Create and add the vertex
-                        vert = NudVertex()
-                        verts.append(vert)
-
-                        # Position and normal, tangent, bitangent
-                        vert.position = pos_scaled_from_blender(v.co @ obj.matrix_world)
-                        vert.normal = pos_from_blender(l.normal)
-                        vert.tangent = pos_from_blender(l.tangent)
-                        vert.bitangent = l.bitangent_sign * Vector(vert.normal).cross(Vector(vert.tangent))
-
-                        # Color
-                        if color_layer:
-                            vert.color = [int(c*255) for c in color_layer[l_index].color_srgb]
-
-                        # UV
-                        vert.uv = list()
-                        for uv_layer in uv_layers:
-                            vert.uv.append(uv_from_blender(uv_layer[l_index].uv))
-                        
-                        vert.bone_ids = tuple()
-                        vert.bone_weights = tuple()
-
-                        # Bone indices and weights
-                        # Direct copy of TheTurboTurnip's weight sorting method
-                        # https://github.com/theturboturnip/yk_gmd_io/blob/master/yk_gmd_blender/blender/export/legacy/exporter.py#L302-L316
-
-                        # Get a list of (vertex group ID, weight) items sorted in descending order of weight
-                        # Take the top 4 elements, for the top 4 most deforming bones
-                        # Normalize the weights so they sum to 1
-                        b_weights = [(v_groups[g.group].name, g.weight) for g in sorted(
-                            v.groups, key=lambda g: 1 - g.weight) if v_groups[g.group].name in coord_indices_dict]
-                        if len(b_weights) > 4:
-                            b_weights = b_weights[:4]
-                        elif len(b_weights) < 4:
-                            # Add zeroed elements to b_weights so it's 4 elements long
-                            b_weights += [(0, 0.0)] * (4 - len(b_weights))
-
-                        weight_sum = sum(weight for (_, weight) in b_weights)
-                        if weight_sum > 0.0:
-                            vert.bone_ids = [coord_indices_dict.get(bw[0], 0) for bw in b_weights]
-                            vert.bone_weights = [bw[1] / weight_sum for bw in b_weights]
-                        else:
-                            vert.bone_ids = [0] * 4
-                            vert.bone_weights = [0] * 3 + [1]
-                        
-                vertices_dict = IterativeDict()
-                vertices_dict_get = vertices_dict.get_or_next
-
-                for verts in vertices:
-                    # Get the vertex indices to make the face
-                    faces[face_index] = [vertices_dict_get(x) for x in verts]
-                    face_index += 1
-
-                vertices = list(vertices_dict)
-
-                if len(vertices) < 3:
+            if len(mesh.color_attributes) == 0:
+                mesh.vertex_colors.new(name='Color', type = "BYTE_COLOR", domain = "CORNER")
+
+            color_attribute = mesh.color_attributes[0]
+
+            # Get the mesh data as arrays
+            loop_vertices = foreach_get_array(mesh.loops, 'vertex_index', np.int32)
+            triangle_loops = foreach_get_array(mesh.loop_triangles, 'loops', np.int32, 3)
+            triangle_materials = foreach_get_array(mesh.loop_triangles, 'material_index', np.int32)
+
+            # Position and normal, tangent, bitangent
+            positions = positions_from_blender(foreach_get_array(mesh.vertices, 'co', np.float32, 3), obj.matrix_world)
+            normals = foreach_get_array(mesh.loops, 'normal', np.float32, 3)
+            tangents = foreach_get_array(mesh.loops, 'tangent', np.float32, 3)
+            bitangents = bitangents_from_tangents(normals, tangents, foreach_get_array(mesh.loops, 'bitangent_sign', np.float32))
+
+            # Color
+            colors = foreach_get_array(color_attribute.data, 'color_srgb', np.float32, 4)
+            if color_attribute.domain == 'POINT':
+                colors = colors[loop_vertices]
+            colors = colors_from_blender(colors)
+
+            # UVs of the first 4 uv layers
+            uv_layers = list(mesh.uv_layers)[:4]
+            uvs = uvs_from_blender(np.stack([foreach_get_array(uv_layer.data, 'uv', np.float32, 2)
+                                             for uv_layer in uv_layers], axis=1)) if uv_layers else None
+
+            # Bone indices and weights of the top 4 most deforming bones, only needed if the mesh is deformable
+            bone_ids = bone_weights = None
+            if RiggingFlag.SKINNED in chunk.rigging_flag:
+                group_bones = [coord_indices_dict.get(g.name, -1) for g in v_groups]
+
+                # Vertex index, vertex group index and weight of each vertex group of each vertex, as separate columns
+                group_counts = np.fromiter((len(v.groups) for v in mesh.vertices), np.int64, len(mesh.vertices))
+                group_count = int(group_counts.sum())
+
+                group_vertices = np.repeat(np.arange(len(mesh.vertices)), group_counts)
+                group_indices = np.fromiter((g.group for v in mesh.vertices for g in v.groups), np.int64, group_count)
+                group_weights = np.fromiter((g.weight for v in mesh.vertices for g in v.groups), np.float32, group_count)
+
+                bone_ids, bone_weights = select_bone_weights(group_vertices, group_indices, group_weights,
+                                                             len(mesh.vertices), group_bones)
+
+            # Vertex cache misses of the meshes before and after optimizing them
+            misses_before = misses_after = 0
+            optimized_faces = optimized_vertices = 0
+
+            # Create a mesh for each material, from the triangles of all material slots that use it
+            for mat_name in dict.fromkeys(mat.name for mat in mesh.materials):
+                slots = [i for i, mat in enumerate(mesh.materials) if mat.name == mat_name]
+
+                arrays, faces = make_mesh_arrays(triangle_loops[np.isin(triangle_materials, slots)], loop_vertices,
+                                                 positions, normals, tangents, bitangents, colors, uvs,
+                                                 bone_ids, bone_weights)
+                vertex_count = len(arrays['position'])
+
+                if vertex_count < 3:
                     self.operator.report(
                         {'WARNING'}, f'[NUD MESH] {obj.name} has no valid faces and will be skipped.')
                     continue
 
-                if len(vertices) > NudMesh.MAX_VERTICES:
+                # Add the material chunk for this mesh
+                if len(obj.data.materials) == 0:
                     self.operator.report(
-                        {'WARNING'}, f'[NUD MESH] {obj.name} has {len(vertices)} vertices (limit is {NudMesh.MAX_VERTICES}) and will be skipped.')
+                        {'WARNING'}, f'[NUD MESH] {obj.name} has no material and will be skipped.')
                     continue
 
-                if len(faces) > NudMesh.MAX_FACES:
+                mat = self.make_xfbin_material(obj.data.materials[mat_name], clump, context)
+
+                # Get the material properties of this mesh
+                nud_materials = self.make_nud_materials(obj, obj.data.materials[mat_name], clump, context)
+
+                # Split the mesh if it exceeds the vertex or face limits
+                split_meshes = split_mesh_arrays(arrays, faces, NudMesh.MAX_VERTICES, NudMesh.MAX_FACES)
+
+                if len(split_meshes) > 1:
                     self.operator.report(
-                        {'WARNING'}, f'[NUD MESH] {obj.name} has {len(faces)} faces (limit is {NudMesh.MAX_FACES}) and will be skipped.')
-                    continue
+                        {'INFO'}, f'[NUD MESH] {obj.name} has {vertex_count} vertices and {len(faces)} faces '
+                        f'(limits are {NudMesh.MAX_VERTICES} and {NudMesh.MAX_FACES}) and was split into {len(split_meshes)} meshes.')
 
-                mat_mesh = NudMesh()
-                mat_mesh.vertices = vertices
-                mat_mesh.faces = faces
+                for split_arrays, split_faces in split_meshes:
+                    if self.optimize_vertex_cache:
+                        misses_before += count_cache_misses(split_faces)
+                        split_arrays, split_faces = optimize_vertex_cache(split_arrays, split_faces)
+                        misses_after += count_cache_misses(split_faces)
 
-                # set the correct vertex/bone/uv formats
+                        optimized_faces += len(split_faces)
+                        optimized_vertices += len(split_arrays['position'])
 
-                #we'll set the vertex type to 3 if the mesh is deformable and 7 if not
-                if RiggingFlag.SKINNED in chunk.rigging_flag: 
-                    mat_mesh.vertex_type = int(0x03)
-                    mat_mesh.bone_type = int(0x10)
-                    mat_mesh.face_flag = int(4)
-                else:
-                    mat_mesh.vertex_type = int(0x07)
-                    mat_mesh.bone_type = int(0x00)
-                    mat_mesh.face_flag = int(0x00)
-                
-                mat_mesh.uv_type = int(2)
+                    mat_mesh = NudMesh()
+                    mat_mesh.set_vertex_arrays(split_arrays)
+                    mat_mesh.faces = split_faces
 
-                # Add the material chunk for this mesh
-                if len(obj.data.materials) == 0:
-                    self.operator.report(
-                        {'WARNING'}, f'[NUD MESH] {obj.name} has no material and will be skipped.')
-                    continue
-                else:
-                    mat = self.make_xfbin_material(obj.data.materials[mat_name], clump, context)
-                
-                chunk.material_chunks.append(mat)
+                    # set the correct vertex/bone/uv formats
 
-                # Get the material properties of this mesh
-                mat_mesh.materials = self.make_nud_materials(obj, obj.data.materials[mat_name], clump, context)
+                    #we'll set the vertex type to 3 if the mesh is deformable and 7 if not
+                    if RiggingFlag.SKINNED in chunk.rigging_flag: 
+                        mat_mesh.vertex_type = int(0x03)
+                        mat_mesh.bone_type = int(0x10)
+                        mat_mesh.face_flag = int(4)
+                    else:
+                        mat_mesh.vertex_type = int(0x07)
+                        mat_mesh.bone_type = int(0x00)
+                        mat_mesh.face_flag = int(0x00)
+
+                    mat_mesh.uv_type = int(2)
 
-                # Only add the mesh if it doesn't exceed the vertex and face limits
-                mesh_group.meshes.append(mat_mesh)
+                    # Meshes split from the same mesh share its material
+                    chunk.material_chunks.append(mat)
+                    mat_mesh.materials = nud_materials
 
+                    mesh_group.meshes.append(mat_mesh)
+
+            if optimized_faces:
+                self.operator.report(
+                    {'INFO'}, f'[NUD MESH] {obj.name} vertex cache: ACMR {misses_before / optimized_faces:.3f} -> {misses_after / optimized_faces:.3f}, '
+                    f'ATVR {misses_before / optimized_vertices:.3f} -> {misses_after / optimized_vertices:.3f}')
 
             model_chunks.append(chunk)
 
@@ -4,7 +4,7 @@ from typing import List
 import time
 import bmesh
 import bpy
-from bmesh.types import BMesh
+import numpy as np
 from bpy.props import BoolProperty, StringProperty, CollectionProperty, IntProperty
 from bpy.types import Action, Camera, Bone, Material, Object, Operator, UIList
 from bpy_extras.io_utils import ImportHelper
@@ -29,8 +29,10 @@ from ..xfbin_lib.xfbin.structure.xfbin import Xfbin
 from ..xfbin_lib.xfbin.xfbin_reader import read_xfbin
 from ..xfbin_lib.xfbin.structure import dds
 from .common.coordinate_converter import *
+from .common.keyframe_converter import convert_anm_values, convert_anm_values_transformed, frames_to_blender
 from .common.helpers import (XFBIN_DYNAMICS_OBJ, XFBIN_ANMS_OBJ, XFBIN_TEXTURES_OBJ,
                              int_to_hex_str)
+from .common.mesh_converter import iter_vertex_group_weights, make_blender_mesh_arrays, make_vertex_group_weights
 from .materials.shaders import (shaders_dict, collision_mat)
 import cProfile
 
@@ -508,9 +510,6 @@ class XfbinImporter:
             #blender_mesh.use_auto_smooth = True
             #blender_mesh.create_normals_split()
 
-            #create a bmesh to store all the meshes
-            bm = bmesh.new()
-
             # Get the bone range that this NUD uses
             bone_range = nud.get_bone_range()
 
@@ -520,18 +519,13 @@ class XfbinImporter:
                 mesh_bone: Bone = armature_obj.data.bones.get(
                     nucc_model.coord_chunk.name)
 
-            custom_normals = list()
-
-            deform = bm.verts.layers.deform.new("Vertex Weights")
-            color = bm.loops.layers.color.new("Color")
-            
             '''
             This is an unreliable way to get the number of UV layers, since the number of UV layers can vary between meshes
-            uv_count = len(nud.mesh_groups[0].meshes[0].vertices[0].uv)
-            uv_layers = [bm.loops.layers.uv.new(f"UV_{i}") for i in range(uv_count)]
+            uv_count = nud.mesh_groups[0].meshes[0].get_uv_channel_count()
             '''
 
-            uv_layers = {}
+            meshes: List[NudMesh] = list()
+            material_indices = list()
 
             for group in nud.mesh_groups:
                 for mat_index, mesh in enumerate(group.meshes):
@@ -543,69 +537,27 @@ class XfbinImporter:
                     except:
                         print(f"Error adding material {mat_chunk.name} to mesh {mesh.name}")
                         pass
-                    uv_count = len(mesh.vertices[0].uv)
-
-                    #check if the uv layers already exist
-                    for uv in range(uv_count):
-                        if not uv_layers.get(uv):
-                            uv_layers[uv] = bm.loops.layers.uv.new(f"UV_{uv}")
-                    
-
-                    vCount = len(bm.verts)
 
-                    # Vertices
-                    for vtx in mesh.vertices:
-                        vert = bm.verts.new(pos_scaled_to_blender(vtx.position))
+                    meshes.append(mesh)
+                    material_indices.append(mat_index)
 
-                        # Tangents cannot be applied
-                        normal = Vector(vtx.normal).normalized()
-                        custom_normals.append(normal)
-                        vert.normal = normal
-
-                        if vtx.bone_weights:
-                            for bone_id, bone_weight in zip(vtx.bone_ids, vtx.bone_weights):
-                                if bone_weight > 0:
-                                    vertex_group_index = vertex_group_indices[clump.coord_chunks[bone_id].name]
-                                    vert[deform][vertex_group_index] = bone_weight
-                        else:
-                            vertex_group_index = vertex_group_indices[nucc_model.coord_chunk.name]
-                            vert[deform][vertex_group_index] = 1
+            # Combine the vertex arrays of all the meshes into a single mesh
+            mesh_arrays = make_blender_mesh_arrays([(m.get_vertex_arrays(), m.faces) for m in meshes], material_indices)
+            set_triangle_mesh(blender_mesh, mesh_arrays['position'], mesh_arrays['faces'])
 
-                    # Set up the indexing table inside the bmesh so lookups work
-                    bm.verts.ensure_lookup_table()
-                    bm.verts.index_update()
+            blender_mesh.polygons.foreach_set('use_smooth', np.ones(len(blender_mesh.polygons), bool))
+            blender_mesh.polygons.foreach_set('material_index', mesh_arrays['material_index'])
 
-                    # For each triangle, add it to the bmesh
-                    for mesh_face in mesh.faces:
-                        tri_idxs = mesh_face
+            color = blender_mesh.color_attributes.new('Color', 'BYTE_COLOR', 'CORNER')
+            color.data.foreach_set('color_srgb', mesh_arrays['color'].ravel())
 
-                        # Skip "degenerate" triangles
-                        if len(set(tri_idxs)) != 3:
-                            continue
+            for uv in range(mesh_arrays['uv'].shape[1]):
+                uv_layer = blender_mesh.uv_layers.new(name=f"UV_{uv}")
+                uv_layer.data.foreach_set('uv', np.ascontiguousarray(mesh_arrays['uv'][:, uv]).ravel())
 
-                        try:
-                            face = bm.faces.new((bm.verts[tri_idxs[0]+vCount], bm.verts[tri_idxs[1]+vCount], bm.verts[tri_idxs[2]+vCount]))
-                            face.smooth = True
-                            #set face material
-                            face.material_index = mat_index
-
-                            # Set up the UVs and colors for each vertex in the face
-                            for loop in face.loops:
-                                loop[color] = [x / 255 for x in mesh.vertices[loop.vert.index - vCount].color]
-                                for uvi in range(uv_count):
-                                    loop[uv_layers[uvi]].uv = uv_to_blender(mesh.vertices[loop.vert.index - vCount].uv[uvi])
-
-                        except Exception as e:
-                            # We might get duplicate faces for some reason
-                            # print(e)
-                            pass
-                    
-                    
-            bm.to_mesh(blender_mesh)
-            bm.free()
-            
+            # Tangents cannot be applied
+            blender_mesh.normals_split_custom_set_from_vertices(mesh_arrays['normal'])
 
-            blender_mesh.normals_split_custom_set_from_vertices(custom_normals)
             mesh_obj: bpy.types.Object = bpy.data.objects.new(
                 nucc_model.name, blender_mesh)
             
@@ -638,6 +590,15 @@ class XfbinImporter:
             # Create the vertex groups for all bones (required)
             for name in [coord.node.name for coord in clump.coord_chunks]:
                 mesh_obj.vertex_groups.new(name=name)
+
+            # Meshes without bone weights are fully weighted to the mesh bone
+            bone_groups = [vertex_group_indices.get(coord.name, -1) for coord in clump.coord_chunks]
+            default_group = vertex_group_indices.get(nucc_model.coord_chunk.name, -1) if nucc_model.coord_chunk else -1
+
+            # Add the vertices with the same weight to each vertex group at once
+            for group, weight, vertices in iter_vertex_group_weights(*make_vertex_group_weights(
+                    [m.get_vertex_arrays() for m in meshes], bone_groups, [default_group] * len(meshes))):
+                mesh_obj.vertex_groups[group].add(vertices.tolist(), weight, 'REPLACE')
             
             '''# Create the vertex groups for bones in the bone range
             for name in [clump.coord_chunks[i].name for i in range(bone_range[0], bone_range[1]+1)]:
@@ -671,31 +632,11 @@ class XfbinImporter:
             hit_empty.xfbin_modelhit_data.init_data(modelhit)
 
             for i, sec in enumerate(modelhit.vertex_sections):
-                bm = bmesh.new()
                 # Make a mesh to store the modelhit's vertex data
-                mesh = bpy.data.meshes.new(f'{modelhit.name}_{i}')
-
-                for v in range(0, len(sec.mesh_vertices), 3):
-                    # add verts
-                    bmv1 = bm.verts.new(sec.mesh_vertices[v])
-                    bmv2 = bm.verts.new(sec.mesh_vertices[v+1])
-                    bmv3 = bm.verts.new(sec.mesh_vertices[v+2])
-
-                    # draw faces
-                    face = bm.faces.new((bmv1, bmv2, bmv3))
-                
-                bm.verts.ensure_lookup_table()
-                bm.faces.ensure_lookup_table()
+                mesh = make_triangle_list_mesh(f'{modelhit.name}_{i}', sec.mesh_vertices)
 
                 # clean up
-                bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=0.001)
-                bmesh.ops.scale(bm, vec=(0.01, 0.01, 0.01), verts=bm.verts)
-
-                # apply the changes to the mesh we created
-                bm.to_mesh(mesh)
-
-                # free bmesh
-                bm.free()
+                merge_triangle_list_mesh(mesh)
 
                 # create a new object with our mesh data
                 obj = bpy.data.objects.new(f'{modelhit.name}_{i}', mesh)
@@ -724,9 +665,10 @@ class XfbinImporter:
 
         vertex = 0
         for i, mesh in enumerate(batch.meshes):
-            obj = self.make_primitive_vertex(f"{batch.name}_{i}",
-                                             batch.primitive_vertex_chunk.vertices[vertex:vertex+mesh.vertex_count],
+            obj = self.make_primitive_vertex(f"{batch.name}_{i}", batch.primitive_vertex_chunk,
+                                             slice(vertex, vertex + mesh.vertex_count),
                                              armature_obj, armature_obj.data.bones[mesh.parent_bone].name)
+            vertex += mesh.vertex_count
             
             #transform the object by the bone matrix
             obj.data.transform(armature_obj.data.bones[mesh.parent_bone].matrix_local.to_4x4())
@@ -742,52 +684,22 @@ class XfbinImporter:
         '''mat: XfbinMaterialPropertyGroup = self.materials.add()
         material = mat.init_data(batch.material_chunk)'''
 
-    def make_primitive_vertex(self, name, vertices, armature_obj: Object, parent_bone):
-
-        bm = bmesh.new()
+    def make_primitive_vertex(self, name, primitive_vertex: NuccChunkPrimitiveVertex, vertices: slice, armature_obj: Object, parent_bone):
         # Make a mesh to store the primitive vertex data
-        mesh = bpy.data.meshes.new(f'{name}')
-
-        uv = [v.uv for v in vertices]
-        color = [v.color for v in vertices]
-
-        for i in range(0, len(vertices), 3):
-            # add verts
-            bmv1 = bm.verts.new(vertices[i].position)
-            bmv1.normal = vertices[i].normal
-            bmv2 = bm.verts.new(vertices[i+1].position)
-            bmv2.normal = vertices[i+1].normal
-            bmv3 = bm.verts.new(vertices[i+2].position)
-            bmv3.normal = vertices[i+2].normal
-
-            # draw faces
-            face = bm.faces.new((bmv1, bmv2, bmv3))
-        
-        bm.verts.ensure_lookup_table()
-        bm.faces.ensure_lookup_table()
-
-        # clean up
-        bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=0.001)
-        bmesh.ops.scale(bm, vec=(0.01, 0.01, 0.01), verts=bm.verts)
-
-        # apply the changes to the mesh we created
-        bm.to_mesh(mesh)
+        mesh = make_triangle_list_mesh(f'{name}', primitive_vertex.positions[vertices])
+        loop_count = len(mesh.loops)
 
         #add uv data
         mesh.uv_layers.new(name='UVMap')
-        uv_layer = mesh.uv_layers.active.data
-        for i, uv in enumerate(uv_layer):
-            uv.uv = vertices[i].uv
-        
+        mesh.uv_layers.active.data.foreach_set('uv', np.ascontiguousarray(primitive_vertex.uvs[vertices][:loop_count], np.float32).ravel())
+
         #add color data
         mesh.vertex_colors.new(name='Color')
-        color_layer = mesh.vertex_colors.active.data
-        for i, color in enumerate(color_layer):
-            color.color = vertices[i].color
+        mesh.vertex_colors.active.data.foreach_set('color', np.ascontiguousarray(primitive_vertex.colors[vertices][:loop_count], np.float32).ravel())
+
+        # clean up
+        merge_triangle_list_mesh(mesh)
 
-        # free bmesh
-        bm.free()
-        
         # create a new object with our mesh data
         obj = bpy.data.objects.new(f'{name}', mesh)
 
@@ -842,62 +754,6 @@ class XfbinImporter:
 
         return material
 
-    def nud_mesh_to_bmesh(self, mesh: NudMesh, clump: NuccChunkClump, vertex_group_indices, custom_normals, mat_index) -> BMesh:
-        bm = bmesh.new()
-
-        deform = bm.verts.layers.deform.new("Vertex Weights")
-        color = bm.loops.layers.color.new("Color")
-        
-        uv_layers = [bm.loops.layers.uv.new(f"UV_{i}") for i in range(len(mesh.vertices[0].uv))]
-
-
-        # Vertices
-        for vtx in mesh.vertices:
-            vert = bm.verts.new(pos_scaled_to_blender(vtx.position))
-
-            # Tangents cannot be applied
-            #normal = pos_to_blender(vtx.normal)
-            custom_normals.append(pos_to_blender(vtx.normal))
-            #vert.normal = normal
-
-            if vtx.bone_weights:
-                for bone_id, bone_weight in zip(vtx.bone_ids, vtx.bone_weights):
-                    if bone_weight > 0:
-                        vertex_group_index = vertex_group_indices[clump.coord_chunks[bone_id].name]
-                        vert[deform][vertex_group_index] = bone_weight
-
-        # Set up the indexing table inside the bmesh so lookups work
-        bm.verts.ensure_lookup_table()
-        bm.verts.index_update()
-
-        # For each triangle, add it to the bmesh
-        for mesh_face in mesh.faces:
-            tri_idxs = mesh_face
-
-            # Skip "degenerate" triangles
-            if len(set(tri_idxs)) != 3:
-                continue
-
-            try:
-                face = bm.faces.new(
-                    (bm.verts[tri_idxs[0]], bm.verts[tri_idxs[1]], bm.verts[tri_idxs[2]]))
-                face.smooth = True
-                #set face material
-                face.material_index = mat_index
-
-                # Set up the UVs and colors for each vertex in the face
-                for loop in face.loops:
-                    loop[color] = [x / 255 for x in mesh.vertices[loop.vert.index].color]
-                    for i in range(len(mesh.vertices[0].uv)):
-                        loop[uv_layers[i]].uv = uv_to_blender(mesh.vertices[loop.vert.index].uv[i])
-
-            except Exception as e:
-                # We might get duplicate faces for some reason
-                # print(e)
-                pass
-
-        return bm
-
     def make_actions(self, anm_chunks: NuccChunkAnm, cam_chunks: NuccChunkCamera, context) -> List[Action]:
         actions: List[bpy.types.Action] = list()
         
@@ -995,12 +851,12 @@ class XfbinImporter:
                     group_name = action.groups.new("camera").name
                 
                     for curve in entry.curves:
-                        if curve is None or (not len(curve.keyframes)) or curve.data_path == AnmDataPath.UNKNOWN:
+                        if curve is None or (not len(curve.frames)) or curve.data_path == AnmDataPath.UNKNOWN:
                             continue
 
-                        frames = list(map(lambda x: frame_to_blender(x.frame), curve.keyframes))
+                        frames = frames_to_blender(curve.frames)
                         
-                        values = convert_anm_values(curve.data_path, list(map(lambda x: x.value, curve.keyframes)))
+                        values = convert_anm_values(curve.data_path, curve.values)
                         
                         insert_keyframes(camera_action, curve.data_path, group_name, frames, values)
                     
@@ -1114,9 +970,9 @@ class XfbinImporter:
                         #if curve is None or (not len(curve.keyframes)) or curve.data_path == AnmDataPath.UNKNOWN:
                         #    continue
 
-                        frames = list(map(lambda x: frame_to_blender(x.frame), curve.keyframes))
+                        frames = frames_to_blender(curve.frames)
                         
-                        values = convert_anm_values_tranformed(curve.data_path, [x.value for x in curve.keyframes], loc, rot, sca)
+                        values = convert_anm_values_transformed(curve.data_path, curve.values, loc, rot, sca)
                         
 
                         if curve.data_path == "rotation_euler":
@@ -1184,92 +1040,62 @@ class XfbinImporter:
         return actions
 
 
-def insert_keyframes(action, data_path, group_name, frames, values):
-    if values:
-        for i in range(len(values[0])):
+def insert_keyframes(action, data_path, group_name, frames: np.ndarray, values: np.ndarray):
+    if len(values):
+        # Interleaved (frame, value) pairs of each channel
+        co = np.empty((len(frames), 2), np.float32)
+        co[:, 0] = frames
+
+        for i in range(values.shape[1]):
             fc = action.fcurves.new(data_path=data_path, index=i, action_group=group_name)
             fc.keyframe_points.add(len(frames))
-            fc.keyframe_points.foreach_set('co', [x for co in list(map(lambda f, v: (f, v[i]), frames, values)) for x in co])
+
+            co[:, 1] = values[:, i]
+            fc.keyframe_points.foreach_set('co', co.ravel())
             fc.update()
 
 
-def convert_anm_values_tranformed(data_path: AnmDataPath, values, loc: Vector, rot: Quaternion, sca: Vector):
-    if data_path == "location":
-        updated_values = list()
-        updated_loc = loc
-        updated_loc.rotate(rot.inverted())
-        for value_loc in values:
-            vec_loc = Vector(value_loc) * 0.01
-            vec_loc.rotate(rot.inverted())
-            updated_values.append(vec_loc - updated_loc)
-        return updated_values
+def make_triangle_list_mesh(name: str, positions: np.ndarray) -> bpy.types.Mesh:
+    """Makes a mesh with a triangle for every 3 positions, and a loop for each position."""
+    positions = np.asarray(positions, np.float32)
+    count = len(positions) - len(positions) % 3
 
-    if data_path == "rotation_euler":
-        rotations = [rot.rotation_difference(rot_to_blender(rotation).to_quaternion()) for rotation in values]
-        
-        return rotations
+    mesh = bpy.data.meshes.new(name)
+    set_triangle_mesh(mesh, positions[:count], np.arange(count).reshape(-1, 3))
 
-    if data_path == "rotation_quaternion":
-        
-        #method 1
-        quat_list = [rot.rotation_difference(Quaternion((rotation[3], *rotation[:3])).inverted()) for rotation in values]
-        
-        #method 2
-        '''quat_list = []
-        for rotation in values:
-            quat = Quaternion((rotation[3], *rotation[:3]))
-            brot = rot.copy()
-            brot.rotate(quat)
-            
-            quat_list.append(brot.inverted())'''
-            
-        #Method 3
-        '''quat_list = []
-        for rotation in values:
-            # Create the quaternion from the rotation values and invert it
-            # Adjust for negative scale
-            quat = Quaternion((rotation[3], *rotation[:3])).inverted()
-            
-            # Apply the inverted rotation to the original rotation
-            if any(s < 0 for s in sca):
-                #convert the rotation to euler then swap the axis
-                rotation = Quaternion((rotation[3], *rotation[:3])).to_euler('ZYX')
-                rotation = Euler((rotation.z, rotation.y, rotation.x), 'XYZ')
-                brot = rot.inverted() @ rotation.to_quaternion()
-                brot.invert()
-            else:
-                brot = rot.inverted() @ quat
-            
-            quat_list.append(brot)'''
+    return mesh
 
-        return quat_list
 
-    if data_path == "scale":
-        scale_list =  [Vector([abs(s / b) for s, b in zip(scale, sca)]) for scale in values]
-        return scale_list
-    
-    return values
-
-
-
-def convert_anm_values(data_path: AnmDataPath, values):
-    if data_path == "location":
-        return list(map(lambda x: pos_cm_to_m_tuple(x), values))
-        #return [x*0.01 for x in values]
-    if data_path == "rotation_euler":
-        #return list(map(lambda x: rot_to_blender(x)[:], values))
-        return [rot_to_blender(x)[:] for x in values]
-    if data_path == "rotation_quaternion":
-        #return list(map(lambda x: Quaternion((x[3], *x[:3])).inverted()[:], values))
-        return [Quaternion((x[3], *x[:3])).inverted()[:] for x in values]
-    if data_path == "scale":
-        #return list(map(lambda x: Vector(([abs(y) for y in x]))[:], values))
-        return [Vector(([abs(y) for y in x]))[:] for x in values]
-    if data_path == "data.lens":
-        #return list(map(lambda x: (focal_to_blender(x[0], 36.0),), values))
-        return [(focal_to_blender(x[1], 36.0),) for x in values]
-
-    return values
+def set_triangle_mesh(mesh: bpy.types.Mesh, positions: np.ndarray, faces: np.ndarray):
+    """Adds vertices and triangles to an empty mesh, with a loop for each vertex of each triangle."""
+    faces = np.ascontiguousarray(faces, np.int32).reshape(-1, 3)
+
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set('co', np.ascontiguousarray(positions, np.float32).ravel())
+
+    mesh.loops.add(faces.size)
+    mesh.loops.foreach_set('vertex_index', faces.ravel())
+
+    mesh.polygons.add(len(faces))
+    mesh.polygons.foreach_set('loop_start', np.arange(0, faces.size, 3, dtype=np.int32))
+
+    # Newer versions of Blender compute the loop totals from the loop starts
+    if not mesh.polygons.bl_rna.properties['loop_total'].is_readonly:
+        mesh.polygons.foreach_set('loop_total', np.full(len(faces), 3, np.int32))
+
+    mesh.update()
+
+
+def merge_triangle_list_mesh(mesh: bpy.types.Mesh):
+    """Merges the duplicate vertices of a mesh made by make_triangle_list_mesh, and scales it from centimeters to meters."""
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+
+    bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=0.001)
+    bmesh.ops.scale(bm, vec=(0.01, 0.01, 0.01), verts=bm.verts)
+
+    bm.to_mesh(mesh)
+    bm.free()
 
 
 def menu_func_import(self, context):
@@ -0,0 +1,246 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'xfbin_lib'))
+
+from blender.common.keyframe_converter import (convert_anm_values, convert_anm_values_transformed, frames_to_blender,
+                                               quat_multiply, quat_to_matrix)
+from xfbin.structure.anm import AnmCurve, create_bone_curves
+from xfbin.structure.br.br_anm import (ANM_CURVE_FORMATS, AnmCurveType, AnmEntryFormat, BrAnmEntry,
+                                       get_anm_curve_dtype)
+from xfbin.util import BinaryReader, Endian
+
+# Curve index of each bone data path (see anm.create_bone_curves)
+LOCATION, ROTATION, SCALE, OPACITY = range(4)
+
+FRAME_SIZE = 100
+
+# Data paths that each curve type is converted with in the tests
+LOCATION_FORMATS = (AnmCurveType.VECTOR3FIXED, AnmCurveType.VECTOR3LINEAR, AnmCurveType.VECTOR3BEZIER,
+                    AnmCurveType.VECTOR3TBL, AnmCurveType.VECTOR3I16LINEAR, AnmCurveType.VECTOR3TBL_NOINTERP)
+SCALE_FORMATS = LOCATION_FORMATS + (AnmCurveType.SCALEI16TBL,)
+QUATERNION_FORMATS = (AnmCurveType.QUATERNIONLINEAR, AnmCurveType.QUATERNIONI16TBL, AnmCurveType.QUATERNIONTBL,
+                      AnmCurveType.QUATERNIONI16TBL_NOINTERP)
+EULER_FORMATS = (AnmCurveType.EULERXYZFIXED,)
+OTHER_FORMATS = (AnmCurveType.FLOATFIXED, AnmCurveType.FLOATLINEAR,
+                 AnmCurveType.VECTOR2FIXED, AnmCurveType.VECTOR2LINEAR, AnmCurveType.OPACITYI16TBL,
+                 AnmCurveType.COLORRGBTBL, AnmCurveType.FLOATTBLNI, AnmCurveType.FLOATTBL,
+                 AnmCurveType.OPACITYI16TBL_NOINTERP)
+
+# 90 degrees around Z
+REST_LOC = np.array((1.0, 2.0, 3.0))
+REST_ROT = np.array((np.cos(np.pi / 4), 0.0, 0.0, np.sin(np.pi / 4)))
+REST_SCA = np.array((2.0, 0.5, 4.0))
+
+
+def read_bone_curve(curve_format: int, curve_index: int, values) -> AnmCurve:
+    """Returns the curve read from a bone ANM entry with a single curve of the given type with the given values
+    (which are quantized the same way as in ANM files), with a keyframe every FRAME_SIZE frames.
+    """
+    frame_format, _, value_count, scale = ANM_CURVE_FORMATS[curve_format]
+
+    values = np.asarray(values, np.float64).reshape(-1, value_count)
+    records = np.zeros(len(values), get_anm_curve_dtype(curve_format))
+    if frame_format:
+        records['frame'] = np.arange(len(values)) * FRAME_SIZE
+    records['values'] = np.round(values * scale) if scale else values
+
+    br = BinaryReader(endianness=Endian.BIG)
+    br.write_int16(0)
+    br.write_uint16(0)
+    br.write_uint16(AnmEntryFormat.BONE)
+    br.write_uint16(1)
+
+    br.write_uint16(curve_index)
+    br.write_uint16(curve_format)
+    br.write_uint16(len(values))
+    br.write_int16(0)
+
+    br.write_bytes(records.tobytes())
+    br.align(4)
+
+    with BinaryReader(br.buffer(), Endian.BIG) as entry_br:
+        br_entry: BrAnmEntry = entry_br.read_struct(BrAnmEntry)
+
+    return create_bone_curves(list(zip(br_entry.curve_headers, br_entry.curves)), FRAME_SIZE)[0]
+
+
+def anm_quaternions(quaternions) -> np.ndarray:
+    """Returns the (x, y, z, w) ANM values of Blender (w, x, y, z) quaternions, which are stored inverted."""
+    quaternions = np.asarray(quaternions, np.float64)
+    return quaternions[:, (1, 2, 3, 0)] * (-1, -1, -1, 1)
+
+
+class ConvertAnmValuesTest(unittest.TestCase):
+    def test_frames(self):
+        np.testing.assert_allclose(frames_to_blender([0, 100, 250]), (0, 1, 2.5))
+
+    def test_location(self):
+        np.testing.assert_allclose(convert_anm_values('location', [(100, -200, 50)]), [(1, -2, 0.5)])
+
+    def test_rotation_euler(self):
+        np.testing.assert_allclose(convert_anm_values('rotation_euler', [(180, -90, 0)]), [(np.pi, -np.pi / 2, 0)])
+
+    def test_rotation_quaternion(self):
+        s = np.sin(np.pi / 4)
+        np.testing.assert_allclose(convert_anm_values('rotation_quaternion', [(0, 0, s, s), (0, 0, 0, -1)]),
+                                   [(s, 0, 0, -s), (-1, 0, 0, 0)], atol=1e-12)
+
+        # Same as Quaternion.inverted, which does not normalize
+        np.testing.assert_allclose(convert_anm_values('rotation_quaternion', [(0, 0, 0, 2)]), [(0.5, 0, 0, 0)])
+
+    def test_scale(self):
+        np.testing.assert_allclose(convert_anm_values('scale', [(-1, 2, -3)]), [(1, 2, 3)])
+
+    def test_lens(self):
+        # The first value is the frame
+        np.testing.assert_allclose(convert_anm_values('data.lens', [(0, 90)]), [(18,)])
+
+    def test_other(self):
+        values = np.array([(0.25,)])
+        self.assertIs(convert_anm_values('opacity', values), values)
+
+
+class ConvertAnmValuesTransformedTest(unittest.TestCase):
+    def test_location(self):
+        # 1 meter along the bone's X axis, which points along Y after the rest rotation
+        values = [(100, 300, 300), (100, 200, 300)]
+        np.testing.assert_allclose(convert_anm_values_transformed('location', values, REST_LOC, REST_ROT, REST_SCA),
+                                   [(1, 0, 0), (0, 0, 0)], atol=1e-12)
+
+    def test_rotation_quaternion(self):
+        # The rest rotation gives no rotation, and 90 degrees around Z more gives 90 degrees around Z
+        values = anm_quaternions([REST_ROT, quat_multiply(REST_ROT, REST_ROT)])
+        np.testing.assert_allclose(convert_anm_values_transformed('rotation_quaternion', values, REST_LOC, REST_ROT,
+                                                                  REST_SCA), [(1, 0, 0, 0), REST_ROT], atol=1e-12)
+
+    def test_rotation_quaternion_sign(self):
+        # Negated quaternions are the same rotation, and keep their sign so keyframes are not flipped
+        values = anm_quaternions([REST_ROT, quat_multiply(REST_ROT, REST_ROT)])
+        np.testing.assert_allclose(convert_anm_values_transformed('rotation_quaternion', -values, REST_LOC, REST_ROT,
+                                                                  REST_SCA), [(-1, 0, 0, 0), -REST_ROT], atol=1e-12)
+
+        # A negated rest rotation gives the same rotations, negated
+        np.testing.assert_allclose(convert_anm_values_transformed('rotation_quaternion', values, REST_LOC, -REST_ROT,
+                                                                  REST_SCA), [(-1, 0, 0, 0), -REST_ROT], atol=1e-12)
+
+    def test_rotation_quaternion_normalization(self):
+        # Quaternions that are not normalized (such as quantized ones) give normalized rotations
+        values = anm_quaternions([REST_ROT, quat_multiply(REST_ROT, REST_ROT)])
+        np.testing.assert_allclose(convert_anm_values_transformed('rotation_quaternion', values * 0.5, REST_LOC,
+                                                                  REST_ROT * 3, REST_SCA),
+                                   [(1, 0, 0, 0), REST_ROT], atol=1e-12)
+
+    def test_rotation_euler(self):
+        c = s = np.sin(np.pi / 4)
+        values = [(90, 0, 0), (0, 0, 90), (90, 0, 90)]
+        np.testing.assert_allclose(convert_anm_values_transformed('rotation_euler', values, REST_LOC, (1, 0, 0, 0),
+                                                                  REST_SCA),
+                                   [(c, s, 0, 0), (c, 0, 0, s), (0.5, 0.5, -0.5, 0.5)], atol=1e-12)
+
+        # The rest rotation is removed
+        np.testing.assert_allclose(convert_anm_values_transformed('rotation_euler', [(0, 0, 90)], REST_LOC, REST_ROT,
+                                                                  REST_SCA), [(1, 0, 0, 0)], atol=1e-12)
+
+    def test_scale(self):
+        np.testing.assert_allclose(convert_anm_values_transformed('scale', [(-2, 1, 8), (4, -0.5, 4)], REST_LOC,
+                                                                  REST_ROT, REST_SCA), [(1, 2, 2), (2, 1, 1)])
+
+    def test_other(self):
+        values = np.array([(0.25,)])
+        self.assertIs(convert_anm_values_transformed('opacity', values, REST_LOC, REST_ROT, REST_SCA), values)
+
+
+class CurveFormatTest(unittest.TestCase):
+    """Converts curves of every type after reading them from an ANM entry, and checks that the results give back the
+    original bone transforms.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+
+        self.locations = rng.uniform(-1, 1, (8, 3))
+        # Small enough to fit in SCALEI16TBL values once multiplied by the rest scale
+        self.scales = rng.uniform(0.25, 1.5, (8, 3))
+
+        rotations = rng.normal(size=(8, 4))
+        self.rotations = rotations / np.linalg.norm(rotations, axis=1, keepdims=True)
+
+    def test_formats(self):
+        tested = set(LOCATION_FORMATS + SCALE_FORMATS + QUATERNION_FORMATS + EULER_FORMATS + OTHER_FORMATS +
+                     (AnmCurveType.EULERINTERPOLATE,))
+        self.assertEqual(tested, set(ANM_CURVE_FORMATS))
+
+    def test_location(self):
+        # Locations relative to the bone, in meters
+        rest_matrix = quat_to_matrix(REST_ROT)
+        values = (REST_LOC + self.locations @ rest_matrix.T) * 100
+
+        for curve_format in LOCATION_FORMATS:
+            with self.subTest(curve_format=curve_format.name):
+                curve = read_bone_curve(curve_format, LOCATION, values)
+                self.assertEqual(curve.data_path, 'location')
+                np.testing.assert_allclose(frames_to_blender(curve.frames), np.arange(len(values)))
+
+                result = convert_anm_values_transformed(curve.data_path, curve.values, REST_LOC, REST_ROT, REST_SCA)
+                np.testing.assert_allclose(result, self.locations, atol=1e-4)
+
+    def test_scale(self):
+        # Negative scales are made positive
+        values = self.scales * REST_SCA * np.where(np.arange(8) % 2, -1, 1)[:, None]
+
+        for curve_format in SCALE_FORMATS:
+            with self.subTest(curve_format=curve_format.name):
+                curve = read_bone_curve(curve_format, SCALE, values)
+                self.assertEqual(curve.data_path, 'scale')
+
+                result = convert_anm_values_transformed(curve.data_path, curve.values, REST_LOC, REST_ROT, REST_SCA)
+                np.testing.assert_allclose(result, self.scales, atol=1e-3)
+
+    def test_rotation_quaternion(self):
+        # Quantized quaternions are not exactly normalized, but the results must be
+        values = anm_quaternions(quat_multiply(REST_ROT, self.rotations))
+
+        for curve_format in QUATERNION_FORMATS:
+            for sign in (1, -1):
+                with self.subTest(curve_format=curve_format.name, sign=sign):
+                    curve = read_bone_curve(curve_format, ROTATION, values * sign)
+                    self.assertEqual(curve.data_path, 'rotation_quaternion')
+
+                    result = convert_anm_values_transformed(curve.data_path, curve.values, REST_LOC, REST_ROT, REST_SCA)
+                    np.testing.assert_allclose(np.linalg.norm(result, axis=1), 1, atol=1e-6)
+                    np.testing.assert_allclose(result, self.rotations * sign, atol=1e-3)
+
+    def test_rotation_euler(self):
+        for curve_format in EULER_FORMATS:
+            with self.subTest(curve_format=curve_format.name):
+                curve = read_bone_curve(curve_format, ROTATION, [(90, 0, 0), (0, 0, 90)])
+                self.assertEqual(curve.data_path, 'rotation_euler')
+
+                result = convert_anm_values_transformed(curve.data_path, curve.values, REST_LOC, REST_ROT, REST_SCA)
+                c = s = np.sin(np.pi / 4)
+                np.testing.assert_allclose(quat_multiply(REST_ROT, result), [(c, s, 0, 0), (c, 0, 0, s)], atol=1e-6)
+
+    def test_euler_interpolate(self):
+        # The frame is stored in the first value (see anm.create_curve_arrays)
+        curve = read_bone_curve(AnmCurveType.EULERINTERPOLATE, ROTATION, [(0, 90, 0), (100, 0, 90)])
+        self.assertEqual(curve.data_path, 'rotation_euler')
+        np.testing.assert_allclose(frames_to_blender(curve.frames), (0, 1))
+
+    def test_other(self):
+        for curve_format in OTHER_FORMATS:
+            with self.subTest(curve_format=curve_format.name):
+                value_count = ANM_CURVE_FORMATS[curve_format][2]
+                values = np.linspace(0, 0.75, 4 * value_count).reshape(4, value_count)
+
+                curve = read_bone_curve(curve_format, OPACITY, values)
+                self.assertIs(convert_anm_values_transformed(curve.data_path, curve.values, REST_LOC, REST_ROT,
+                                                             REST_SCA), curve.values)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import unittest
+from typing import Dict, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'xfbin_lib'))
+
+from blender.common.mesh_converter import cluster_triangles, split_mesh_arrays
+from xfbin.structure.nud import NudMesh
+
+
+def make_grid_arrays(width: int, seed: int = 0):
+    """Returns the vertex arrays and faces of a grid of width x width quads, with its triangles in a random order."""
+    rng = np.random.default_rng(seed)
+
+    x, y = np.meshgrid(np.arange(width + 1), np.arange(width + 1))
+    vertex_count = (width + 1) ** 2
+
+    arrays = {
+        'position': np.column_stack((x.ravel(), y.ravel(), np.zeros(vertex_count))).astype(np.float32),
+        'normal': np.tile(np.array((0, 0, 1), np.float32), (vertex_count, 1)),
+        'bitangent': None,
+        'tangent': None,
+        'color': rng.integers(0, 256, (vertex_count, 4)).astype(np.int32),
+        'uv': rng.random((vertex_count, 2, 2)).astype(np.float32),
+        'bone_ids': rng.integers(0, 16, (vertex_count, 4)),
+        'bone_weights': rng.random((vertex_count, 4)).astype(np.float32),
+    }
+
+    corners = (np.arange(width)[:, None] * (width + 1) + np.arange(width)).ravel()
+    faces = np.concatenate((np.column_stack((corners, corners + 1, corners + width + 2)),
+                            np.column_stack((corners, corners + width + 2, corners + width + 1))))
+
+    return arrays, faces[rng.permutation(len(faces))]
+
+
+def triangle_attributes(arrays: Dict[str, Optional[np.ndarray]], faces) -> np.ndarray:
+    """Returns the attributes of the 3 corners of each triangle as a row, with the rows sorted."""
+    faces = np.asarray(faces, np.int64)
+    columns = [arrays[name][faces].reshape(len(faces), -1).astype(np.float64)
+               for name in sorted(arrays) if arrays[name] is not None]
+
+    rows = np.concatenate(columns, axis=1)
+    return rows[np.lexsort(rows.T[::-1])]
+
+
+class SplitMeshArraysTest(unittest.TestCase):
+    def check_split(self, arrays, faces, max_vertices: int, max_faces: int):
+        meshes = split_mesh_arrays(arrays, faces, max_vertices, max_faces)
+        self.assertGreater(len(meshes), 1)
+
+        for mesh_arrays, mesh_faces in meshes:
+            vertex_count = len(mesh_arrays['position'])
+            self.assertLessEqual(vertex_count, max_vertices)
+            self.assertLessEqual(len(mesh_faces), max_faces)
+
+            # Every vertex is used, and every array has a row for each vertex
+            self.assertEqual(len(np.unique(mesh_faces)), vertex_count)
+            for name, array in mesh_arrays.items():
+                self.assertEqual(array is None, arrays[name] is None)
+                if array is not None:
+                    self.assertEqual(len(array), vertex_count)
+
+        # Every triangle is in exactly one mesh, with the same corner attributes in the same (winding) order
+        split_faces = sum(len(f) for (_, f) in meshes)
+        self.assertEqual(split_faces, len(faces))
+        split_rows = np.concatenate([triangle_attributes(a, f) for (a, f) in meshes])
+        np.testing.assert_array_equal(split_rows[np.lexsort(split_rows.T[::-1])], triangle_attributes(arrays, faces))
+
+    def test_nud_limits(self):
+        # 40401 vertices and 80000 triangles
+        arrays, faces = make_grid_arrays(200)
+        self.check_split(arrays, faces, NudMesh.MAX_VERTICES, NudMesh.MAX_FACES)
+
+    def test_vertex_limit(self):
+        arrays, faces = make_grid_arrays(16, seed=1)
+        self.check_split(arrays, faces, 40, len(faces))
+
+    def test_face_limit(self):
+        arrays, faces = make_grid_arrays(16, seed=2)
+        self.check_split(arrays, faces, len(arrays['position']), 50)
+
+    def test_small_limits(self):
+        arrays, faces = make_grid_arrays(8, seed=3)
+        self.check_split(arrays, faces, 3, 1)
+
+    def test_within_limits(self):
+        arrays, faces = make_grid_arrays(16)
+
+        meshes = split_mesh_arrays(arrays, faces, NudMesh.MAX_VERTICES, NudMesh.MAX_FACES)
+        self.assertEqual(len(meshes), 1)
+        self.assertIs(meshes[0][0], arrays)
+        np.testing.assert_array_equal(meshes[0][1], faces)
+
+        # Meshes exactly at the limits are not split either
+        meshes = split_mesh_arrays(arrays, faces, len(arrays['position']), len(faces))
+        self.assertIs(meshes[0][0], arrays)
+
+
+class ClusterTrianglesTest(unittest.TestCase):
+    def test_partition(self):
+        arrays, faces = make_grid_arrays(16)
+        clusters = cluster_triangles(faces, arrays['position'], 64, 100)
+
+        np.testing.assert_array_equal(np.sort(np.concatenate(clusters)), np.arange(len(faces)))
+        for triangles in clusters:
+            self.assertLessEqual(len(triangles), 100)
+            self.assertLessEqual(len(np.unique(faces[triangles])), 64)
+
+    def test_empty(self):
+        self.assertEqual(cluster_triangles(np.zeros((0, 3), np.int64), np.zeros((0, 3), np.float32), 3, 1), [])
+
+    def test_invalid_limits(self):
+        arrays, faces = make_grid_arrays(2)
+
+        with self.assertRaises(ValueError):
+            cluster_triangles(faces, arrays['position'], 2, 10)
+        with self.assertRaises(ValueError):
+            cluster_triangles(faces, arrays['position'], 10, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
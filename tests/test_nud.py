@@ -0,0 +1,47 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'xfbin_lib'))
+
+from xfbin.structure.nud import NudMesh
+
+
+def make_mesh() -> NudMesh:
+    mesh = NudMesh()
+    mesh.set_vertex_arrays({
+        'position': np.arange(9, dtype=np.float32).reshape(3, 3),
+        'uv': np.full((3, 1, 2), 0.5, np.float32),
+    })
+    mesh.faces = [(0, 1, 2)]
+
+    return mesh
+
+
+class NudMeshVerticesTest(unittest.TestCase):
+    def test_arrays_modified_in_place(self):
+        mesh = make_mesh()
+        self.assertEqual(mesh.vertices[0].position, (0.0, 1.0, 2.0))
+
+        # The vertices are created from the current arrays every time
+        mesh.positions[0] = (5.0, 5.0, 5.0)
+        self.assertEqual(mesh.vertices[0].position, (5.0, 5.0, 5.0))
+
+    def test_new_list(self):
+        mesh = make_mesh()
+        vertices = mesh.vertices
+        self.assertIsNot(mesh.vertices, vertices)
+
+        # Modifying the list does not change the mesh until it is assigned again
+        vertices[1].position = (7.0, 7.0, 7.0)
+        self.assertEqual(mesh.vertices[1].position, (3.0, 4.0, 5.0))
+
+        mesh.vertices = vertices
+        np.testing.assert_array_equal(mesh.positions[1], (7.0, 7.0, 7.0))
+        self.assertEqual([v.position for v in mesh.vertices], [v.position for v in vertices])
+
+
+if __name__ == '__main__':
+    unittest.main()
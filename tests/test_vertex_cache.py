@@ -0,0 +1,123 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blender.common.vertex_cache import count_cache_misses, get_cache_metrics, optimize_vertex_cache, tipsify
+
+# A strip of 4 triangles over 6 vertices
+STRIP = np.array(((0, 1, 2), (2, 1, 3), (2, 3, 4), (4, 3, 5)))
+
+
+def make_grid(width: int, shuffle: bool, seed: int = 0):
+    """Returns the vertex arrays and faces of a grid of width x width quads, with its triangles in row order or in a
+    random order. Each vertex has a unique position.
+    """
+    x, y = np.meshgrid(np.arange(width + 1), np.arange(width + 1))
+    vertex_count = (width + 1) ** 2
+
+    arrays = {
+        'position': np.column_stack((x.ravel(), y.ravel(), np.zeros(vertex_count))).astype(np.float32),
+        'normal': None,
+        'uv': np.column_stack((x.ravel(), y.ravel())).reshape(-1, 1, 2).astype(np.float32) / width,
+    }
+
+    corners = (np.arange(width)[:, None] * (width + 1) + np.arange(width)).ravel()
+    faces = np.stack((np.column_stack((corners, corners + 1, corners + width + 2)),
+                      np.column_stack((corners, corners + width + 2, corners + width + 1))), axis=1).reshape(-1, 3)
+
+    if shuffle:
+        faces = faces[np.random.default_rng(seed).permutation(len(faces))]
+
+    return arrays, faces
+
+
+class CountCacheMissesTest(unittest.TestCase):
+    def test_strip(self):
+        # Every vertex is only transformed once if the cache holds a triangle
+        self.assertEqual(count_cache_misses(STRIP, 16), 6)
+        self.assertEqual(count_cache_misses(STRIP, 3), 6)
+        self.assertEqual(count_cache_misses(STRIP, 2), 6)
+
+        # Only the last vertex is still cached
+        self.assertEqual(count_cache_misses(STRIP, 1), 10)
+
+    def test_strip_order(self):
+        # Drawing the last triangle second evicts the shared vertices of the middle triangles
+        self.assertEqual(count_cache_misses(STRIP[[0, 3, 1, 2]], 3), 10)
+
+    def test_metrics(self):
+        acmr, atvr = get_cache_metrics(STRIP, 6, 1)
+        self.assertAlmostEqual(acmr, 2.5)
+        self.assertAlmostEqual(atvr, 10 / 6)
+
+        self.assertEqual(get_cache_metrics(np.zeros((0, 3)), 0), (0.0, 0.0))
+
+
+class TipsifyTest(unittest.TestCase):
+    def test_permutation(self):
+        for shuffle in (False, True):
+            _, faces = make_grid(16, shuffle)
+
+            with self.subTest(shuffle=shuffle):
+                order = tipsify(faces, 17 * 17)
+                np.testing.assert_array_equal(np.sort(order), np.arange(len(faces)))
+
+    def test_empty(self):
+        self.assertEqual(len(tipsify(np.zeros((0, 3)), 0)), 0)
+
+    def test_acmr(self):
+        for shuffle in (False, True):
+            for cache_size in (3, 8, 16, 32):
+                _, faces = make_grid(32, shuffle)
+
+                with self.subTest(shuffle=shuffle, cache_size=cache_size):
+                    order = tipsify(faces, 33 * 33, cache_size)
+                    self.assertLessEqual(count_cache_misses(faces[order], cache_size),
+                                         count_cache_misses(faces, cache_size))
+
+
+class OptimizeVertexCacheTest(unittest.TestCase):
+    def test_optimize(self):
+        arrays, faces = make_grid(16, True)
+        new_arrays, new_faces = optimize_vertex_cache(arrays, faces)
+
+        # Each new vertex is one of the old vertices, and each old vertex is used by exactly one new vertex
+        vertex_count = len(arrays['position'])
+        self.assertEqual(len(new_arrays['position']), vertex_count)
+
+        positions = new_arrays['position'].astype(np.int64)
+        old_vertices = positions[:, 1] * 17 + positions[:, 0]
+        np.testing.assert_array_equal(np.sort(old_vertices), np.arange(vertex_count))
+
+        for name, array in arrays.items():
+            if array is None:
+                self.assertIsNone(new_arrays[name])
+            else:
+                np.testing.assert_array_equal(new_arrays[name], array[old_vertices])
+
+        # Vertices are numbered in order of their first use
+        _, first = np.unique(new_faces.ravel(), return_index=True)
+        np.testing.assert_array_equal(np.argsort(first), np.arange(vertex_count))
+
+        # The triangles are the same, with the same winding
+        def sorted_triangles(triangles):
+            return triangles[np.lexsort(triangles.T[::-1])]
+
+        np.testing.assert_array_equal(sorted_triangles(old_vertices[new_faces]), sorted_triangles(faces))
+
+        self.assertLessEqual(count_cache_misses(new_faces), count_cache_misses(faces))
+
+    def test_empty(self):
+        arrays, _ = make_grid(1, False)
+        new_arrays, new_faces = optimize_vertex_cache(arrays, np.zeros((0, 3), np.int64))
+
+        self.assertIs(new_arrays, arrays)
+        self.assertEqual(len(new_faces), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
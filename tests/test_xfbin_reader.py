@@ -0,0 +1,146 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'xfbin_lib'))
+
+from xfbin import (NuccChunkBillboard, Page, Xfbin, open_xfbin, read_xfbin, read_xfbin_chunk, read_xfbin_index,
+                   write_xfbin)
+from xfbin.structure.br.br_xfbin import BrXfbin
+from xfbin.util import BinaryReader, Endian
+
+
+def make_xfbin(page_count: int = 2) -> bytes:
+    """Returns an XFBIN with the given number of pages, each containing billboard chunks, which do not set their
+    chunks when they are initialized.
+    """
+    xfbin = Xfbin()
+
+    for page_index in range(page_count):
+        page = Page()
+        for chunk_index in range(2):
+            chunk = NuccChunkBillboard(f'c/test/page{page_index}.max', f'billboard{page_index}_{chunk_index}')
+            chunk.set_data(bytes(range(page_index, page_index + 16)), [chunk])
+            page.add_chunk(chunk)
+
+        xfbin.pages.append(page)
+
+    return bytes(write_xfbin(xfbin))
+
+
+def read_page_headers(data) -> list:
+    with BinaryReader(data, Endian.BIG, 'cp932', readonly=True) as br:
+        br_xfbin: BrXfbin = br.read_struct(BrXfbin)
+
+    return [bytes(br_page.pageChunk.data) for br_page in br_xfbin.pages]
+
+
+class OpenXfbinTest(unittest.TestCase):
+    def setUp(self):
+        self.data = make_xfbin()
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+        self.path = os.path.join(self.temp_dir.name, 'test.xfbin')
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+
+    def test_lazy_round_trip(self):
+        with open_xfbin(self.path) as xfbin:
+            lazy_data = bytes(write_xfbin(xfbin))
+
+        eager_data = bytes(write_xfbin(read_xfbin(self.data)))
+
+        self.assertEqual(read_page_headers(lazy_data), read_page_headers(self.data))
+        self.assertEqual(read_page_headers(lazy_data), read_page_headers(eager_data))
+        self.assertEqual(lazy_data, eager_data)
+
+    def test_lazy_chunks(self):
+        eager = read_xfbin(self.data)
+
+        for lazy in (True, False):
+            with open_xfbin(self.path, lazy) as xfbin:
+                self.assertEqual([[(c.type, c.name, bytes(c.data)) for c in page] for page in xfbin],
+                                 [[(c.type, c.name, bytes(c.data)) for c in page] for page in eager])
+
+    def test_close(self):
+        for lazy in (True, False):
+            with open_xfbin(self.path, lazy) as xfbin:
+                file_map = xfbin.file_map
+                write_xfbin(xfbin)
+
+            self.assertTrue(file_map.closed)
+            self.assertEqual(len(xfbin.pages), 0)
+
+            # The file can be replaced after closing it
+            os.remove(self.path)
+            with open(self.path, 'wb') as f:
+                f.write(self.data)
+
+
+def write_chunk(chunk) -> bytes:
+    """Returns an XFBIN with a single page that contains only the given chunk."""
+    xfbin = Xfbin()
+    page = Page()
+    page.add_chunk(chunk)
+    xfbin.pages.append(page)
+
+    return bytes(write_xfbin(xfbin))
+
+
+class ReadXfbinChunkTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+        self.path = os.path.join(self.temp_dir.name, 'test.xfbin')
+        self.write_file(make_xfbin())
+
+    def write_file(self, data: bytes, time_ns: int = 1_000_000_000_000_000_000):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+        # Set the modification time explicitly, as rewriting the file may not change it on every file system
+        os.utime(self.path, ns=(time_ns, time_ns))
+
+    def test_read_chunk(self):
+        eager = read_xfbin(self.path)
+
+        for chunk in (c for page in eager for c in page):
+            if chunk.type in ('nuccChunkNull', 'nuccChunkPage'):
+                continue
+
+            self.assertEqual(write_chunk(read_xfbin_chunk(self.path, chunk.name, chunk.type)), write_chunk(chunk))
+
+        self.assertIsNone(read_xfbin_chunk(self.path, 'missing'))
+
+    def test_sidecar(self):
+        index = read_xfbin_index(self.path)
+        index_path = self.path + '.idx'
+        self.assertTrue(os.path.isfile(index_path))
+
+        # Reading the index again should load the sidecar instead of writing it again
+        os.utime(index_path, ns=(0, 0))
+        self.assertEqual([(e.name, e.hash) for e in read_xfbin_index(self.path).entries],
+                         [(e.name, e.hash) for e in index.entries])
+        self.assertEqual(os.stat(index_path).st_mtime_ns, 0)
+
+        # Changing the file should create the index again
+        self.write_file(make_xfbin(3), 2_000_000_000_000_000_000)
+        index = read_xfbin_index(self.path)
+        self.assertNotEqual(os.stat(index_path).st_mtime_ns, 0)
+        self.assertEqual(len(index.pages), 3)
+        self.assertIsNotNone(read_xfbin_chunk(self.path, 'billboard2_0'))
+
+        # A corrupted sidecar should be replaced
+        with open(index_path, 'wb') as f:
+            f.write(b'corrupted')
+
+        self.assertEqual(len(read_xfbin_index(self.path).pages), 3)
+        self.assertEqual(len(read_xfbin_index(self.path, False).pages), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'xfbin_lib'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'xfbin_lib', 'benchmarks'))
+
+from synthetic import BONE_TYPES, VERTEX_TYPES, make_clump
+from xfbin import NuccChunkClump, NuccChunkCoord, NuccChunkTexture, Xfbin, read_xfbin, write_xfbin
+from xfbin.structure.nucc import CoordNode, MaterialTextureGroup
+
+
+def make_xfbin() -> bytes:
+    """Returns an XFBIN with a clump page, which has coords, models, and a material with an empty texture group."""
+    clump = make_clump('c/test/clump.max', 'clump', [(VERTEX_TYPES[1], BONE_TYPES[1])] * 2, 64, bone_count=4)
+
+    group = MaterialTextureGroup()
+    group.unk = 0
+    group.texture_chunks = list()
+    clump.model_chunks[0].material_chunks[0].texture_groups.append(group)
+
+    xfbin = Xfbin()
+    xfbin.add_clump_page(clump)
+
+    return bytes(write_xfbin(xfbin))
+
+
+class IncrementalWriteTest(unittest.TestCase):
+    def setUp(self):
+        self.data = make_xfbin()
+        self.xfbin = read_xfbin(self.data)
+        self.clump: NuccChunkClump = self.xfbin.pages[0].get_chunks_by_type('nuccChunkClump')[0]
+
+    def check_modified(self):
+        """Checks that the incremental write gives the same XFBIN as a full write, and that it changed."""
+        self.assertTrue(self.xfbin.pages[0].is_modified())
+
+        data = bytes(write_xfbin(self.xfbin, incremental=True))
+        self.assertEqual(data, bytes(write_xfbin(self.xfbin)))
+        self.assertNotEqual(data, self.data)
+
+    def test_unmodified(self):
+        self.assertFalse(any(page.is_modified() for page in self.xfbin.pages))
+        self.assertEqual(bytes(write_xfbin(self.xfbin, incremental=True)), self.data)
+
+    def test_coord(self):
+        self.clump.coord_chunks[1].node.position = (1.0, 2.0, 3.0)
+        self.check_modified()
+
+    def test_coord_copy_from(self):
+        new_coord = NuccChunkCoord('c/test/clump.max', 'new_coord')
+        new_coord.node = CoordNode(new_coord)
+        new_coord.node.scale = (2.0,) * 3
+
+        self.clump.coord_chunks[2].node.copy_from(new_coord.node)
+        self.check_modified()
+
+    def test_clump(self):
+        self.clump.model_chunks.reverse()
+        self.check_modified()
+
+    def test_material(self):
+        material = self.clump.model_chunks[0].material_chunks[0]
+        material.texture_groups[0].unk = 1
+        self.check_modified()
+
+    def test_model(self):
+        mesh = self.clump.model_chunks[0].nud.mesh_groups[0].meshes[0]
+        mesh.positions[0] += 1.0
+        self.check_modified()
+
+    def test_model_nud(self):
+        first, second = self.clump.model_chunks[:2]
+        first.nud.mesh_groups = second.nud.mesh_groups
+        self.check_modified()
+
+    def test_new_reference(self):
+        # The material now references a chunk that is not in the page's chunk maps
+        material = self.clump.model_chunks[0].material_chunks[0]
+        material.texture_groups[0].texture_chunks.append(NuccChunkTexture('c/test/texture.max', 'texture'))
+        self.assertTrue(self.xfbin.pages[0].is_modified())
+
+
+if __name__ == '__main__':
+    unittest.main()
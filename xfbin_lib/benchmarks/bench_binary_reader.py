@@ -0,0 +1,136 @@
+"""Microbenchmark for the per-call overhead of BinaryReader reads and writes.
+
+Compares the compiled struct cache used by BinaryReader against building the format string on every call
+(which is what BinaryReader did before the cache was added), and against the composite record methods.
+
+Usage (from the xfbin_lib folder):
+    python benchmarks/bench_binary_reader.py [-n COUNT]
+"""
+
+import os
+import struct
+import sys
+from argparse import ArgumentParser
+from timeit import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xfbin.util import BinaryReader, Endian
+from xfbin.util.binary_reader.binary_reader.binary_reader import FMT
+
+
+class UncachedReader:
+    # Same as BinaryReader's read/write methods before the struct cache was added,
+    # which built the format string and let struct parse it on every call
+    def __init__(self, buffer=bytearray()):
+        self.buf = bytearray(buffer)
+        self.idx = 0
+        self.endianness = '>'
+
+    def read_type(self, format: str, count=1):
+        i = self.idx
+        size = FMT[format] * count
+        self.idx += size
+
+        if self.idx > len(self.buf):
+            raise ValueError('Cannot read farther than buffer length.')
+
+        return struct.unpack_from(f'{self.endianness}{count}{format}', self.buf, i)
+
+    def write_type(self, format: str, value, is_iterable: bool = False):
+        i = self.idx
+        count = len(value) if is_iterable else 1
+        size = FMT[format] * count
+
+        if i + size > len(self.buf):
+            self.buf.extend(b'\x00' * (i + size - len(self.buf)))
+        self.idx += size
+
+        if is_iterable:
+            struct.pack_into(f'{self.endianness}{count}{format}', self.buf, i, *value)
+        else:
+            struct.pack_into(f'{self.endianness}{count}{format}', self.buf, i, value)
+
+    def read_int32(self, count=None):
+        if count is not None:
+            return self.read_type('i', count)
+        return self.read_type('i')[0]
+
+    def read_float(self, count=None):
+        if count is not None:
+            return self.read_type('f', count)
+        return self.read_type('f')[0]
+
+    def write_int32(self, value):
+        self.write_type('i', value, BinaryReader.is_iterable(value))
+
+    def write_float(self, value):
+        self.write_type('f', value, BinaryReader.is_iterable(value))
+
+
+def read_uncached(buf: bytes, count: int):
+    br = UncachedReader(buf)
+    for _ in range(count):
+        br.read_int32()
+        br.read_float(3)
+
+
+def read_cached(buf: bytes, count: int):
+    br = BinaryReader(buf, Endian.BIG, readonly=True)
+    for _ in range(count):
+        br.read_int32()
+        br.read_float(3)
+
+
+def read_record(buf: bytes, count: int):
+    br = BinaryReader(buf, Endian.BIG, readonly=True)
+    for _ in range(count):
+        br.read_format('i3f')
+
+
+def write_uncached(count: int):
+    br = UncachedReader()
+    for _ in range(count):
+        br.write_int32(1)
+        br.write_float((1.0, 2.0, 3.0))
+
+
+def write_cached(count: int):
+    br = BinaryReader(endianness=Endian.BIG)
+    for _ in range(count):
+        br.write_int32(1)
+        br.write_float((1.0, 2.0, 3.0))
+
+
+def write_record(count: int):
+    br = BinaryReader(endianness=Endian.BIG)
+    for _ in range(count):
+        br.write_format('i3f', (1, 1.0, 2.0, 3.0))
+
+
+def main():
+    parser = ArgumentParser(description='Measures the per-call overhead of BinaryReader.')
+    parser.add_argument('-n', '--count', type=int, default=100000, help='number of "i3f" records to read and write')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of runs to take the best time of')
+    args = parser.parse_args()
+
+    buf = bytes(args.count * 16)
+
+    cases = [
+        ('read, format string per call', lambda: read_uncached(buf, args.count), 2),
+        ('read, cached structs', lambda: read_cached(buf, args.count), 2),
+        ('read, composite record', lambda: read_record(buf, args.count), 1),
+        ('write, format string per call', lambda: write_uncached(args.count), 2),
+        ('write, cached structs', lambda: write_cached(args.count), 2),
+        ('write, composite record', lambda: write_record(args.count), 1),
+    ]
+
+    print(f'{args.count} records of "i3f" (best of {args.repeat})')
+    for name, func, calls in cases:
+        best = min(timeit(func, number=1) for _ in range(args.repeat))
+        per_call = best / (args.count * calls) * 1e9
+        print(f'{name:<32} {best * 1000:8.2f} ms {per_call:8.1f} ns/call')
+
+
+if __name__ == '__main__':
+    main()
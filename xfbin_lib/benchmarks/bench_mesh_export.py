@@ -0,0 +1,190 @@
+"""Benchmark for creating NUD mesh vertices from the attributes of a Blender mesh.
+
+Compares the array functions in blender/common/mesh_converter.py (used by the exporter since it reads the mesh with
+foreach_get) against the per-loop NudVertex and IterativeDict loop that XfbinExporter.make_models used before, and
+measures splitting the resulting mesh into meshes within the NUD vertex and face limits.
+
+The mesh is a synthetic grid of quads with smooth normals, continuous UVs and random vertex group weights, so Blender
+is not needed. The attributes are given to both versions as arrays, so only the vertex building, bone weight selection
+and deduplication are measured. The bone weight selection is also measured on its own, for the mesh and for a mesh
+where most vertices are in more than 4 bone groups.
+
+Usage (from the xfbin_lib folder):
+    python benchmarks/bench_mesh_export.py [-w WIDTH] [-g GROUPS] [--max-vertices COUNT] [--max-faces COUNT]
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from timeit import timeit
+from typing import Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from blender.common.mesh_converter import make_mesh_arrays, select_bone_weights, split_mesh_arrays
+from xfbin.structure.nud import NudMesh, NudVertex, create_vertex_arrays
+from xfbin.util.iterative_dict import IterativeDict
+
+
+def make_grid_mesh(width: int, groups: int, seed: int = 0, group_range: Tuple[int, int] = (1, 6)) -> dict:
+    """Returns the arrays of a (width x width) grid of quads, laid out the way foreach_get returns them.
+    Each vertex is in a random number of vertex groups within group_range.
+    """
+    rng = np.random.default_rng(seed)
+
+    x, y = np.meshgrid(np.linspace(-1, 1, width + 1), np.linspace(-1, 1, width + 1))
+    positions = np.stack((x.ravel(), y.ravel(), np.sin(x * 3).ravel() * 0.1), axis=1).astype(np.float32)
+    vertex_count = len(positions)
+
+    # Each quad has its own 4 loops, split into 2 triangles
+    corner = (np.arange(width)[None, :] + np.arange(width)[:, None] * (width + 1)).ravel()
+    loop_vertices = np.stack((corner, corner + 1, corner + width + 2, corner + width + 1), axis=1).ravel()
+    quad_loops = np.arange(len(loop_vertices)).reshape(-1, 4)
+    triangle_loops = np.concatenate((quad_loops[:, [0, 1, 2]], quad_loops[:, [0, 2, 3]]), axis=1).reshape(-1, 3)
+
+    normals = rng.normal(size=(vertex_count, 3)).astype(np.float32)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    tangents = np.cross(normals, (0, 0, 1)).astype(np.float32)
+    bitangents = np.cross(normals, tangents) * np.float32(-1)
+    colors = rng.integers(0, 256, (vertex_count, 4), np.int32)
+    uvs = np.stack((positions[:, :2], positions[:, 1::-1]), axis=1) * np.float32(0.5) + np.float32(0.5)
+
+    # Vertex groups of each vertex, some of which are not bones
+    group_counts = rng.integers(min(groups, group_range[0]), min(groups, group_range[1]) + 1, vertex_count)
+    group_vertices = np.repeat(np.arange(vertex_count), group_counts)
+    group_indices = np.concatenate([rng.choice(groups, c, replace=False) for c in group_counts])
+    group_weights = rng.random(len(group_indices)).astype(np.float32)
+    group_bones = np.where(np.arange(groups) % 8 == 7, -1, np.arange(groups))
+
+    return {
+        'triangle_loops': triangle_loops,
+        'loop_vertices': loop_vertices,
+        'positions': positions,
+        'normals': normals[loop_vertices],
+        'tangents': tangents[loop_vertices],
+        'bitangents': bitangents[loop_vertices],
+        'colors': colors[loop_vertices],
+        'uvs': uvs[loop_vertices],
+        'groups': (group_vertices, group_indices, group_weights),
+        'group_bones': group_bones,
+    }
+
+
+def make_vertices_legacy(mesh: dict):
+    # Same as XfbinExporter.make_models before it used arrays, with the Blender mesh attributes as lists
+    loop_vertices = mesh['loop_vertices'].tolist()
+    positions = list(map(tuple, mesh['positions'].tolist()))
+    normals = list(map(tuple, mesh['normals'].tolist()))
+    tangents = list(map(tuple, mesh['tangents'].tolist()))
+    bitangents = list(map(tuple, mesh['bitangents'].tolist()))
+    colors = mesh['colors'].tolist()
+    uvs = [list(map(tuple, uv)) for uv in mesh['uvs'].tolist()]
+    group_bones = mesh['group_bones'].tolist()
+
+    vertex_groups = [list() for _ in positions]
+    for v, g, w in zip(*(a.tolist() for a in mesh['groups'])):
+        vertex_groups[v].append((g, w))
+
+    vertices = list()
+    for tri_loops in mesh['triangle_loops'].tolist():
+        verts = list()
+        vertices.append(verts)
+
+        for l_index in tri_loops:
+            v_index = loop_vertices[l_index]
+
+            vert = NudVertex()
+            verts.append(vert)
+
+            vert.position = positions[v_index]
+            vert.normal = normals[l_index]
+            vert.tangent = tangents[l_index]
+            vert.bitangent = bitangents[l_index]
+            vert.color = colors[l_index]
+            vert.uv = uvs[l_index]
+
+            b_weights = [(group_bones[g], w) for (g, w) in sorted(
+                vertex_groups[v_index], key=lambda g: 1 - g[1]) if group_bones[g] != -1]
+            if len(b_weights) > 4:
+                b_weights = b_weights[:4]
+            elif len(b_weights) < 4:
+                b_weights += [(0, 0.0)] * (4 - len(b_weights))
+
+            weight_sum = sum(weight for (_, weight) in b_weights)
+            if weight_sum > 0.0:
+                vert.bone_ids = [bw[0] for bw in b_weights]
+                vert.bone_weights = [bw[1] / weight_sum for bw in b_weights]
+            else:
+                vert.bone_ids = [0] * 4
+                vert.bone_weights = [0] * 3 + [1]
+
+    vertices_dict = IterativeDict()
+    vertices_dict_get = vertices_dict.get_or_next
+
+    faces = [[vertices_dict_get(x) for x in verts] for verts in vertices]
+
+    return list(vertices_dict), faces
+
+
+def select_mesh_bone_weights(mesh: dict):
+    return select_bone_weights(*mesh['groups'], len(mesh['positions']), mesh['group_bones'])
+
+
+def make_vertices_arrays(mesh: dict):
+    bone_ids, bone_weights = select_mesh_bone_weights(mesh)
+
+    return make_mesh_arrays(mesh['triangle_loops'], mesh['loop_vertices'], mesh['positions'], mesh['normals'],
+                            mesh['tangents'], mesh['bitangents'], mesh['colors'], mesh['uvs'], bone_ids, bone_weights)
+
+
+def main():
+    parser = ArgumentParser(description='Measures the speed of creating NUD mesh vertices from Blender mesh attributes.')
+    parser.add_argument('-w', '--width', type=int, default=128, help='number of quads in each row and column of the grid')
+    parser.add_argument('-g', '--groups', type=int, default=64, help='number of vertex groups')
+    parser.add_argument('--max-vertices', type=int, default=NudMesh.MAX_VERTICES, help='vertex limit of split meshes')
+    parser.add_argument('--max-faces', type=int, default=NudMesh.MAX_FACES, help='face limit of split meshes')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of runs to take the best time of')
+    args = parser.parse_args()
+
+    mesh = make_grid_mesh(args.width, args.groups)
+
+    # Most vertices are in more than 4 bone groups, so the top 4 have to be selected
+    dense_mesh = make_grid_mesh(args.width, args.groups, group_range=(5, 8))
+
+    for m in (mesh, dense_mesh):
+        legacy_vertices, legacy_faces = make_vertices_legacy(m)
+        arrays, faces = make_vertices_arrays(m)
+        legacy_arrays = create_vertex_arrays(legacy_vertices)
+
+        if faces.tolist() != legacy_faces or any(not np.allclose(arrays[k], legacy_arrays[k]) for k in legacy_arrays):
+            raise Exception('Array vertices do not match the legacy vertices.')
+
+    legacy_vertices, _ = make_vertices_legacy(mesh)
+    arrays, faces = make_vertices_arrays(mesh)
+
+    cases = [
+        ('per-loop NudVertex', lambda: make_vertices_legacy(mesh)),
+        ('arrays', lambda: make_vertices_arrays(mesh)),
+        ('bone weights', lambda: select_mesh_bone_weights(mesh)),
+        ('bone weights, 5-8 groups', lambda: select_mesh_bone_weights(dense_mesh)),
+        ('split', lambda: split_mesh_arrays(arrays, faces, args.max_vertices, args.max_faces)),
+    ]
+
+    print(f'{len(mesh["triangle_loops"])} triangles, {len(mesh["loop_vertices"])} loops, '
+          f'{len(legacy_vertices)} vertices (best of {args.repeat})')
+    for name, func in cases:
+        best = min(timeit(func, number=1) for _ in range(args.repeat))
+        print(f'{name:<30} {best * 1000:8.2f} ms')
+
+    split_meshes = split_mesh_arrays(arrays, faces, args.max_vertices, args.max_faces)
+    split_vertex_count = sum(len(a['position']) for (a, _) in split_meshes)
+
+    print(f'split into {len(split_meshes)} meshes (limits: {args.max_vertices} vertices, {args.max_faces} faces) with '
+          f'{split_vertex_count} vertices ({split_vertex_count / len(arrays["position"]) - 1:+.1%})')
+
+
+if __name__ == '__main__':
+    main()
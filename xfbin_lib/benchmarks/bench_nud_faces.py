@@ -0,0 +1,125 @@
+"""Benchmark for decoding and encoding NUD triangle strips.
+
+Compares the vectorised strip functions used by NudMesh and BrNudMesh against the per-index loop that
+NudMesh.add_faces used before, and the per-triangle strips that BrNudMesh wrote before.
+
+The strips are generated from grid meshes with one strip per row, which is how most NUD meshes are stripped.
+
+Usage (from the xfbin_lib folder):
+    python benchmarks/bench_nud_faces.py [-w WIDTH] [-t TRIANGLES]
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from timeit import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xfbin.structure.br.br_nud import decode_triangle_strips, encode_triangle_strips
+from xfbin.util import BinaryReader, Endian
+
+
+def make_grid_strips(width: int, triangles: int) -> np.ndarray:
+    # Each row of the grid is a strip of (width * 2) triangles, separated by -1
+    rows = max(1, triangles // (width * 2))
+    strips = list()
+
+    for row in range(rows):
+        top = np.arange(width + 1) + row * (width + 1)
+        strip = np.empty((width + 1) * 2, np.int16)
+        strip[0::2] = top + (width + 1)
+        strip[1::2] = top
+        strips.append(strip)
+        strips.append(np.array([-1], np.int16))
+
+    return np.concatenate(strips[:-1])
+
+
+def decode_legacy(indices: tuple) -> list:
+    # Same as NudMesh.add_faces before it was vectorised
+    faces = iter(indices)
+    triangles = list()
+
+    start_dir = 1
+    f1 = next(faces)
+    f2 = next(faces)
+    face_dir = start_dir
+
+    try:
+        while True:
+            f3 = next(faces)
+
+            if f3 == -1:
+                f1 = next(faces)
+                f2 = next(faces)
+                face_dir = start_dir
+            else:
+                face_dir = -face_dir
+
+                if f1 != f2 != f3:
+                    if face_dir > 0:
+                        triangles.append((f3, f2, f1))
+                    else:
+                        triangles.append((f2, f3, f1))
+                f1 = f2
+                f2 = f3
+    except StopIteration:
+        pass
+
+    return triangles
+
+
+def encode_legacy(faces: list) -> bytes:
+    # Same as BrNudMesh.__br_write__ before it was vectorised, which wrote each triangle as a separate strip
+    br = BinaryReader(endianness=Endian.BIG)
+
+    for face in faces[:-1]:
+        br.write_int16((face[2], face[0], face[1]))
+        br.write_int16(-1)
+
+    br.write_int16((faces[-1][2], faces[-1][0], faces[-1][1]))
+
+    return br.buffer()
+
+
+def encode_vectorised(faces: np.ndarray) -> bytes:
+    return encode_triangle_strips(faces).astype('>u2').tobytes()
+
+
+def main():
+    parser = ArgumentParser(description='Measures the speed of decoding and encoding NUD triangle strips.')
+    parser.add_argument('-w', '--width', type=int, default=32, help='number of quads in each strip')
+    parser.add_argument('-t', '--triangles', type=int, default=16000, help='number of triangles in the mesh')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of runs to take the best time of')
+    args = parser.parse_args()
+
+    strips = make_grid_strips(args.width, args.triangles)
+    strip_tuple = tuple(strips.tolist())
+
+    legacy_faces = decode_legacy(strip_tuple)
+    faces = decode_triangle_strips(strips)
+
+    if faces.tolist() != [list(f) for f in legacy_faces]:
+        raise Exception('Vectorised decoder does not match the legacy decoder.')
+
+    cases = [
+        ('decode, per-index loop', lambda: decode_legacy(strip_tuple)),
+        ('decode, vectorised', lambda: decode_triangle_strips(strips)),
+        ('encode, per-triangle strips', lambda: encode_legacy(legacy_faces)),
+        ('encode, vectorised', lambda: encode_vectorised(faces)),
+    ]
+
+    print(f'{len(faces)} triangles in strips of {args.width * 2} triangles (best of {args.repeat})')
+    for name, func in cases:
+        best = min(timeit(func, number=1) for _ in range(args.repeat))
+        print(f'{name:<30} {best * 1000:8.2f} ms')
+
+    print(f'encoded size: {len(encode_legacy(legacy_faces))} bytes as per-triangle strips, '
+          f'{len(encode_vectorised(faces))} bytes as joined strips')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark for the vertex cache optimization of exported NUD meshes.
+
+Measures the time of reordering a mesh with tipsify (blender/common/vertex_cache.py), and its average cache miss ratio
+(ACMR) and average transform to vertex ratio (ATVR) before and after, for several orders of the same triangles:
+    grid       rows of quads, the order of a mesh made in Blender
+    shuffled   random order, the worst case
+    split      the order of the meshes made by split_mesh_arrays, which the exporter optimizes
+
+The mesh is the synthetic grid from bench_mesh_export.py, so Blender is not needed.
+
+Usage (from the xfbin_lib folder):
+    python benchmarks/bench_vertex_cache.py [-w WIDTH] [-c CACHE_SIZE ...]
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from timeit import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from bench_mesh_export import make_grid_mesh
+from blender.common.mesh_converter import make_mesh_arrays, split_mesh_arrays
+from blender.common.vertex_cache import DEFAULT_CACHE_SIZE, get_cache_metrics, optimize_vertex_cache
+from xfbin.structure.nud import NudMesh
+
+
+def main():
+    parser = ArgumentParser(description='Measures the vertex cache optimization of NUD meshes.')
+    parser.add_argument('-w', '--width', type=int, default=128, help='number of quads in each row and column of the grid')
+    parser.add_argument('-c', '--cache-size', type=int, nargs='+', default=[DEFAULT_CACHE_SIZE],
+                        help=f'sizes of the simulated FIFO cache (default: {DEFAULT_CACHE_SIZE})')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of runs to take the best time of')
+    args = parser.parse_args()
+
+    mesh = make_grid_mesh(args.width, 1)
+    arrays, faces = make_mesh_arrays(mesh['triangle_loops'], mesh['loop_vertices'], mesh['positions'],
+                                     mesh['normals'], uvs=mesh['uvs'])
+
+    rng = np.random.default_rng(0)
+    shuffled = faces[rng.permutation(len(faces))]
+
+    orders = {
+        'grid': [(arrays, faces)],
+        'shuffled': [(arrays, shuffled)],
+        'split': split_mesh_arrays(arrays, shuffled, NudMesh.MAX_VERTICES, NudMesh.MAX_FACES),
+    }
+
+    print(f'{len(faces)} triangles, {len(arrays["position"])} vertices (best of {args.repeat})')
+    for cache_size in args.cache_size:
+        print(f'cache size {cache_size}:')
+
+        for name, meshes in orders.items():
+            best = min(timeit(lambda: [optimize_vertex_cache(a, f, cache_size) for (a, f) in meshes], number=1)
+                       for _ in range(args.repeat))
+
+            optimized = [optimize_vertex_cache(a, f, cache_size) for (a, f) in meshes]
+            before = [get_cache_metrics(f, len(a['position']), cache_size) for (a, f) in meshes]
+            after = [get_cache_metrics(f, len(a['position']), cache_size) for (a, f) in optimized]
+
+            # Average the metrics of the meshes, weighted by their triangle and vertex counts
+            face_counts = [len(f) for (_, f) in meshes]
+            vertex_counts = [len(a['position']) for (a, _) in meshes]
+
+            def average(metrics, index, weights):
+                return np.average([m[index] for m in metrics], weights=weights)
+
+            print(f'  {name:<10} {best * 1000:8.2f} ms  '
+                  f'ACMR {average(before, 0, face_counts):.3f} -> {average(after, 0, face_counts):.3f}  '
+                  f'ATVR {average(before, 1, vertex_counts):.3f} -> {average(after, 1, vertex_counts):.3f}')
+
+
+if __name__ == '__main__':
+    main()
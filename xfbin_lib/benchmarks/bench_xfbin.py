@@ -0,0 +1,288 @@
+"""Benchmark suite for reading and writing XFBINs.
+
+Each scenario is a synthetic XFBIN made by the generators in synthetic.py (no game files or Blender are needed):
+    nud       models with every NUD vertex type and bone type
+    nut       textures with full mipmap chains
+    anm       a long animation with every supported curve format
+    archive   many pages of small clumps, textures and animations
+
+Before measuring, each scenario is checked to be written the same way after reading it lazily with open_xfbin as after
+reading it with read_xfbin, by comparing the page headers of both written files (and reading them again), and that the
+first chunk of each type is written the same way after reading it through the index with read_xfbin_chunk.
+
+For each scenario, the best time of several runs is measured for read_xfbin, write_xfbin, and a round trip (read then
+write), along with the time spent decoding each chunk type and the peak memory (traced with tracemalloc, in separate runs)
+of reading and writing.
+
+Results can be saved as a baseline and compared against later, which reports the change of each time and exits with
+status 1 if any of them got slower by more than the threshold.
+
+Usage (from the xfbin_lib folder):
+    python benchmarks/bench_xfbin.py [SCENARIO ...] [--scale SCALE] [--save [PATH]] [--compare [PATH]]
+"""
+
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import SCENARIOS
+from xfbin import Page, Xfbin, open_xfbin, read_xfbin, read_xfbin_chunk, write_xfbin
+from xfbin.structure.br.br_xfbin import BrXfbin
+from xfbin.structure.nucc import NuccChunk
+from xfbin.structure.xfbin import ChunkReference
+from xfbin.util import BinaryReader, Endian
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Times that are compared against the baseline (the decode times of each chunk type are compared too)
+TIME_METRICS = ('read', 'write', 'round_trip')
+
+# Times shorter than this (in seconds) are too noisy to count as regressions
+MIN_COMPARED_TIME = 0.001
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    """Returns the peak size in bytes of the memory allocated while running func (including NumPy arrays)."""
+    tracemalloc.start()
+
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def time_chunk_decoding(data) -> Dict[str, Tuple[float, int]]:
+    """Decodes every chunk of an XFBIN the same way read_xfbin does, and returns the total time and size of the chunks
+    of each type.
+    """
+    with BinaryReader(data, Endian.BIG, 'cp932', readonly=True) as br:
+        br_xfbin: BrXfbin = br.read_struct(BrXfbin, None, True)
+
+    table = br_xfbin.chunkTable
+    chunks: List[NuccChunk] = [NuccChunk.create_from_nucc_type(*table.get_props_from_chunk_map(m)) for m in table.chunkMaps]
+
+    results = dict()
+    for br_page in br_xfbin.pages:
+        initial_chunks = [chunks[i] for i in br_page.pageChunkIndices]
+        references = [ChunkReference(table.chunkNames[r.chunkNameIndex], chunks[r.chunkMapIndex])
+                      for r in br_page.pageChunkReferences]
+
+        for index, br_chunk in br_page.brChunks.items():
+            chunk = chunks[br_page.pageChunkIndices[index]]
+
+            start = perf_counter()
+            br_nucc_chunk = br_page.chunksDict.get(index) or table.get_br_nucc_chunk(br_chunk, br_page.pageStart)
+            chunk.init_data(br_nucc_chunk, chunks, br_page.pageChunkIndices, references, initial_chunks)
+            elapsed = perf_counter() - start
+
+            chunk_type = NuccChunk.get_nucc_str_from_type(type(chunk))
+            total, size = results.get(chunk_type, (0.0, 0))
+            results[chunk_type] = (total + elapsed, size + br_chunk.size)
+
+    return results
+
+
+def read_page_headers(data) -> List[bytes]:
+    """Returns the data of the page chunk of each page of an XFBIN (its chunk map index and reference counts)."""
+    with BinaryReader(data, Endian.BIG, 'cp932', readonly=True) as br:
+        br_xfbin: BrXfbin = br.read_struct(BrXfbin)
+
+    return [bytes(br_page.pageChunk.data) for br_page in br_xfbin.pages]
+
+
+def write_chunk(chunk: NuccChunk) -> bytes:
+    """Returns an XFBIN with a single page that contains only the given chunk."""
+    xfbin = Xfbin()
+    page = Page()
+    page.add_chunk(chunk)
+    xfbin.pages.append(page)
+
+    return bytes(write_xfbin(xfbin))
+
+
+def check_lazy_round_trip(data: bytes):
+    """Raises an exception if writing an XFBIN after reading it with open_xfbin gives different page headers than
+    writing it after reading it with read_xfbin, or than the original XFBIN, or if the first chunk of each type is
+    written differently after reading it with read_xfbin_chunk than after reading it with read_xfbin.
+    """
+    eager = read_xfbin(data)
+    first_chunks = dict()
+    for chunk in (c for page in eager for c in page):
+        first_chunks.setdefault(chunk.type, chunk)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'scenario.xfbin')
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        # Close the file before it is deleted with the directory
+        with open_xfbin(path) as lazy:
+            lazy_data = bytes(write_xfbin(lazy))
+
+        for chunk_type, chunk in first_chunks.items():
+            if chunk_type in ('nuccChunkNull', 'nuccChunkPage'):
+                continue
+
+            if write_chunk(read_xfbin_chunk(path, chunk.name, chunk_type)) != write_chunk(chunk):
+                raise Exception(f'{chunk_type} "{chunk.name}" is written differently after reading it with read_xfbin_chunk.')
+
+    eager_data = bytes(write_xfbin(eager))
+    headers = read_page_headers(data)
+
+    for label, written in (('open_xfbin', lazy_data), ('read_xfbin', eager_data)):
+        if read_page_headers(written) != headers:
+            raise Exception(f'Page headers written after reading with {label} do not match the original.')
+
+        # The chunk tables must still match the pages
+        read_xfbin(written)
+
+
+def run_scenario(name: str, scale: float, repeat: int) -> dict:
+    xfbin = SCENARIOS[name](scale)
+    data = bytes(write_xfbin(xfbin))
+
+    check_lazy_round_trip(data)
+
+    result = {
+        'size': len(data),
+        'pages': len(xfbin.pages),
+        'read': best_time(lambda: read_xfbin(data), repeat),
+        'write': best_time(lambda: write_xfbin(xfbin), repeat),
+        'round_trip': best_time(lambda: write_xfbin(read_xfbin(data)), repeat),
+        'read_peak': peak_memory(lambda: read_xfbin(data)),
+        'write_peak': peak_memory(lambda: write_xfbin(xfbin)),
+    }
+
+    # Best time of each chunk type over all runs
+    decode = dict()
+    for _ in range(repeat):
+        for chunk_type, (elapsed, size) in time_chunk_decoding(data).items():
+            if chunk_type not in decode or elapsed < decode[chunk_type]['time']:
+                decode[chunk_type] = {'time': elapsed, 'size': size}
+
+    result['decode'] = decode
+
+    return result
+
+
+def throughput(size: int, seconds: float) -> str:
+    return f'{size / seconds / (1024 * 1024):9.1f} MB/s' if seconds > 0 else f'{"-":>9} MB/s'
+
+
+def print_result(name: str, result: dict):
+    size = result['size']
+    print(f'{name}: {size / (1024 * 1024):.2f} MB, {result["pages"]} pages')
+
+    for metric in TIME_METRICS:
+        print(f'  {metric:<28} {result[metric] * 1000:10.2f} ms {throughput(size, result[metric])}')
+
+    for metric in ('read_peak', 'write_peak'):
+        print(f'  {metric:<28} {result[metric] / (1024 * 1024):10.2f} MB ({result[metric] / size:.2f}x file size)')
+
+    for chunk_type, decode in sorted(result['decode'].items(), key=lambda x: -x[1]['time']):
+        print(f'  decode {chunk_type:<21} {decode["time"] * 1000:10.2f} ms {throughput(decode["size"], decode["time"])}')
+
+
+def compare_results(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> int:
+    """Prints the change of each time compared to the baseline, and returns the number of regressions."""
+    regressions = 0
+
+    def compare(label: str, current: float, previous: float):
+        nonlocal regressions
+
+        if not previous:
+            return
+
+        change = current / previous - 1
+        regressed = change > threshold and max(current, previous) >= MIN_COMPARED_TIME
+        regressions += regressed
+
+        print(f'  {label:<28} {previous * 1000:10.2f} ms -> {current * 1000:10.2f} ms '
+              f'({change * 100:+6.1f}%){" REGRESSION" if regressed else ""}')
+
+    print(f'\nCompared to baseline (threshold: {threshold * 100:.0f}%):')
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f'{name}: not in baseline')
+            continue
+
+        if previous['size'] != result['size']:
+            print(f'{name}: size changed from {previous["size"]} to {result["size"]} bytes (different scale or format)')
+
+        print(f'{name}:')
+        for metric in TIME_METRICS:
+            compare(metric, result[metric], previous.get(metric))
+
+        for chunk_type, decode in result['decode'].items():
+            compare(f'decode {chunk_type}', decode['time'], previous.get('decode', dict()).get(chunk_type, dict()).get('time'))
+
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description='Measures the speed and memory use of reading and writing synthetic XFBINs.')
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help=f'scenarios to run (default: all of {", ".join(SCENARIOS)})')
+    parser.add_argument('--scale', type=float, default=1.0, help='size factor of the generated XFBINs')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of runs to take the best time of')
+    parser.add_argument('-s', '--save', nargs='?', const=DEFAULT_BASELINE, metavar='PATH',
+                        help=f'save the results as a baseline (default path: {DEFAULT_BASELINE})')
+    parser.add_argument('-c', '--compare', nargs='?', const=DEFAULT_BASELINE, metavar='PATH',
+                        help='compare the results against a saved baseline')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='slowdown (as a fraction) above which a time counts as a regression (default: 0.1)')
+    args = parser.parse_args()
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario: {name} (choose from {", ".join(SCENARIOS)})')
+
+    results = dict()
+    for name in args.scenarios or SCENARIOS:
+        results[name] = run_scenario(name, args.scale, args.repeat)
+        print_result(name, results[name])
+
+    regressions = 0
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+        if baseline.get('scale') != args.scale:
+            print(f'\nWarning: baseline was made with scale {baseline.get("scale")}')
+
+        regressions = compare_results(results, baseline['scenarios'], args.threshold)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'scale': args.scale, 'python': platform.python_version(), 'machine': platform.machine(),
+                       'scenarios': results}, f, indent=2)
+        print(f'\nSaved baseline to "{args.save}"')
+
+    if regressions:
+        print(f'\n{regressions} regressions')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""Generators of synthetic XFBINs for the benchmarks.
+
+The XFBINs are built with the same classes the importer and exporter use (Xfbin, Page, and the NuccChunk types), so they
+can be written with write_xfbin and read back without Blender or any game files. The data is random, but has the same
+structure as real files: grid meshes split into NUD meshes, textures with full mipmap chains, and animations with a
+curve for each bone.
+
+Every generator takes a seed, so the same arguments always give the same XFBIN.
+"""
+
+import os
+import sys
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xfbin.structure.br.br_anm import (ANM_CURVE_FORMATS, AnmCurveFormat, AnmEntryFormat, get_anm_curve_dtype)
+from xfbin.structure.br.br_nud import NudBoneType, NudUvType, NudVertexType
+from xfbin.structure.nucc import (CoordNode, NuccChunkAnm, NuccChunkClump, NuccChunkCoord, NuccChunkMaterial,
+                                  NuccChunkModel, NuccChunkNull, NuccChunkTexture, RiggingFlag)
+from xfbin.structure.nud import Nud, NudMaterial, NudMaterialProperty, NudMaterialTexture, NudMesh, NudMeshGroup
+from xfbin.structure.nut import Nut, NutTexture
+from xfbin.structure.xfbin import ChunkReference, Page, Xfbin
+from xfbin.util import BinaryReader, Endian
+
+# Vertex and bone types of the NUD meshes written by the games
+VERTEX_TYPES = (NudVertexType.NoNormals, NudVertexType.NormalsFloat, NudVertexType.NormalsTanBiTanFloat,
+                NudVertexType.NormalsHalfFloat, NudVertexType.NormalsTanBiTanHalfFloat)
+BONE_TYPES = (NudBoneType.NoBones, NudBoneType.Float, NudBoneType.HalfFloat, NudBoneType.Byte)
+
+# Number of vertices in each row of the grid meshes
+GRID_WIDTH = 64
+
+# Largest number of vertices in a single NUD mesh, to keep the meshes under the NUD limits
+MESH_VERTICES = 8192
+
+# DXT1, DXT5, 5.6.5 and 8.8.8.8 (with their sizes in bytes for each block of 4x4 pixels)
+TEXTURE_FORMATS = {0: 8, 2: 16, 8: 32, 17: 64}
+
+# Curve formats used for the bones' location, rotation and scale, in that order
+BONE_CURVE_FORMATS = (AnmCurveFormat.INT1_FLOAT3, AnmCurveFormat.SHORT4, AnmCurveFormat.SHORT3)
+
+
+def make_grid_mesh(vertex_count: int, vertex_type: NudVertexType, bone_type: NudBoneType, uv_count: int,
+                   material: NudMaterial, rng: np.random.Generator) -> NudMesh:
+    """Creates a NUD mesh of a grid with the given number of vertices, and random attributes for every vertex."""
+    rows = max(2, -(-vertex_count // GRID_WIDTH))
+    vertex_count = rows * GRID_WIDTH
+
+    x, z = np.meshgrid(np.arange(GRID_WIDTH, dtype=np.float32), np.arange(rows, dtype=np.float32))
+    y = rng.standard_normal((rows, GRID_WIDTH), np.float32)
+
+    mesh = NudMesh()
+    arrays = {'position': np.stack((x.ravel(), y.ravel(), z.ravel()), axis=1)}
+
+    if vertex_type != NudVertexType.NoNormals:
+        normals = rng.standard_normal((vertex_count, 3), np.float32)
+        arrays['normal'] = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+    if vertex_type in (NudVertexType.NormalsTanBiTanFloat, NudVertexType.NormalsTanBiTanHalfFloat):
+        arrays['bitangent'] = np.concatenate((rng.standard_normal((vertex_count, 3), np.float32),
+                                              np.ones((vertex_count, 1), np.float32)), axis=1)
+        arrays['tangent'] = np.concatenate((rng.standard_normal((vertex_count, 3), np.float32),
+                                            np.ones((vertex_count, 1), np.float32)), axis=1)
+
+    arrays['color'] = rng.integers(0, 256, (vertex_count, 4), np.int32)
+    arrays['uv'] = rng.random((vertex_count, uv_count, 2), np.float32)
+
+    if bone_type != NudBoneType.NoBones:
+        arrays['bone_ids'] = rng.integers(0, 64, (vertex_count, 4), np.int64)
+
+        weights = rng.random((vertex_count, 4), np.float32)
+        arrays['bone_weights'] = weights / weights.sum(axis=1, keepdims=True)
+
+    mesh.set_vertex_arrays(arrays)
+
+    # Two triangles for each quad of the grid
+    quads = (np.arange(rows - 1)[:, None] * GRID_WIDTH + np.arange(GRID_WIDTH - 1)).ravel()
+    mesh.faces = np.concatenate((np.stack((quads, quads + GRID_WIDTH, quads + 1), axis=1),
+                                 np.stack((quads + 1, quads + GRID_WIDTH, quads + GRID_WIDTH + 1), axis=1)))
+
+    mesh.vertex_type = vertex_type
+    mesh.bone_type = bone_type
+    mesh.uv_type = NudUvType.Byte
+    mesh.face_flag = 0
+    mesh.materials = [material]
+
+    return mesh
+
+
+def make_nud_material() -> NudMaterial:
+    material = NudMaterial()
+    material.flags = 0xF00A0000
+    material.sourceFactor = material.destFactor = 0
+    material.alphaTest = material.alphaFunction = 0
+    material.refAlpha = material.cullMode = 0
+    material.unk1 = material.unk2 = 0.0
+    material.zBufferOffset = 0
+
+    texture = NudMaterialTexture()
+    for name in ('baseID', 'groupID', 'subGroupID', 'textureID', 'mapMode', 'wrapModeS', 'wrapModeT',
+                 'minFilter', 'magFilter', 'mipDetail', 'unk1', 'LOD'):
+        setattr(texture, name, 0)
+    material.textures = [texture]
+
+    prop = NudMaterialProperty()
+    prop.name = 'NU_materialHash'
+    prop.values = [1.0, 0.0, 0.0, 0.0]
+    material.properties = [prop]
+
+    return material
+
+
+def make_clump(path: str, name: str, model_types: List[tuple], vertex_count: int, bone_count: int = 16,
+               uv_count: int = 2, seed: int = 0) -> NuccChunkClump:
+    """Creates a clump with a chain of coords, and a model for each (vertex type, bone type) in model_types.
+    Each model has vertex_count vertices, split into NUD meshes of at most MESH_VERTICES vertices.
+    """
+    rng = np.random.default_rng(seed)
+
+    clump = NuccChunkClump(path, name)
+    clump.has_props = clump.has_data = True
+    clump.field00 = clump.coord_flag0 = clump.coord_flag1 = clump.model_flag0 = clump.model_flag1 = 0
+    clump.model_groups = list()
+
+    clump.coord_chunks = list()
+    parent = None
+    for i in range(bone_count):
+        coord = NuccChunkCoord(path, f'{name}_bone{i:03}')
+        coord.has_props = True
+        coord.node = CoordNode(coord)
+        coord.node.parent = parent
+
+        if parent:
+            parent.children.append(coord.node)
+
+        parent = coord.node
+        clump.coord_chunks.append(coord)
+
+    material_chunk = NuccChunkMaterial(path, f'{name}_mat')
+    material_chunk.has_props = True
+    material_chunk.texture_groups = list()
+
+    nud_material = make_nud_material()
+
+    clump.model_chunks = list()
+    for i, (vertex_type, bone_type) in enumerate(model_types):
+        model = NuccChunkModel(path, f'{name}_model{i:03}')
+        model.has_props = True
+        model.rigging_flag = RiggingFlag.SKINNED if bone_type != NudBoneType.NoBones else RiggingFlag.UNSKINNED
+        model.model_attributes = model.render_layer = model.light_mode_id = model.light_category = 0
+        model.clump_chunk = clump
+        model.hit_chunk = NuccChunkNull()
+        model.coord_index = 0
+        model.bounding_box = tuple()
+        model.material_chunks = [material_chunk]
+
+        group = NudMeshGroup()
+        group.name = model.name
+        group.bone_flags = 0
+        group.unk_values = (0.0,) * 4
+        group.meshes = [make_grid_mesh(min(MESH_VERTICES, vertex_count - start), vertex_type, bone_type, uv_count,
+                                       nud_material, rng) for start in range(0, vertex_count, MESH_VERTICES)]
+        group.bounding_sphere = group.get_bounding_sphere()
+
+        nud = model.nud = Nud()
+        nud.name = model.name
+        nud.mesh_groups = [group]
+        nud.bounding_sphere = nud.get_bounding_sphere()
+
+        clump.model_chunks.append(model)
+
+    return clump
+
+
+def make_texture(path: str, name: str, size: int, pixel_format: int = 0, seed: int = 0) -> NuccChunkTexture:
+    """Creates a square texture with random pixels and a full chain of mipmaps (down to 4x4 pixels)."""
+    rng = np.random.default_rng(seed)
+    block_size = TEXTURE_FORMATS[pixel_format]
+
+    mipmaps = list()
+    mip_size = size
+    while mip_size >= 4:
+        mipmaps.append(rng.integers(0, 256, (mip_size // 4) ** 2 * block_size, np.uint8).tobytes())
+        mip_size //= 2
+
+    nut_texture = NutTexture()
+    nut_texture.width = nut_texture.height = size
+    nut_texture.pixel_format = pixel_format
+    nut_texture.mipmap_count = len(mipmaps)
+    nut_texture.mipmaps = mipmaps
+    nut_texture.texture_data = b''.join(mipmaps)
+    nut_texture.data_size = len(nut_texture.texture_data)
+    nut_texture.is_cube_map = False
+    nut_texture.cubemap_format = 0
+    nut_texture.cubemap_faces = None
+
+    # Header, mipmap sizes (aligned to 16 bytes), then the eXt and GIDX sections
+    mip_sizes_size = -(-(len(mipmaps) * 4) // 16) * 16 if len(mipmaps) > 1 else 0
+    nut_texture.header_size = 0x30 + mip_sizes_size + 0x20
+    nut_texture.total_size = nut_texture.header_size + nut_texture.data_size
+
+    texture = NuccChunkTexture(path, name)
+    texture.has_props = texture.has_data = True
+    texture.nut = Nut()
+    texture.nut.textures = [nut_texture]
+
+    return texture
+
+
+def make_anm_data(clump: NuccChunkClump, frame_count: int, rng: np.random.Generator) -> bytes:
+    """Writes the body of an ANM chunk that animates every coord of the clump, using the clump's page references
+    (see make_anm_page). Each bone has a location, rotation and scale curve, and a material entry has a curve of each
+    supported AnmCurveFormat.
+    """
+    bone_count = len(clump.coord_chunks)
+    curve_formats = [f for f in AnmCurveFormat if f in ANM_CURVE_FORMATS]
+
+    def write_curve(br: BinaryReader, curve_format: int):
+        records = np.zeros(frame_count, get_anm_curve_dtype(curve_format))
+
+        if 'frame' in records.dtype.names:
+            records['frame'] = np.arange(frame_count) * 100
+
+        values = records['values']
+        if values.dtype.kind == 'f':
+            values[:] = rng.standard_normal(values.shape)
+        else:
+            info = np.iinfo(values.dtype)
+            values[:] = rng.integers(info.min, info.max, values.shape, endpoint=True)
+
+        br.write_bytes(records.tobytes())
+        br.align(4)
+
+    with BinaryReader(endianness=Endian.BIG) as br:
+        br.write_uint32(frame_count * 100)
+        br.write_uint32(100)
+
+        br.write_uint16(bone_count + 1)  # Entries
+        br.write_uint16(1)  # Loop flag
+        br.write_uint16(1)  # Clumps
+        br.write_uint16(0)  # Other entries
+        br.write_uint16(0)  # Other indices
+        br.write_uint16(0)  # Coord parents
+
+        # The clump, then the coords and the material, as indices of the page's chunk references
+        br.write_uint32(0)
+        br.write_uint16(bone_count + 1)
+        br.write_uint16(0)
+        br.write_uint32(list(range(1, bone_count + 2)))
+
+        for i in range(bone_count):
+            br.write_int16(0)
+            br.write_uint16(i)
+            br.write_uint16(AnmEntryFormat.BONE)
+            br.write_uint16(len(BONE_CURVE_FORMATS))
+
+            for curve_index, curve_format in enumerate(BONE_CURVE_FORMATS):
+                br.write_uint16((curve_index, curve_format, frame_count, 0))
+
+            for curve_format in BONE_CURVE_FORMATS:
+                write_curve(br, curve_format)
+
+        br.write_int16(0)
+        br.write_uint16(0)
+        br.write_uint16(AnmEntryFormat.MATERIAL)
+        br.write_uint16(len(curve_formats))
+
+        for curve_index, curve_format in enumerate(curve_formats):
+            br.write_uint16((curve_index, curve_format, frame_count, 0))
+
+        for curve_format in curve_formats:
+            write_curve(br, curve_format)
+
+        return br.buffer()
+
+
+def make_anm_page(path: str, name: str, clump: NuccChunkClump, frame_count: int, seed: int = 0) -> Page:
+    """Creates a page with an ANM chunk that animates the coords of the clump for frame_count frames."""
+    anm = NuccChunkAnm(path, name)
+    anm.has_data = True
+    anm.data = make_anm_data(clump, frame_count, np.random.default_rng(seed))
+
+    page = Page()
+    page.add_chunk(anm)
+
+    material = clump.model_chunks[0].material_chunks[0]
+    page.chunk_references = [ChunkReference(c.name, c) for c in (clump, *clump.coord_chunks, material)]
+
+    return page
+
+
+def make_nud_xfbin(vertex_count: int = 32768, seed: int = 0) -> Xfbin:
+    """A clump with a model of vertex_count vertices for each vertex type and bone type."""
+    xfbin = Xfbin()
+    model_types = [(v, b) for v in VERTEX_TYPES for b in BONE_TYPES]
+    xfbin.add_clump_page(make_clump('c/bench/nud.max', 'nud_clump', model_types, vertex_count, seed=seed))
+
+    return xfbin
+
+
+def make_nut_xfbin(texture_count: int = 8, size: int = 1024, seed: int = 0) -> Xfbin:
+    """Textures of each pixel format with full mipmap chains, each in its own page."""
+    xfbin = Xfbin()
+    formats = list(TEXTURE_FORMATS)
+
+    for i in range(texture_count):
+        xfbin.add_chunk_page(make_texture(f'c/bench/tex{i:03}.nut', f'tex{i:03}', size, formats[i % len(formats)], seed + i))
+
+    return xfbin
+
+
+def make_anm_xfbin(frame_count: int = 3000, bone_count: int = 128, seed: int = 0) -> Xfbin:
+    """A long animation of a clump with many bones, using every supported curve format."""
+    xfbin = Xfbin()
+    clump = make_clump('c/bench/anm.max', 'anm_clump', [(NudVertexType.NormalsHalfFloat, NudBoneType.Float)], 64,
+                       bone_count, seed=seed)
+
+    xfbin.add_clump_page(clump)
+    xfbin.pages.append(make_anm_page('c/bench/anm.max', 'anm_clip', clump, frame_count, seed))
+
+    return xfbin
+
+
+def make_archive_xfbin(page_count: int = 200, vertex_count: int = 2048, seed: int = 0) -> Xfbin:
+    """An archive with many small clump, texture and animation pages, like the stage and character archives."""
+    xfbin = Xfbin()
+
+    for i in range(0, page_count, 3):
+        path = f'c/bench/archive{i:04}.max'
+        clump = make_clump(path, f'clump{i:04}', [(NudVertexType.NormalsTanBiTanHalfFloat, NudBoneType.HalfFloat)],
+                           vertex_count, 8, seed=seed + i)
+
+        xfbin.add_clump_page(clump)
+        xfbin.add_chunk_page(make_texture(f'c/bench/archive{i:04}.nut', f'tex{i:04}', 128, 0, seed + i))
+        xfbin.pages.append(make_anm_page(path, f'anm{i:04}', clump, 120, seed + i))
+
+    return xfbin
+
+
+# Generators of the benchmark scenarios by their names, with arguments scaled by a size factor
+SCENARIOS: Dict[str, Callable[[float], Xfbin]] = {
+    'nud': lambda scale: make_nud_xfbin(max(GRID_WIDTH * 2, int(32768 * scale))),
+    'nut': lambda scale: make_nut_xfbin(8, max(16, 1 << int(np.log2(max(1, 1024 * np.sqrt(scale)))))),
+    'anm': lambda scale: make_anm_xfbin(max(2, int(3000 * scale))),
+    'archive': lambda scale: make_archive_xfbin(max(3, int(200 * scale))),
+}
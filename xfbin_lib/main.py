@@ -1,7 +1,13 @@
+import glob
 import json
 import os
 import shutil
+import sys
+import time
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from threading import BoundedSemaphore
+from typing import Callable, Dict, List, Tuple, Union
 from xfbin.structure.xfbin import ChunkReference
 
 from xfbin import *
@@ -16,6 +22,11 @@ def unpack(args):
         args.output = os.path.basename(args.input).split('.')[0]
 
     args.output = os.path.abspath(args.output)
+    if os.path.exists(args.output) and not os.path.isdir(args.output):
+        print(f'OUTPUT is not a folder: {args.output}\nAborting.')
+        os.system('pause')
+        return
+
     if os.path.exists(args.output):
         if (not args.force_overwrite) and input('Overwrite existing files? (Y/N) ').lower() != 'y':
             print('Aborting.')
@@ -30,25 +41,36 @@ def unpack(args):
         args.no_json = True
 
     # Read the file
-    xfbin = read_xfbin(args.input)
+    xfbin = read_xfbin(args.input, args.jobs)
+
+    unpack_xfbin(xfbin, args.output, args, write_file)
+
+    print(f'\nSuccessfully unpacked to "{args.output}"')
+
+
+def unpack_xfbin(xfbin: Xfbin, output: str, args, write: Callable[[str, Union[bytes, str]], None]) -> int:
+    """Writes the chunks (and the pages' JSON) of an Xfbin to the output folder, which should already exist.
+    Each file is written by calling write with its path and contents, and the number of chunk files is returned.
+    """
+    chunk_count = 0
 
     if args.sort_types:
         # Get a dictionary of chunks based on chunk type
         for k, v in xfbin.get_type_chunk_dict().items():
             # Create a folder with the chunk's type as its name
-            page_path = os.path.join(args.output, k.__qualname__[len(NuccChunk.__qualname__):])
+            page_path = os.path.join(output, NuccChunk.get_nucc_str_short_from_type(k))
             os.mkdir(page_path)
 
             for c in v:
                 chunk_path = os.path.join(page_path, c.name + '.' + (c.extension
                                                                      if (args.file_data_only and c.extension != '')
-                                                                     else NuccChunk.get_nucc_str_short_from_type(type(c)).lower()))
+                                                                     else NuccChunk.get_nucc_chunk_type(type(c)).extension))
 
                 if args.verbose:
                     print(f'Writing {chunk_path} ...')
 
-                with open(chunk_path, 'wb') as f:
-                    f.write(c.get_data(args.file_data_only))
+                write(chunk_path, c.get_data(args.file_data_only))
+                chunk_count += 1
     else:
         for i, page in enumerate(xfbin.pages):
             page.cleanup()
@@ -62,7 +84,7 @@ def unpack(args):
             main_chunk = clump_chunk[0] if len(clump_chunk) else page.chunks[-1]
 
             page_path = os.path.join(
-                args.output, f'[{i:03}] {main_chunk.name} ({NuccChunk.get_nucc_str_from_type(type(main_chunk))})')
+                output, f'[{i:03}] {main_chunk.name} ({NuccChunk.get_nucc_str_from_type(type(main_chunk))})')
             os.mkdir(page_path)
 
             # Create the page json dict
@@ -85,7 +107,7 @@ def unpack(args):
                 d = chunks[j] = dict()
                 d['File Name'] = c.name + '.' + (c.extension
                                                  if (args.file_data_only and c.extension != '')
-                                                 else NuccChunk.get_nucc_str_short_from_type(type(c)).lower())
+                                                 else NuccChunk.get_nucc_chunk_type(type(c)).extension)
                 d['Version'] = c.version
                 d['Chunk'] = c.to_dict()
 
@@ -94,14 +116,197 @@ def unpack(args):
                 if args.verbose:
                     print(f'Writing {chunk_path} ...')
 
-                with open(chunk_path, 'wb') as f:
-                    f.write(c.get_data(args.file_data_only))
+                write(chunk_path, c.get_data(args.file_data_only))
+                chunk_count += 1
 
             if not args.no_json:
-                with open(os.path.join(page_path, '_page.json'), 'w', encoding='cp932') as f:
-                    json.dump(page_json, f, ensure_ascii=False, indent=4)
+                write(os.path.join(page_path, '_page.json'), json.dumps(page_json, ensure_ascii=False, indent=4))
 
-    print(f'\nSuccessfully unpacked to "{args.output}"')
+    return chunk_count
+
+
+def write_file(path: str, data: Union[bytes, str]):
+    # Strings are written as text, same as json.dump with an open file
+    if isinstance(data, str):
+        with open(path, 'w', encoding='cp932') as f:
+            f.write(data)
+    else:
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+class FileWriter:
+    """Writes files on a pool of I/O threads, while limiting the number of files waiting to be written (and kept in memory)."""
+
+    def __init__(self, threads: int, max_pending: int):
+        self.executor = ThreadPoolExecutor(threads)
+        self.pending = BoundedSemaphore(max_pending)
+        self.futures = list()
+
+    def write(self, path: str, data: Union[bytes, str]):
+        self.pending.acquire()
+
+        future = self.executor.submit(write_file, path, data)
+        future.add_done_callback(lambda _: self.pending.release())
+        self.futures.append(future)
+
+    def wait(self):
+        """Waits for all files to be written, and raises the first error that happened while writing them."""
+        futures, self.futures = self.futures, list()
+
+        for future in futures:
+            future.result()
+
+
+# Each batch worker process has its own FileWriter
+batch_writer: FileWriter = None
+
+
+def init_batch_worker(io_threads: int, cache_dir: str):
+    global batch_writer
+    batch_writer = FileWriter(io_threads, io_threads * 4)
+
+    if cache_dir:
+        enable_decode_cache(cache_dir)
+
+
+def unpack_batch_file(path: str, output: str, args) -> Tuple[str, int, int, str]:
+    """Unpacks one XFBIN of a batch to its output folder, replacing the folder if it exists.
+    Returns the path, the size of the file, the number of chunk files written, and the error message if it failed.
+    """
+    try:
+        if os.path.exists(output):
+            if not os.path.isdir(output):
+                raise FileExistsError(f'Output is not a folder: {output}')
+            shutil.rmtree(output)
+        os.makedirs(output)
+
+        xfbin = read_xfbin(path)
+        chunk_count = unpack_xfbin(xfbin, output, args, batch_writer.write)
+        batch_writer.wait()
+
+        return path, os.path.getsize(path), chunk_count, None
+    except Exception as e:
+        # Let the remaining writes finish before the next file reuses the writer
+        for future in batch_writer.futures:
+            future.exception()
+        batch_writer.futures.clear()
+
+        return path, 0, 0, f'{type(e).__name__}: {e}'
+
+
+def repack_batch_folder(path: str, output: str, args) -> Tuple[str, int, int, str]:
+    """Repacks one unpacked folder of a batch to an XFBIN, replacing the XFBIN if it exists.
+    Returns the path, the size of the written XFBIN, the number of chunks, and the error message if it failed.
+    """
+    try:
+        xfbin = repack_folder(path, args.verbose)
+
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        write_xfbin_to_path(xfbin, output)
+
+        return path, os.path.getsize(output), sum(len(page.chunks) for page in xfbin), None
+    except Exception as e:
+        return path, 0, 0, f'{type(e).__name__}: {e}'
+
+
+def is_unpacked_folder(path: str) -> bool:
+    return os.path.isdir(path) and any(os.path.isfile(os.path.join(path, d.name, '_page.json'))
+                                       for d in os.scandir(path) if d.is_dir())
+
+
+def find_batch_inputs(inputs: List[str]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Returns the XFBIN files to unpack and the unpacked folders to repack from a list of files, directories
+    (searched recursively) and glob patterns, along with the base directory that each output path will be relative to.
+    """
+    files = list()
+    folders = list()
+
+    def add_directory(path: str, base: str):
+        for root, directories, file_names in os.walk(path):
+            if is_unpacked_folder(root):
+                # The subdirectories of an unpacked folder are its pages
+                folders.append((root, base))
+                directories.clear()
+                continue
+
+            directories.sort()
+            files.extend((os.path.join(root, f), base) for f in sorted(file_names) if f.lower().endswith('.xfbin'))
+
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            path = os.path.abspath(pattern)
+            add_directory(path, os.path.dirname(path) if is_unpacked_folder(path) else path)
+            continue
+
+        # Patterns are relative to their first directory that has no wildcards
+        base = os.path.dirname(pattern)
+        while glob.has_magic(base):
+            base = os.path.dirname(base)
+        base = os.path.abspath(base)
+
+        for p in sorted(glob.glob(pattern, recursive=True)):
+            if os.path.isfile(p):
+                files.append((os.path.abspath(p), base))
+            elif os.path.isdir(p):
+                add_directory(os.path.abspath(p), base)
+
+    return files, folders
+
+
+def batch(args):
+    files, folders = find_batch_inputs(args.input)
+
+    if not (files or folders):
+        print('No XFBIN files or unpacked folders were found.\nAborting.')
+        return
+
+    if not args.output:
+        args.output = 'batch'
+
+    args.output = os.path.abspath(args.output)
+    if os.path.exists(args.output) and not args.force_overwrite:
+        if input(f'Overwrite existing files in "{args.output}"? (Y/N) ').lower() != 'y':
+            print('Aborting.')
+            os.system('pause')
+            return
+
+    if args.file_data_only:
+        args.no_json = True
+
+    jobs = max(1, args.jobs or os.cpu_count() or 1)
+    print(f'Unpacking {len(files)} files and repacking {len(folders)} folders with {jobs} processes...\n')
+
+    # Outputs keep the inputs' paths relative to their input directory
+    tasks = [(unpack_batch_file, path, os.path.join(args.output, os.path.splitext(os.path.relpath(path, base))[0]))
+             for (path, base) in files]
+    tasks.extend((repack_batch_folder, path, os.path.join(args.output, os.path.relpath(path, base) + '.xfbin'))
+                 for (path, base) in folders)
+
+    start = time.perf_counter()
+    results = list()
+
+    with ProcessPoolExecutor(jobs, initializer=init_batch_worker, initargs=(args.io_threads, args.cache_dir)) as executor:
+        futures = {executor.submit(func, path, output, args): func for (func, path, output) in tasks}
+
+        for future in as_completed(futures):
+            path, size, chunk_count, error = future.result()
+            results.append((size, chunk_count, error))
+
+            action = 'unpack' if futures[future] is unpack_batch_file else 'repack'
+            if error:
+                print(f'Failed to {action} "{path}": {error}')
+            elif args.verbose:
+                print(f'{action.capitalize()}ed "{path}" ({chunk_count} chunks)')
+
+    elapsed = time.perf_counter() - start
+
+    done = [r for r in results if not r[2]]
+    total_size = sum(r[0] for r in done)
+    total_chunks = sum(r[1] for r in done)
+
+    print(f'\nProcessed {len(done)} of {len(tasks)} inputs ({total_chunks} chunks) to "{args.output}" in {elapsed:.2f}s')
+    print(f'{len(done) / elapsed:.2f} files/s, {total_size / elapsed / 1024 / 1024:.2f} MB/s of XFBIN data')
 
 
 def repack(args):
@@ -109,6 +314,11 @@ def repack(args):
         args.output = os.path.basename(args.input) + '.xfbin'
 
     args.output = os.path.abspath(args.output)
+    if os.path.isdir(args.output):
+        print(f'OUTPUT is a folder: {args.output}\nAborting.')
+        os.system('pause')
+        return
+
     if os.path.exists(args.output):
         if (not args.force_overwrite) and input('Overwrite existing XFBIN? (Y/N) ').lower() != 'y':
             print('Aborting.')
@@ -120,61 +330,109 @@ def repack(args):
     # Create the directory in case some path components do not exist
     os.makedirs(os.path.dirname(args.output), exist_ok=True)
 
+    xfbin = repack_folder(args.input, args.verbose)
+
+    write_xfbin_to_path(xfbin, args.output)
+    print(f'\nSuccessfully repacked to "{args.output}"')
+
+
+# Parsed _page.json files, by their contents
+# Different XFBINs often have the same pages (for example, the costumes of a character), so each one is only parsed once per process
+page_json_cache: Dict[bytes, tuple] = dict()
+PAGE_JSON_CACHE_SIZE = 4096
+
+
+def read_page_json(path: str) -> tuple:
+    """Reads a _page.json and returns its chunk maps, chunk references and chunks as tuples,
+    where each chunk is a (type, path, name, version) key with interned strings.
+    """
+    with open(path, 'rb') as f:
+        contents = f.read()
+
+    page = page_json_cache.get(contents)
+    if page is None:
+        page_json = json.loads(contents.decode('cp932'))
+
+        page = (
+            tuple(map(get_chunk_key, page_json['Chunk Maps'])),
+            tuple((sys.intern(ref['Name']), get_chunk_key(ref['Chunk'])) for ref in page_json['Chunk References']),
+            tuple((ch['File Name'], get_chunk_key(ch['Chunk'])) for ch in page_json['Chunks']),
+        )
+
+        if len(page_json_cache) >= PAGE_JSON_CACHE_SIZE:
+            page_json_cache.clear()
+        page_json_cache[contents] = page
+
+    return page
+
+
+def get_chunk_key(c: dict) -> Tuple[str, str, str, int]:
+    # Versions are written as hex strings by NuccChunk.to_dict
+    version = int(c['Version'], 0) if isinstance(c['Version'], str) else int(c['Version'])
+    return sys.intern(c['Type']), sys.intern(c['Path']), sys.intern(c['Name']), version
+
+
+def create_chunk(key: Tuple[str, str, str, int]) -> NuccChunk:
+    chunk = NuccChunk.create_from_nucc_type(*key[:3])
+    chunk.version = key[3]
+
+    return chunk
+
+
+def repack_folder(path: str, verbose: bool = False) -> Xfbin:
+    """Creates an Xfbin from an unpacked folder, where each page is a subdirectory with a _page.json."""
     xfbin = Xfbin()
 
-    for root, directories, files in os.walk(args.input):
-        for d in directories:
-            page_json_path = os.path.join(root, d, '_page.json')
-            if not os.path.isfile(page_json_path):
-                print(f'Directory "{d}"" does not have a "_page.json" and will be skipped.')
-                continue
+    # Chunk maps and references are only used for their type, path and name, so they are shared between the pages
+    shared_chunks: Dict[tuple, NuccChunk] = dict()
 
-            with open(page_json_path, 'r', encoding='cp932') as f:
-                page_json = json.load(f)
+    def get_shared_chunk(key):
+        chunk = shared_chunks.get(key)
+        if chunk is None:
+            chunk = shared_chunks[key] = create_chunk(key)
+        return chunk
 
-            # Enclose everything in a try block to avoid having to check if each json element exists or not
-            try:
-                page = Page()
-                xfbin.pages.append(page)
+    for d in sorted(d.name for d in os.scandir(path) if d.is_dir()):
+        page_json_path = os.path.join(path, d, '_page.json')
+        if not os.path.isfile(page_json_path):
+            print(f'Directory "{d}" does not have a "_page.json" and will be skipped.')
+            continue
 
-                # Read chunk maps
-                chunk_maps = list(map(lambda c: NuccChunk.create_from_nucc_type(
-                    c['Type'], c['Path'], c['Name'], c['Version']), page_json['Chunk Maps']))
+        # Avoid having to check if each json element exists or not
+        try:
+            chunk_map_keys, chunk_ref_keys, chunk_keys = read_page_json(page_json_path)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f'"_page.json" of directory "{d}" is invalid and will be skipped. ({type(e).__name__}: {e})')
+            continue
 
-                # Read chunk references
-                chunk_refs = page.chunk_references = [None] * len(page_json['Chunk References'])
-                for i, ref in enumerate(page_json['Chunk References']):
-                    c = ref['Chunk']
-                    chunk_refs[i] = ChunkReference(
-                        ref['Name'], NuccChunk.create_from_nucc_type(c['Type'], c['Path'], c['Name'], ['Version']))
+        page = Page()
+        xfbin.pages.append(page)
 
-                # Read chunks
-                chunks = page.chunks = list()
-                for ch in page_json['Chunks']:
-                    c = ch['Chunk']
-                    chunk = NuccChunk.create_from_nucc_type(c['Type'], c['Path'], c['Name'], c['Version'])
-                    chunk_path = os.path.join(root, d, ch['File Name'])
+        # Read chunk maps
+        chunk_maps = list(map(get_shared_chunk, chunk_map_keys))
 
-                    if not os.path.isfile(chunk_path):
-                        print(f'Chunk "{chunk_path}" does not exist and will be skipped.')
-                        continue
+        # Read chunk references
+        page.chunk_references = [ChunkReference(name, get_shared_chunk(key)) for (name, key) in chunk_ref_keys]
 
-                    chunks.append(chunk)
+        # Read chunks
+        chunks = page.chunks
+        for file_name, key in chunk_keys:
+            chunk_path = os.path.join(path, d, file_name)
 
-                    if args.verbose:
-                        print(f'Reading {chunk_path} ...')
+            if not os.path.isfile(chunk_path):
+                print(f'Chunk "{chunk_path}" does not exist and will be skipped.')
+                continue
 
-                    with open(chunk_path, 'rb') as f:
-                        chunk.set_data(bytearray(f.read()), chunk_maps)
-            except:
-                #print(f'"_page.json" of directory "{d}" is invalid and will be skipped.')
-                print
+            chunk = create_chunk(key)
+            chunks.append(chunk)
 
-        # We only want to look in the topmost directory
-        break
+            if verbose:
+                print(f'Reading {chunk_path} ...')
 
-    write_xfbin_to_path(xfbin, args.output)
-    print(f'\nSuccessfully repacked to "{args.output}"')
+            with open(chunk_path, 'rb') as f:
+                chunk.set_data(bytearray(f.read()), chunk_maps)
+
+    return xfbin
 
 
 def main():
@@ -183,11 +441,11 @@ def main():
 
     parser = ArgumentParser(
         description="""Unpacks/Repacks nuccChunks from CyberConnect2 XFBIN container files.""")
-    parser.add_argument('input', nargs='?', action='store',
-                        help='path to input XFBIN file OR path to folder to repack')
-    parser.add_argument('output', nargs='?', action='store',
-                        help='path to output folder to extract the chunks to (defaults to a new folder with the name of the input XFBIN) '
-                        'OR path to output XFBIN file when repacking (defaults to folder name + ".xfbin")')
+    parser.add_argument('input', nargs='*', action='store',
+                        help='path to input XFBIN file OR path to folder to repack '
+                        'OR (in batch mode) XFBIN files, folders and glob patterns to unpack or repack')
+    parser.add_argument('-o', '--output', dest='output_path', action='store',
+                        help='same as OUTPUT, and required for giving an output folder in batch mode')
     parser.add_argument('-f', '--force-overwrite', dest='force_overwrite', action='store_true',
                         help='overwrite old extracted files without prompting')
     parser.add_argument('-d', '--file-data-only', dest='file_data_only', action='store_true',
@@ -198,6 +456,17 @@ def main():
                         help='do not write "_page.json" for extracted pages (will disable repacking)')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='print info about each extracted chunk')
+    parser.add_argument('--cache-dir', dest='cache_dir', action='store',
+                        help='directory for caching decoded NUD, NUT and ANM chunks, to read unchanged XFBINs faster next time. '
+                             'The cache is loaded with pickle, which can run arbitrary code: only use a directory that untrusted users cannot write to')
+    parser.add_argument('-b', '--batch', action='store_true',
+                        help='unpack many XFBIN files and repack many folders in parallel (enabled automatically for more than two inputs, '
+                             'glob patterns, or two XFBIN files)')
+    parser.add_argument('--jobs', type=int, default=0,
+                        help='number of processes for unpacking and repacking in batch mode (defaults to the number of CPUs), '
+                             'or for decoding the pages of a single XFBIN (defaults to 1)')
+    parser.add_argument('--io-threads', dest='io_threads', type=int, default=4,
+                        help='number of threads for writing files in each batch mode process')
 
     args = parser.parse_args()
 
@@ -206,6 +475,22 @@ def main():
         os.system('pause')
         return
 
+    if args.cache_dir:
+        enable_decode_cache(args.cache_dir)
+
+    # A second XFBIN file is another input to unpack rather than an OUTPUT, which would be a folder
+    two_files = len(args.input) == 2 and all(os.path.isfile(i) and i.lower().endswith('.xfbin') for i in args.input)
+
+    if args.batch or two_files or len(args.input) > 2 or any(glob.has_magic(i) and not os.path.exists(i) for i in args.input):
+        args.output = args.output_path
+        print('Batch mode - Attempting to unpack and repack...')
+        batch(args)
+        print("Done!")
+        return
+
+    # Keep the old positional arguments: INPUT [OUTPUT]
+    args.input, args.output = args.input[0], (args.input[1] if len(args.input) > 1 else args.output_path)
+
     if os.path.isfile(args.input):
         print('INPUT is a file - Attempting to unpack...')
         unpack(args)
@@ -1,4 +1,5 @@
 from .structure.nucc import *
 from .structure.xfbin import Page, Xfbin
-from .xfbin_reader import read_xfbin
-from .xfbin_writer import write_xfbin, write_xfbin_to_path
+from .xfbin_reader import open_xfbin, read_xfbin, read_xfbin_chunk, read_xfbin_index
+from .xfbin_writer import write_xfbin, write_xfbin_to_file, write_xfbin_to_path
+from .structure.decode_cache import disable_decode_cache, enable_decode_cache
@@ -1,5 +1,7 @@
 from enum import IntEnum
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
 
 from .br.br_anm import *
 import time
@@ -182,7 +184,31 @@ class AnmDataPath(IntEnum):
 
 class AnmCurve:
     data_path: AnmDataPath
-    keyframes: List[AnmKeyframe]
+
+    frames: np.ndarray  # (n,) frame of each keyframe
+    values: np.ndarray  # (n, value count) values of each keyframe
+
+    def __init__(self):
+        self.data_path = AnmDataPath.UNKNOWN
+        self.frames = np.zeros(0, np.int32)
+        self.values = np.zeros((0, 0), np.float32)
+
+        self.__keyframes: Optional[List[AnmKeyframe]] = None
+
+    @property
+    def keyframes(self) -> List[AnmKeyframe]:
+        """List of AnmKeyframe objects created from the frames and values arrays the first time it is accessed."""
+        if self.__keyframes is None:
+            self.__keyframes = list(map(AnmKeyframe, self.frames.tolist(), map(tuple, self.values.tolist())))
+
+        return self.__keyframes
+
+    @keyframes.setter
+    def keyframes(self, keyframes: List[AnmKeyframe]):
+        self.frames = np.array([k.frame for k in keyframes])
+        self.values = np.array([k.value for k in keyframes]).reshape(len(keyframes), -1)
+
+        self.__keyframes = keyframes
 
 
 class AnmEntry:
@@ -308,7 +334,7 @@ def create_bone_curves(curves,frame_size):
     for curve in curves:
         anm_curve = AnmCurve()
         anm_curve.data_path = bone_curves[curve[0].curve_index + eulers.get(curve[0].curve_format, 0)]
-        anm_curve.keyframes = create_curve_keyframes(frame_size, curve[0], curve[1])
+        anm_curve.frames, anm_curve.values = create_curve_arrays(frame_size, curve[0], curve[1])
         
         curves_list.append(anm_curve)
     
@@ -324,7 +350,7 @@ def create_camera_curves(curves,frame_size):
     for curve in curves:
         anm_curve = AnmCurve()
         anm_curve.data_path = camera_curves[curve[0].curve_index]
-        anm_curve.keyframes = create_curve_keyframes(frame_size, curve[0], curve[1])
+        anm_curve.frames, anm_curve.values = create_curve_arrays(frame_size, curve[0], curve[1])
         
         curves_list.append(anm_curve)
     
@@ -340,7 +366,7 @@ def create_lightdirc_curves(curves,frame_size):
     for curve in curves:
         anm_curve = AnmCurve()
         anm_curve.data_path = lightdirc_curves[curve[0].curve_index]
-        anm_curve.keyframes = create_curve_keyframes(frame_size, curve[0], curve[1])
+        anm_curve.frames, anm_curve.values = create_curve_arrays(frame_size, curve[0], curve[1])
         
         curves_list.append(anm_curve)
     
@@ -358,7 +384,7 @@ def create_lightpoint_curves(curves,frame_size):
     for curve in curves:
         anm_curve = AnmCurve()
         anm_curve.data_path = lightpoint_curves[curve[0].curve_index]
-        anm_curve.keyframes = create_curve_keyframes(frame_size, curve[0], curve[1])
+        anm_curve.frames, anm_curve.values = create_curve_arrays(frame_size, curve[0], curve[1])
         
         curves_list.append(anm_curve)
     
@@ -373,7 +399,7 @@ def create_ambient_curves(curves,frame_size):
     for curve in curves:
         anm_curve = AnmCurve()
         anm_curve.data_path = ambient_curves[curve[0].curve_index]
-        anm_curve.keyframes = create_curve_keyframes(frame_size, curve[0], curve[1])
+        anm_curve.frames, anm_curve.values = create_curve_arrays(frame_size, curve[0], curve[1])
         
         curves_list.append(anm_curve)
     
@@ -409,127 +435,30 @@ def create_material_curves(curves,frame_size):
     for curve in curves:
         anm_curve = AnmCurve()
         anm_curve.data_path = material_curves.get(curve[0].curve_index, "unknown")
-        anm_curve.keyframes = create_curve_keyframes(frame_size, curve[0], curve[1])
+        anm_curve.frames, anm_curve.values = create_curve_arrays(frame_size, curve[0], curve[1])
         
         curves_list.append(anm_curve)
     
     return curves_list
 
-def create_curve_keyframes(frame_size, curve, curve_frames):
-    curve_to_convert = {AnmCurveType.VECTOR3FIXED: convert_vector3fixed,
-                        AnmCurveType.VECTOR3LINEAR: convert_vector3linear,
-                        AnmCurveType.VECTOR3BEZIER: convert_vector3bezier,
-                        AnmCurveType.EULERXYZFIXED: convert_eulerxyzfixed,
-                        AnmCurveType.EULERINTERPOLATE: convert_eulerinterpolate,
-                        AnmCurveType.QUATERNIONLINEAR: convert_quaternionlinear,
-                        AnmCurveType.FLOATFIXED: convert_floatfixed,
-                        AnmCurveType.FLOATLINEAR: convert_floatlinear,
-                        AnmCurveType.VECTOR2FIXED: convert_vector2fixed,
-                        AnmCurveType.VECTOR2LINEAR: convert_vector2linear,
-                        AnmCurveType.OPACITYI16TBL: convert_opacityi16tbl,
-                        AnmCurveType.SCALEI16TBL: convert_scalei16tbl,
-                        AnmCurveType.QUATERNIONI16TBL: convert_quaternioni16tbl,
-                        AnmCurveType.COLORRGBTBL: convert_colorrgbtbl,
-                        AnmCurveType.VECTOR3TBL: convert_vector3tbl,
-                        AnmCurveType.FLOATTBLNI: convert_floattblni,
-                        AnmCurveType.QUATERNIONTBL: convert_quaterniontbl,
-                        AnmCurveType.FLOATTBL: convert_floattbl,
-                        AnmCurveType.VECTOR3I16LINEAR: convert_vector3i16linear,
-                        AnmCurveType.VECTOR3TBL_NOINTERP: convert_vector3tbl_nointerp,
-                        AnmCurveType.QUATERNIONI16TBL_NOINTERP: convert_quaternioni16tbl_nointerp,
-                        AnmCurveType.OPACITYI16TBL_NOINTERP: convert_opacityi16tbl_nointerp}
-    
-    keyframes = list(curve_to_convert[curve.curve_format](frame_size, curve.keyframe_count, curve_frames))
-        
-    return keyframes
-
-
-def convert_vector3fixed(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
-    
-
-def convert_vector3linear(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(curve_frames[i][0], curve_frames[i][1:])
-
-def convert_vector3bezier(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(curve_frames[i][0], curve_frames[i][1:])
+def create_curve_arrays(frame_size, curve: BrAnmCurveHeader, curve_frames: Tuple[Optional[np.ndarray], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the frames and values arrays of a curve read by BrAnmEntry."""
+    frames, values = curve_frames
+    count = len(values)
 
-def convert_eulerxyzfixed(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
+    if curve.curve_format == AnmCurveType.EULERINTERPOLATE:
+        # The first value is used as the frame
+        return values[:, 0].copy(), values[:, 1:]
 
-def convert_eulerinterpolate(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(curve_frames[i][0], curve_frames[i][1:])
+    if curve.curve_format == AnmCurveType.FLOATLINEAR:
+        # The stored frame is kept as the first value
+        return np.arange(count, dtype=np.int32) * frame_size, np.column_stack((frames.astype(np.float32), values))
 
-def convert_quaternionlinear(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(curve_frames[i][0], curve_frames[i][1:])
+    if curve.curve_format == AnmCurveType.VECTOR2LINEAR:
+        return np.arange(count, dtype=np.int32), values
 
-def convert_floatfixed(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
+    if frames is None:
+        # Table curves have a keyframe every frame_size frames
+        frames = np.arange(count, dtype=np.int32) * frame_size
 
-def convert_floatlinear(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
-
-def convert_vector2fixed(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
-
-def convert_vector2linear(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(i, curve_frames[i])
-
-def convert_opacityi16tbl(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, list(map(lambda x: x / 0x8000, curve_frames[i])))
-
-def convert_scalei16tbl(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, list(map(lambda x: x / 0x1000, curve_frames[i])))
-
-def convert_quaternioni16tbl(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, list(map(lambda x: x / 0x8000, curve_frames[i])))
-
-def convert_colorrgbtbl(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, list(map(lambda x: x / 0xff, curve_frames[i])))
-
-def convert_vector3tbl(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
-
-def convert_floattblni(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
-
-def convert_quaterniontbl(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
-
-def convert_floattbl(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
-
-def convert_vector3i16linear(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(curve_frames[i][0], list(map(lambda x: x / 0x8000, curve_frames[i][1:])))
-
-def convert_vector3tbl_nointerp(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, curve_frames[i])
-
-def convert_quaternioni16tbl_nointerp(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, list(map(lambda x: x / 0x8000, curve_frames[i])))
-
-def convert_opacityi16tbl_nointerp(frame_size, keyframe_count, curve_frames):
-    for i in range(keyframe_count):
-        yield AnmKeyframe(frame_size * i, list(map(lambda x: x / 0x8000, curve_frames[i])))
-        
+    return frames, values
@@ -1,4 +1,7 @@
 from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 from ...util import *
 
@@ -80,10 +83,8 @@ class AnmCurveType(IntEnum):
 
 class BrAnmCurveHeader(BrStruct):
     def __br_read__(self, br: 'BinaryReader'):
-        self.curve_index = br.read_uint16()  # Might be used for determining the order of curves
-        self.curve_format = br.read_uint16()
-        self.keyframe_count = br.read_uint16()
-        self.curve_flags = br.read_int16()
+        # curve_index might be used for determining the order of curves
+        self.curve_index, self.curve_format, self.keyframe_count, self.curve_flags = br.read_format('3Hh')
 
 class BrAnmEntry(BrStruct):
     def __br_read__(self, br: 'BinaryReader'):
@@ -95,128 +96,75 @@ class BrAnmEntry(BrStruct):
 
         self.curve_headers = br.read_struct(BrAnmCurveHeader, self.curve_count)
 
-        self.curves = list()
-
-        curve_readers = {
-            AnmCurveType.VECTOR3FIXED: self.read_vector3fixed,
-            AnmCurveType.VECTOR3LINEAR: self.read_vector3linear,
-            AnmCurveType.VECTOR3BEZIER: self.read_vector3bezier,
-            AnmCurveType.EULERXYZFIXED: self.read_eulerxyzfixed,
-            AnmCurveType.EULERINTERPOLATE: self.read_eulerinterpolate,
-            AnmCurveType.QUATERNIONLINEAR: self.read_quaternionlinear,
-            AnmCurveType.FLOATFIXED: self.read_floatfixed,
-            AnmCurveType.FLOATLINEAR: self.read_floatlinear,
-            AnmCurveType.VECTOR2FIXED: self.read_vector2fixed,
-            AnmCurveType.VECTOR2LINEAR: self.read_vector2linear,
-            AnmCurveType.OPACITYI16TBL: self.read_opacityi16tbl,
-            AnmCurveType.SCALEI16TBL: self.read_scalei16tbl,
-            AnmCurveType.QUATERNIONI16TBL: self.read_quaternioni16tbl,
-            AnmCurveType.COLORRGBTBL: self.read_colorrgbtbl,
-            AnmCurveType.VECTOR3TBL: self.read_vector3tbl,
-            AnmCurveType.FLOATTBLNI: self.read_floattblni,
-            AnmCurveType.QUATERNIONTBL: self.read_quaterniontbl,
-            AnmCurveType.FLOATTBL: self.read_floattbl,
-            AnmCurveType.VECTOR3I16LINEAR: self.read_vector3i16linear,
-            AnmCurveType.VECTOR3TBL_NOINTERP: self.read_vector3tbl_nointerp,
-            AnmCurveType.QUATERNIONI16TBL_NOINTERP: self.read_quaternioni16tbl_nointerp,
-            AnmCurveType.OPACITYI16TBL_NOINTERP: self.read_opacityi16tbl_nointerp,
-        }
+        # Frames (None if the curve does not store them) and values of each curve
+        self.curves: List[Tuple[Optional[np.ndarray], np.ndarray]] = list()
 
         for header in self.curve_headers:
-            curve = [None] * header.keyframe_count
-            reader = curve_readers.get(header.curve_format)
-            if reader:
-                reader(br, header, curve)
+            if header.curve_format in ANM_CURVE_FORMATS:
+                self.curves.append(self.read_curve(br, header))
             else:
                 print(f'NuccChunkAnm: Unsupported curve format {header.curve_format}')
+                self.curves.append((None, np.zeros((0, 0), np.float32)))
             br.align_pos(4)
-            self.curves.append(curve)
-
-    def read_vector3fixed(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(3)
-
-    def read_vector3linear(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = (br.read_int32(), *br.read_float(3))
-
-    def read_vector3bezier(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = (br.read_int32(), *br.read_float(3))
-
-    def read_eulerxyzfixed(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(3)
-
-    def read_eulerinterpolate(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(3)
-
-    def read_quaternionlinear(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = (br.read_int32(), *br.read_float(4))
-
-    def read_floatfixed(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(1)
-
-    def read_floatlinear(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = (br.read_int32(), br.read_float())
-
-    def read_vector2fixed(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_int16(1)
-
-    def read_vector2linear(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_int16(3)
-
-    def read_opacityi16tbl(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_int16(1)
-
-    def read_scalei16tbl(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_int16(3)
-
-    def read_quaternioni16tbl(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_int16(4)
-
-    def read_colorrgbtbl(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_uint8(3)
-
-    def read_vector3tbl(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(3)
-
-    def read_floattblni(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(1)
-
-    def read_quaterniontbl(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(4)
-
-    def read_floattbl(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(1)
-
-    def read_vector3i16linear(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = (br.read_int16(), *br.read_float(3))
-
-    def read_vector3tbl_nointerp(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_float(3)
-
-    def read_quaternioni16tbl_nointerp(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_int16(4)
-
-    def read_opacityi16tbl_nointerp(self, br, header, curve):
-        for i in range(header.keyframe_count):
-            curve[i] = br.read_int16(1)
 
+    def read_curve(self, br: 'BinaryReader', header: BrAnmCurveHeader) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """Reads all keyframes of a curve at once, and returns its frames and dequantized values as arrays."""
+        frame_format, _, _, scale = ANM_CURVE_FORMATS[header.curve_format]
+        dtype = get_anm_curve_dtype(header.curve_format)
+
+        records = np.frombuffer(br.read_bytes(dtype.itemsize * header.keyframe_count), dtype)
+
+        frames = records['frame'].astype(np.int32) if frame_format else None
+
+        values = records['values']
+        if scale:
+            values = (values / scale).astype(np.float32)
+        else:
+            values = values.astype(values.dtype.newbyteorder('='))
+
+        return frames, values
+
+
+# Format of the frame (None if the curve does not store frames), format and count of the values,
+# and the value that the stored values are divided by (None if they are not quantized) for each curve type
+ANM_CURVE_FORMATS: Dict[AnmCurveType, Tuple[Optional[str], str, int, Optional[int]]] = {
+    AnmCurveType.VECTOR3FIXED: (None, '>f4', 3, None),
+    AnmCurveType.VECTOR3LINEAR: ('>i4', '>f4', 3, None),
+    AnmCurveType.VECTOR3BEZIER: ('>i4', '>f4', 3, None),
+    AnmCurveType.EULERXYZFIXED: (None, '>f4', 3, None),
+    AnmCurveType.EULERINTERPOLATE: (None, '>f4', 3, None),
+    AnmCurveType.QUATERNIONLINEAR: ('>i4', '>f4', 4, None),
+    AnmCurveType.FLOATFIXED: (None, '>f4', 1, None),
+    AnmCurveType.FLOATLINEAR: ('>i4', '>f4', 1, None),
+    AnmCurveType.VECTOR2FIXED: (None, '>i2', 1, None),
+    AnmCurveType.VECTOR2LINEAR: (None, '>i2', 3, None),
+    AnmCurveType.OPACITYI16TBL: (None, '>i2', 1, 0x8000),
+    AnmCurveType.SCALEI16TBL: (None, '>i2', 3, 0x1000),
+    AnmCurveType.QUATERNIONI16TBL: (None, '>i2', 4, 0x8000),
+    AnmCurveType.COLORRGBTBL: (None, 'u1', 3, 0xFF),
+    AnmCurveType.VECTOR3TBL: (None, '>f4', 3, None),
+    AnmCurveType.FLOATTBLNI: (None, '>f4', 1, None),
+    AnmCurveType.QUATERNIONTBL: (None, '>f4', 4, None),
+    AnmCurveType.FLOATTBL: (None, '>f4', 1, None),
+    AnmCurveType.VECTOR3I16LINEAR: ('>i2', '>f4', 3, 0x8000),
+    AnmCurveType.VECTOR3TBL_NOINTERP: (None, '>f4', 3, None),
+    AnmCurveType.QUATERNIONI16TBL_NOINTERP: (None, '>i2', 4, 0x8000),
+    AnmCurveType.OPACITYI16TBL_NOINTERP: (None, '>i2', 1, 0x8000),
+}
+
+ANM_CURVE_DTYPES: Dict[int, np.dtype] = dict()
+
+
+def get_anm_curve_dtype(curve_format: int) -> np.dtype:
+    """Returns the NumPy dtype of a keyframe of the given curve type, with a "frame" field (if the curve stores frames) and a "values" field."""
+    dtype = ANM_CURVE_DTYPES.get(curve_format)
+
+    if dtype is None:
+        frame_format, value_format, value_count, _ = ANM_CURVE_FORMATS[curve_format]
+
+        fields = [('frame', frame_format)] if frame_format else []
+        fields.append(('values', value_format, (value_count,)))
+
+        dtype = ANM_CURVE_DTYPES[curve_format] = np.dtype(fields)
+
+    return dtype
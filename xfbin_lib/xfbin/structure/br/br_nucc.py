@@ -1,14 +1,20 @@
+import numpy as np
+
 from ...util import *
+from ..decode_cache import load_cached, store_cached
 from .br_anm import *
 from .br_nud import *
 from .br_nut import *
 
+# BrNuccChunk types by their type strings (both "nuccChunkX" and "NuccChunkX"), filled when a type is first looked up
+BR_NUCC_TYPES: Dict[str, type] = dict()
+
 
 class BrNuccChunk(BrStruct):
     name: str
     filePath: str
     chunk_type: str
-    data: bytearray
+    data: memoryview
     version: int
     anmvalue: int
 
@@ -31,8 +37,8 @@ class BrNuccChunk(BrStruct):
         self.init_data(br)
 
     def init_data(self, br: BinaryReader):
-        # Store the data to be given to the NuccChunk instance later
-        self.data = br.buffer()
+        # Store the data to be given to the NuccChunk instance later, as a view of the XFBIN's buffer instead of a copy
+        self.data = br.view()
         br.seek(0)
 
     def __br_write__(self, br: 'BinaryReader', chunkIndexDict: IterativeDict) -> None:
@@ -47,21 +53,34 @@ class BrNuccChunk(BrStruct):
 
     @classmethod
     def get_br_nucc_type_from_str(cls, type_str: str) -> type:
-        # Get the type from a string after capitalizing its first character and prepending "Br" to it
-        type_name = "Br" + type_str[0].upper() + type_str[1:]
-        result = globals().get(type_name, None)
+        result = BR_NUCC_TYPES.get(type_str)
 
         if result is None:
-            # Create a new type and add it to the globals
-            result = type(type_name, (cls,), {})
-            globals()[type_name] = result
+            # Get the type from a string after capitalizing its first character and prepending "Br" to it
+            type_name = "Br" + type_str[0].upper() + type_str[1:]
+            result = globals().get(type_name, None)
+
+            if result is None:
+                # Create a new type and add it to the globals
+                result = type(type_name, (cls,), {})
+                globals()[type_name] = result
+
+            BR_NUCC_TYPES[type_str] = result
 
         return result
 
+    @classmethod
+    def register_br_nucc_type(cls, type_str: str, br_nucc_type: type) -> None:
+        """Registers the BrNuccChunk type to be used for reading and writing chunks of the given type string.\n
+        Only needed for types that are not defined in this module (or named differently), as those are found by their names.
+        """
+        BR_NUCC_TYPES[type_str] = br_nucc_type
+        BR_NUCC_TYPES[type_str[0].swapcase() + type_str[1:]] = br_nucc_type
+
     @classmethod
     def create_from_nucc_type(cls, type_str, file_path, name, data, version, anmvalue) -> 'BrNuccChunk':
         # Read a BrNuccChunk struct from the data using the type and set the name and file path
-        return BinaryReader(data, Endian.BIG).read_struct(cls.get_br_nucc_type_from_str(type_str), None, file_path, name, type_str, version, anmvalue)
+        return BinaryReader(data, Endian.BIG, readonly=True).read_struct(cls.get_br_nucc_type_from_str(type_str), None, file_path, name, type_str, version, anmvalue)
 
 
 class BrNuccChunkNull(BrNuccChunk):
@@ -98,10 +117,16 @@ class BrNuccChunkTexture(BrNuccChunk):
 
         self.nutSize = br.read_uint32()
 
+        # Skip parsing the NUT if its decoded Nut is cached
+        self.cachedNut = load_cached(self)
+        if self.cachedNut is not None:
+            self.brNut = None
+            return
+
         try:
-            self.nut_data = br.buffer()[br.pos(): br.pos() + self.nutSize]
+            self.nut_data = self.data[br.pos(): br.pos() + self.nutSize]
             self.brNut = BinaryReader(
-                self.nut_data, Endian.BIG).read_struct(BrNut)
+                self.nut_data, Endian.BIG, readonly=True).read_struct(BrNut)
         except:
             print(
                 f'Failed to read chunk: {self.name} of type: {type(self).__qualname__}')
@@ -387,7 +412,10 @@ class BrNuccChunkModel(BrNuccChunk):
         
         self.nud_pos = br.pos()
         self.nud_data = br.read_bytes(self.nudSize)
-        self.brNud = BinaryReader(self.nud_data, Endian.BIG).read_struct(BrNud)
+
+        # Skip parsing the NUD if its decoded Nud is cached
+        self.cachedNud = load_cached(self)
+        self.brNud = BinaryReader(self.nud_data, Endian.BIG, readonly=True).read_struct(BrNud) if self.cachedNud is None else None
 
         self.materialCount = br.read_uint16()
         self.materialIndices = br.read_uint32(self.materialCount)
@@ -569,24 +597,20 @@ class BrModelHit(BrStruct):
             br.seek(8, 1)
         
         self.vertex_count = self.mesh_vertex_size * 3
-        self.mesh_vertices = [br.read_float(3)
-                              for i in range(self.vertex_count)]
+
+        # (vertex count, 3) big endian array over the chunk's buffer, with 3 vertices for each triangle
+        self.mesh_vertices = np.frombuffer(br.read_bytes(self.vertex_count * 12), '>f4').reshape(-1, 3)
 
     def __br_write__(self, br: 'BinaryReader', hit: 'ModelHit'):
         br.write_uint32(hit.mesh_vertex_size)
         br.write_uint8(hit.unk_count)
         br.write_uint8(hit.flags)
-        for vertices in hit.mesh_vertices:
-            br.write_float(vertices)
+        br.write_bytes(np.asarray(hit.mesh_vertices, '>f4').tobytes())
 
 
 class BrNuccChunkBillboard(BrNuccChunk):
-    def init_data(self, br: BinaryReader):
-        super().init_data(br)
-        self.data = br.read_uint8(len(br.buffer()))
-
     def __br_write__(self, br: 'BinaryReader', chunkIndexDict: IterativeDict):
-        br.write_uint8(self.nuccChunk.data)
+        br.write_bytes(self.nuccChunk.data)
 
 class BrNuccChunkModelPrimitiveBatch(BrNuccChunk):
     def init_data(self, br: BinaryReader):
@@ -620,32 +644,28 @@ class BrNuccChunkPrimitiveVertex(BrNuccChunk):
         self.vertex_size = br.read_uint32()
         self.vertex_count = br.read_uint32()
 
-        if self.vertex_size == 48:
-            self.vertices = br.read_struct(BrPrimitiveVertex48, self.vertex_count)
-        elif self.vertex_size == 64:
-            self.vertices = br.read_struct(BrPrimitiveVertex64, self.vertex_count)
+        dtype = PRIMITIVE_VERTEX_DTYPES.get(self.vertex_size)
+        if dtype is None:
+            # Vertices of unknown sizes are not read
+            dtype = PRIMITIVE_VERTEX_DTYPES[48]
+            self.vertex_count = 0
 
+        # The vertex attributes are strided big endian arrays over the records in the chunk's buffer
+        records = np.frombuffer(br.read_bytes(dtype.itemsize * self.vertex_count), dtype)
 
-class BrPrimitiveVertex64(BrStruct):
-    def __br_read__(self, br: BinaryReader):
-        self.position = br.read_float(3)
-        br.seek(4, 1)
-        self.normal = br.read_float(3)
-        br.seek(4, 1)
-        self.color = br.read_float(4)
-        self.uv = br.read_float(2)
-        br.seek(8, 1)
+        self.positions: np.ndarray = records['position']
+        self.normals: np.ndarray = records['normal']
+        self.uvs: np.ndarray = records['uv']
 
+        # 48 byte vertices do not have colors, so they are white
+        self.colors: np.ndarray = records['color'] if 'color' in records.dtype.names else np.ones((len(records), 4), np.float32)
 
-class BrPrimitiveVertex48(BrStruct):
-    def __br_read__(self, br: BinaryReader):
-        self.position = br.read_float(3)
-        br.seek(4, 1)
-        self.normal = br.read_float(3)
-        br.seek(4, 1)
-        self.color = (1.0, 1.0, 1.0, 1.0)
-        self.uv = br.read_float(2)
-        br.seek(8, 1)
+
+# Vertex record dtypes by vertex size, with padding after the position and normal, and at the end
+PRIMITIVE_VERTEX_DTYPES: Dict[int, np.dtype] = {
+    48: create_dtype({'position': (0x00, '3>f4'), 'normal': (0x10, '3>f4'), 'uv': (0x20, '2>f4')}, 48),
+    64: create_dtype({'position': (0x00, '3>f4'), 'normal': (0x10, '3>f4'), 'color': (0x20, '4>f4'), 'uv': (0x30, '2>f4')}, 64),
+}
 
 
 class BrNuccChunkParticles(BrNuccChunk):
@@ -654,9 +674,19 @@ class BrNuccChunkParticles(BrNuccChunk):
 
 
 class BrNuccChunkAnm(BrNuccChunk):
+    # Attributes that are stored in the decode cache
+    cachedAttributes = ('frame_count', 'frame_size', 'entry_count', 'loop_flag', 'clump_count', 'other_entry_count',
+                        'other_index_count', 'coord_count', 'clumps', 'other_entry_indices', 'coord_parents', 'entries')
+
     def init_data(self, br: BinaryReader):
         super().init_data(br)
 
+        # Skip parsing the clumps and entries if they are cached
+        cached = load_cached(self)
+        if cached is not None:
+            self.__dict__.update(cached)
+            return
+
         self.frame_count = br.read_uint32()
         if self.version > 101:
             self.frame_size = br.read_uint32()  # Usually 100 (0x64)
@@ -678,6 +708,8 @@ class BrNuccChunkAnm(BrNuccChunk):
 
         self.entries = br.read_struct(BrAnmEntry, self.entry_count)
 
+        store_cached(self, {k: getattr(self, k) for k in self.cachedAttributes})
+
     
     def __br_write__(self, br: 'BinaryReader', chunkIndexDict: IterativeDict):
         br.write_uint32(self.nuccChunk.frame_count * 100)
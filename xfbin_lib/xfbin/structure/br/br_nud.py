@@ -1,6 +1,7 @@
 from enum import IntFlag
-from typing import List, Tuple
-import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 from ...util import *
 
@@ -186,7 +187,7 @@ class BrNudMesh(BrStruct):
 
         # Faces
         with br.seek_to(self.polyClumpStart):
-            self.faces = br.read_int16(self.faceCount)
+            self.faces: np.ndarray = np.frombuffer(br.read_bytes(self.faceCount * 2), '>u2').astype(np.uint16)
 
         # UV + Vertices
         with br.seek_to(self.vertClumpStart):
@@ -194,35 +195,33 @@ class BrNudMesh(BrStruct):
 
             vertexType = self.vertexSize & 0x0F
 
-            colors = list()
-            uvs = list()
+            # Each buffer is decoded at once as an array of records, then split into an array for each attribute
+            uv_records = None
             if boneType > 0:
-                uvCount = self.uvSize >> 4
-                uvType = self.uvSize & 0x0F
-
-                for i in range(self.vertexCount):
-                    if uvType == NudUvType.Null:
-                        colors.append(tuple())
-                    elif uvType == NudUvType.Byte:
-                        colors.append(br.read_uint8(4))
-                    elif uvType == NudUvType.HalfFloat:
-                        colors.append(
-                            list(map(lambda x: int(x * 255), br.read_half_float(4))))
-                        
-
-                    uvs.append(list())
-                    for _ in range(uvCount):
-                        uvs[i].append(br.read_half_float(2))
-
+                # Colors and UVs are stored separately from the rest of the vertex when the mesh has bones
+                uv_records = self.read_records(br, get_nud_uv_dtype(self.uvSize))
                 br.seek(self.vertAddClumpStart)
 
-            self.vertices = br.read_struct(
-                BrNudVertex, self.vertexCount, vertexType, boneType, self.uvSize)
+            records = self.read_records(br, get_nud_vertex_dtype(vertexType, boneType, self.uvSize))
 
-            if boneType > 0:
-                for i in range(self.vertexCount):
-                    self.vertices[i].color = colors[i]
-                    self.vertices[i].uv = uvs[i]
+            self.positions: np.ndarray = get_field_array(records, 'position')
+            self.normals: Optional[np.ndarray] = get_field_array(records, 'normal')
+            self.biTangents: Optional[np.ndarray] = get_field_array(records, 'bitangent')
+            self.tangents: Optional[np.ndarray] = get_field_array(records, 'tangent')
+
+            self.boneIds: Optional[np.ndarray] = get_field_array(records, 'bone_ids')
+            self.boneWeights: Optional[np.ndarray] = get_field_array(records, 'bone_weights')
+            if boneType == NudBoneType.Byte:
+                self.boneWeights = self.boneWeights / np.float32(255)
+
+            if uv_records is not None:
+                records = uv_records
+
+            self.colors: Optional[np.ndarray] = get_field_array(records, 'color')
+            if self.colors is not None and self.colors.dtype.kind == 'f':
+                self.colors = (self.colors.astype(np.float64) * 255).astype(np.int32)
+
+            self.uvs: np.ndarray = get_field_array(records, 'uv')
 
         # Materials
         i = 0
@@ -233,23 +232,35 @@ class BrNudMesh(BrStruct):
                     BrNudMaterial, None, self, nud.nameStart))
             i += 1
 
+    def read_records(self, br: BinaryReader, dtype: np.dtype) -> np.ndarray:
+        if dtype.itemsize == 0:
+            # Nothing to read (for example, no colors and no UVs)
+            return np.empty(self.vertexCount, dtype)
+
+        return np.frombuffer(br.read_bytes(dtype.itemsize * self.vertexCount), dtype)
+
     def __br_write__(self, br: 'BinaryReader', mesh: 'NudMesh', buffers: NudBuffers, mesh_groups_count, mesh_count):
+        arrays = mesh.get_vertex_arrays()
+        vertex_count = len(arrays['position'])
+        uv_count = arrays['uv'].shape[1] if arrays['uv'] is not None else 0
+
         # Set the formats we're going to use
         vertex_type = mesh.vertex_type
-        bone_type = mesh.bone_type if mesh.has_bones() else NudBoneType.NoBones
-        uv_type = mesh.uv_type if mesh.has_color() else NudUvType.Null
+        bone_type = mesh.bone_type if (arrays['bone_ids'] is not None and vertex_count) else NudBoneType.NoBones
+        uv_type = mesh.uv_type if (arrays['color'] is not None and vertex_count) else NudUvType.Null
+        uv_size = (uv_count << 4) | uv_type
 
         br.write_uint32(buffers.polyClump.size())
         br.write_uint32(buffers.vertClump.size())
         br.write_uint32(buffers.vertAddClump.size() if bone_type else 0)
 
-        br.write_uint16(len(mesh.vertices))
+        br.write_uint16(vertex_count)
 
         # Write vertex size
         br.write_uint8(vertex_type | bone_type)
 
         # Write UV and vertex color format
-        br.write_uint8((mesh.get_uv_channel_count() << 4) | uv_type)
+        br.write_uint8(uv_size)
 
         # Write materials
         tex_props = [0] * 4
@@ -262,8 +273,12 @@ class BrNudMesh(BrStruct):
         for tex_prop in tex_props:
             br.write_uint32(tex_prop)
 
+        # Write faces
+        faces = encode_triangle_strips(mesh.faces).astype('>u2').tobytes()
+        buffers.polyClump.write_bytes(faces)
+
         # Write face count and format
-        br.write_uint16((len(mesh.faces) * 4) - 1)
+        br.write_uint16(len(faces) // 2)
 
         # Unlike the usual 0x04 and 0x40 formats, CC2 NUDs only support strips (0x04) but this flag is always 0
         br.write_uint8(0)
@@ -272,34 +287,14 @@ class BrNudMesh(BrStruct):
         # Padding
         br.write_uint32([0] * 3)
 
-        # Write faces
-        for face in mesh.faces[:-1]:
-            buffers.polyClump.write_int16((face[2], face[0], face[1]))
-            buffers.polyClump.write_int16(-1)
-
-        # Write the last triangle (without the -1)
-        buffers.polyClump.write_int16(
-            (mesh.faces[-1][2], mesh.faces[-1][0], mesh.faces[-1][1]))
-
         # Write UV + vertices
         vertex_br = buffers.vertClump
         if bone_type != NudBoneType.NoBones:
             vertex_br = buffers.vertAddClump
-            for vertex in mesh.vertices:
-                if uv_type == NudUvType.Byte:
-                    buffers.vertClump.write_uint8(vertex.color)
-                elif uv_type == NudUvType.HalfFloat:
-                    buffers.vertClump.write_half_float(
-                        tuple(map(lambda x: x / 255, vertex.color)))
-
-                for uv in vertex.uv:
-                    buffers.vertClump.write_half_float(uv)
-
+            buffers.vertClump.write_bytes(encode_records(get_nud_uv_dtype(uv_size), vertex_count, arrays))
 
-
-        for vertex in mesh.vertices:
-            vertex_br.write_struct(BrNudVertex(), vertex,
-                                   vertex_type, bone_type, uv_type)
+        vertex_br.write_bytes(encode_records(
+            get_nud_vertex_dtype(vertex_type, bone_type, uv_size), vertex_count, arrays, NUD_VERTEX_PADDING[vertex_type]))
 
         buffers.vertAddClump.align(4)
 
@@ -326,122 +321,242 @@ class NudUvType(IntFlag):
     HalfFloat = 4
 
 
-class BrNudVertex(BrStruct):
-    def __br_read__(self, br: BinaryReader, vertexType, boneType, uvSize) -> None:
-        self.position = br.read_float(3)
-        self.normals = None
-        self.biTangents = None
-        self.tangents = None
-
-        self.color = None
-        self.uv = None
-
-        self.boneIds = None
-        self.boneWeights = None
-
-        if vertexType == NudVertexType.NoNormals:
-            br.read_float()
-        elif vertexType == NudVertexType.NormalsFloat:
-            br.read_float()
-            self.normals = br.read_float(3)
-            br.read_float()
-        elif vertexType == NudVertexType.Unknown:
-            self.normals = br.read_float(3)
-            br.read_float()
-            br.read_float(3)
-            br.read_float(3)
-            br.read_float(3)
-        elif vertexType == NudVertexType.NormalsTanBiTanFloat:
-            br.read_float()
-            self.normals = br.read_float(3)
-            br.read_float()
-            self.biTangents = br.read_float(4)
-            self.tangents = br.read_float(4)
-        elif vertexType == NudVertexType.NormalsHalfFloat:
-            self.normals = br.read_half_float(3)
-            br.read_half_float()
-        elif vertexType == NudVertexType.NormalsTanBiTanHalfFloat:
-            self.normals = br.read_half_float(3)
-            br.read_half_float()
-            self.biTangents = br.read_half_float(4)
-            self.tangents = br.read_half_float(4)
-        else:
-            raise Exception(f'Unsupported vertex type: {vertexType}')
-
-        if boneType == NudBoneType.NoBones:
-            if uvSize >= 18:
-                self.color = br.read_uint8(4)
-
-            self.uv = list()
-            for _ in range(uvSize >> 4):
-                self.uv.append(br.read_half_float(2))
-        elif boneType == NudBoneType.Float:
-            self.boneIds = br.read_uint32(4)
-            self.boneWeights = br.read_float(4)
-        elif boneType == NudBoneType.HalfFloat:
-            self.boneIds = br.read_uint16(4)
-            self.boneWeights = br.read_half_float(4)
-        elif boneType == NudBoneType.Byte:
-            self.boneIds = br.read_uint8(4)
-            self.boneWeights = list(
-                map(lambda x: float(x) / 255, br.read_uint8(4)))
-            
-        else:
-            raise Exception(f'Unsupported bone type: {boneType}')
-
-    def __br_write__(self, br: 'BinaryReader', vertex: 'NudVertex', vertexType: NudVertexType, boneType: NudBoneType, uvType: int):
-        br.write_float(vertex.position)
-
-        if vertexType == NudVertexType.NoNormals:
-            br.write_float(1.0)
-        elif vertexType == NudVertexType.NormalsFloat:
-            br.write_float(1.0)
-            br.write_float(vertex.normal)
-            br.write_float(1.0)
-        elif vertexType == NudVertexType.Unknown:
-            br.write_float(vertex.normal)
-            br.write_float(1.0)
-            br.write_float([1] * 3)
-            br.write_float([1] * 3)
-            br.write_float([1] * 3)
-        elif vertexType == NudVertexType.NormalsTanBiTanFloat:
-            br.write_float(1.0)
-            br.write_float(vertex.normal if vertex.normal else [0] * 3)
-            br.write_float(1.0)
-            br.write_float(vertex.bitangent[:3]
-                           if vertex.bitangent else [0] * 3)
-            br.write_float(0)
-            br.write_float(vertex.tangent[:3] if vertex.tangent else [0] * 3)
-            br.write_float(0)
-        elif vertexType == NudVertexType.NormalsHalfFloat:
-            br.write_half_float(vertex.normal)
-            br.write_half_float(0)
-        elif vertexType == NudVertexType.NormalsTanBiTanHalfFloat:
-            br.write_half_float(vertex.normal)
-            br.write_half_float(0)
-            br.write_half_float(vertex.bitangent[:3])
-            br.write_half_float(0)
-            br.write_half_float(vertex.tangent[:3])
-            br.write_half_float(0)
-        else:
-            raise Exception(f'Unsupported vertex type: {vertexType}')
-
-        if boneType == NudBoneType.NoBones:
-            if uvType:
-                br.write_uint8(vertex.color)
-
-            for uv in vertex.uv:
-                br.write_half_float(uv)
-        elif boneType == NudBoneType.Float:
-            br.write_uint32(vertex.bone_ids)
-            br.write_float(vertex.bone_weights)
-        elif boneType == NudBoneType.HalfFloat:
-            br.write_uint16(vertex.bone_ids)
-            br.write_half_float(vertex.bone_weights)
-        elif boneType == NudBoneType.Byte:
-            br.write_uint8(vertex.bone_ids)
-            br.write_float(
-                tuple(map(lambda x: int(x * 255), vertex.bone_weights)))
+# Offsets and formats of the vertex attributes for each type, and the size of the vertex without the bone attributes
+NUD_VERTEX_LAYOUTS: Dict[NudVertexType, Tuple[Dict[str, Tuple[int, str]], int]] = {
+    NudVertexType.NoNormals: ({'position': (0, '3>f4')}, 0x10),
+    NudVertexType.NormalsFloat: ({'position': (0, '3>f4'), 'normal': (0x10, '3>f4')}, 0x20),
+    NudVertexType.Unknown: ({'position': (0, '3>f4'), 'normal': (0xC, '3>f4')}, 0x40),
+    NudVertexType.NormalsTanBiTanFloat: ({'position': (0, '3>f4'), 'normal': (0x10, '3>f4'),
+                                          'bitangent': (0x20, '4>f4'), 'tangent': (0x30, '4>f4')}, 0x40),
+    NudVertexType.NormalsHalfFloat: ({'position': (0, '3>f4'), 'normal': (0xC, '3>f2')}, 0x14),
+    NudVertexType.NormalsTanBiTanHalfFloat: ({'position': (0, '3>f4'), 'normal': (0xC, '3>f2'),
+                                              'bitangent': (0x14, '4>f2'), 'tangent': (0x1C, '4>f2')}, 0x24),
+}
+
+# Formats of the bone IDs and weights for each bone type
+NUD_BONE_FORMATS: Dict[NudBoneType, Tuple[str, str]] = {
+    NudBoneType.Float: ('4>u4', '4>f4'),
+    NudBoneType.HalfFloat: ('4>u2', '4>f2'),
+    NudBoneType.Byte: ('4u1', '4u1'),
+}
+
+# Formats of the colors stored with the UVs for each UV type (when the mesh has bones)
+NUD_COLOR_FORMATS: Dict[NudUvType, Optional[str]] = {
+    NudUvType.Null: None,
+    NudUvType.Byte: '4u1',
+    NudUvType.HalfFloat: '4>f2',
+}
+
+
+def create_dtype(fields: Dict[str, Tuple[int, str]], size: int) -> np.dtype:
+    # Padding and unused values are skipped by only including the attributes with their offsets
+    return np.dtype({'names': list(fields.keys()),
+                     'formats': [f for (_, f) in fields.values()],
+                     'offsets': [o for (o, _) in fields.values()],
+                     'itemsize': size})
+
+
+def add_uv_fields(fields: Dict[str, Tuple[int, str]], offset: int, uv_count: int) -> int:
+    if uv_count:
+        fields['uv'] = (offset, f'({uv_count},2)>f2')
+
+    return offset + (uv_count * 4)
+
+
+def get_nud_vertex_dtype(vertex_type: int, bone_type: int, uv_size: int) -> np.dtype:
+    """Returns the NumPy dtype of a vertex with the given types, as stored in vertClump (or vertAddClump if the mesh has bones)."""
+    if vertex_type not in NUD_VERTEX_LAYOUTS:
+        raise Exception(f'Unsupported vertex type: {vertex_type}')
+
+    layout, offset = NUD_VERTEX_LAYOUTS[vertex_type]
+    fields = dict(layout)
+
+    if bone_type == NudBoneType.NoBones:
+        if uv_size >= 18:
+            fields['color'] = (offset, '4u1')
+            offset += 4
+
+        offset = add_uv_fields(fields, offset, uv_size >> 4)
+    elif bone_type in NUD_BONE_FORMATS:
+        fields['bone_ids'] = (offset, NUD_BONE_FORMATS[bone_type][0])
+        offset += np.dtype(NUD_BONE_FORMATS[bone_type][0]).itemsize
+
+        fields['bone_weights'] = (offset, NUD_BONE_FORMATS[bone_type][1])
+        offset += np.dtype(NUD_BONE_FORMATS[bone_type][1]).itemsize
+    else:
+        raise Exception(f'Unsupported bone type: {bone_type}')
+
+    return create_dtype(fields, offset)
+
+
+def get_nud_uv_dtype(uv_size: int) -> np.dtype:
+    """Returns the NumPy dtype of the colors and UVs of a vertex, as stored in vertClump when the mesh has bones."""
+    fields = dict()
+    offset = 0
+
+    color_format = NUD_COLOR_FORMATS.get(uv_size & 0x0F)
+    if color_format:
+        fields['color'] = (offset, color_format)
+        offset += np.dtype(color_format).itemsize
+
+    offset = add_uv_fields(fields, offset, uv_size >> 4)
+
+    return create_dtype(fields, offset)
+
+
+# Values written in the unused parts of each vertex type
+NUD_VERTEX_PADDING: Dict[NudVertexType, List[Tuple[int, str, float]]] = {
+    NudVertexType.NoNormals: [(0xC, '>f4', 1.0)],
+    NudVertexType.NormalsFloat: [(0xC, '>f4', 1.0), (0x1C, '>f4', 1.0)],
+    NudVertexType.Unknown: [(0x18, '10>f4', 1.0)],
+    NudVertexType.NormalsTanBiTanFloat: [(0xC, '>f4', 1.0), (0x1C, '>f4', 1.0)],
+    NudVertexType.NormalsHalfFloat: [],
+    NudVertexType.NormalsTanBiTanHalfFloat: [],
+}
+
+# Used for vertices that do not have a color when the vertex format has one (same as Smash Forge's default color)
+NUD_DEFAULT_COLOR = 0x7F
+
+
+def encode_records(dtype: np.dtype, count: int, arrays: Dict[str, Optional[np.ndarray]], padding: List[Tuple[int, str, float]] = []) -> bytes:
+    """Encodes the vertex attribute arrays (see get_field_array) as an array of records using a dtype from get_nud_vertex_dtype or get_nud_uv_dtype,
+    then returns the records as bytes. Each attribute is converted in a single operation.
+    """
+    fields = {name: (offset, dtype.fields[name][0]) for (name, (_, offset)) in dtype.fields.items()}
+    fields.update({f'padding{i}': (offset, np.dtype(fmt)) for (i, (offset, fmt, _)) in enumerate(padding)})
+
+    records = np.zeros(count, np.dtype({'names': list(fields.keys()),
+                                        'formats': [f for (_, f) in fields.values()],
+                                        'offsets': [o for (o, _) in fields.values()],
+                                        'itemsize': dtype.itemsize}))
+
+    for i, (_, _, value) in enumerate(padding):
+        records[f'padding{i}'] = value
+
+    for name in dtype.names:
+        field = records[name]
+        array = arrays.get(name)
+
+        if name == 'color':
+            if array is None:
+                field[:] = NUD_DEFAULT_COLOR
+            elif field.dtype.base.kind == 'f':
+                field[:] = np.asarray(array, np.float32) / 255
+            else:
+                field[:] = array
+        elif name == 'bone_weights' and field.dtype.base.kind == 'u':
+            # Byte weights
+            field[:] = (np.asarray(array, np.float32) * 255).astype(np.uint8)
+        elif name in ('bitangent', 'tangent'):
+            # Only the first 3 values are written, and the last one is always 0
+            if array is not None:
+                field[:, :3] = np.asarray(array)[:, :3]
+        elif array is not None:
+            field[:] = array
+
+    return records.tobytes()
+
+
+# Index that ends the current strip and starts a new one (-1 as int16)
+STRIP_RESTART = 0xFFFF
+
+
+def decode_triangle_strips(indices: np.ndarray) -> np.ndarray:
+    """Converts an array of triangle strips separated by restart indices into an (n, 3) array of triangles.
+    The winding of every other triangle in a strip is flipped, and degenerate triangles are removed.
+    """
+    # Signed indices are also accepted, so -1 becomes the restart index
+    indices = np.asarray(indices).astype(np.uint16)
+
+    if len(indices) < 3:
+        return np.zeros((0, 3), np.uint16)
+
+    restart = indices == STRIP_RESTART
+
+    # Position of each index relative to the start of its strip
+    positions = np.arange(len(indices))
+    positions = positions - np.maximum.accumulate(np.where(restart, positions + 1, 0))
+
+    # Every 3 consecutive indices without a restart make a triangle
+    a, b, c = indices[:-2], indices[1:-1], indices[2:]
+    valid = ~(restart[:-2] | restart[1:-1] | restart[2:])
+    valid &= (a != b) & (b != c) & (a != c)
+
+    odd = (positions[:-2] & 1).astype(bool)
+
+    # Even triangles are (b, c, a) and odd triangles are (c, b, a)
+    triangles = np.stack((np.where(odd, c, b), np.where(odd, b, c), a), axis=1)
+
+    return triangles[valid]
+
+
+def encode_triangle_strips(faces: np.ndarray) -> np.ndarray:
+    """Converts an (n, 3) array of triangles into an array of triangle strips separated by restart indices.
+    Consecutive triangles are joined into the same strip when the second one continues the first with the correct winding,
+    which restores the original strips of faces that were decoded with decode_triangle_strips. Degenerate triangles are removed.
+    """
+    faces = np.asarray(faces, np.uint16).reshape(-1, 3)
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+
+    count = len(faces)
+    if not count:
+        return np.zeros(0, np.uint16)
+
+    current, following = faces[:-1], faces[1:]
+
+    # Whether each triangle can be followed by the next one, if it's an even or an odd triangle of its strip
+    joins_even = (following[:, 1] == current[:, 1]) & (following[:, 2] == current[:, 0])
+    joins_odd = (following[:, 0] == current[:, 0]) & (following[:, 2] == current[:, 1])
+
+    # Assuming that a strip starts at an even or odd triangle index, whether each triangle joins the next one
+    even_index = (np.arange(count - 1) & 1) == 0
+    joins = (np.where(even_index, joins_even, joins_odd), np.where(even_index, joins_odd, joins_even))
+
+    # Index of the first triangle at or after each triangle that does not join the next one
+    ends = list()
+    for j in joins:
+        breaks = np.append(np.flatnonzero(~j), count - 1)
+        ends.append(breaks[np.searchsorted(breaks, np.arange(count))])
+
+    # Find the strips greedily, each one ends at the first triangle that does not continue it
+    starts = list()
+    start = 0
+    while start < count:
+        starts.append(start)
+        start = ends[start & 1][start] + 1
+
+    starts = np.array(starts)
+    lengths = np.diff(np.append(starts, count))
+
+    # Each strip's first triangle adds 3 indices, and each of the other triangles adds 1 index
+    first = faces[starts][:, (2, 0, 1)]
+
+    local = np.arange(count) - np.repeat(starts, lengths)
+    rest = np.flatnonzero(local > 0)
+    rest_indices = np.where(local[rest] & 1, faces[rest, 0], faces[rest, 1])
+
+    # Output position of each strip's first index, accounting for the indices and restarts of the previous strips
+    strip_starts = np.concatenate(([0], np.cumsum(lengths + 3)[:-1]))
+
+    strips = np.full(strip_starts[-1] + lengths[-1] + 2, STRIP_RESTART, np.uint16)
+    strips[strip_starts[:, None] + np.arange(3)] = first
+    strips[np.repeat(strip_starts + 2, lengths - 1) + local[rest]] = rest_indices
+
+    return strips
+
+
+def get_field_array(records: np.ndarray, name: str) -> Optional[np.ndarray]:
+    """Returns a native byte order copy of a field in an array of records, or None if the records do not have the field.\n
+    A missing UV field will be returned as an empty array with 0 UV channels.
+    """
+    if name not in records.dtype.names:
+        return np.zeros((len(records), 0, 2), np.float32) if name == 'uv' else None
+
+    field: np.ndarray = records[name]
+    if field.dtype.kind == 'f':
+        return field.astype(np.float32)
+
+    return field.astype(field.dtype.newbyteorder('='))
 
 
 class BrNudMaterial(BrStruct):
@@ -92,7 +92,7 @@ class BrNutTexture(BrStruct):
                 self.texture_data = b''.join(self.mipmaps)
 
         else:
-            self.mipmaps.append(bytes(br.read_bytes(self.data_size)))
+            self.mipmaps.append(br.read_bytes(self.data_size))
             self.texture_data = self.mipmaps[0]
 
     def __br_write__(self, br: 'BinaryReader', nutTex: 'NutTexture'):
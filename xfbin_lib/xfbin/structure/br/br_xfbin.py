@@ -1,4 +1,4 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
 from ...util import *
 from ..nucc import *
@@ -7,7 +7,10 @@ from .br_nucc import *
 
 
 class BrXfbin(BrStruct):
-    def __br_read__(self, br: BinaryReader):
+    def __br_read__(self, br: BinaryReader, lazy: bool = False, index_pages: List['XfbinIndexPage'] = None):
+        # If lazy is True, only the page chunks will be converted to BrNuccChunks while reading the pages
+        self.lazy = lazy
+
         self.header: BrNuccHeader = br.read_struct(BrNuccHeader)
         self.chunkTable: BrChunkTable = br.read_struct(BrChunkTable)
 
@@ -18,6 +21,19 @@ class BrXfbin(BrStruct):
         self.curPageStart = 0
         self.curReferenceStart = 0
 
+        if index_pages is not None:
+            # Seek directly to each of the given pages using the offsets from the index instead of reading all pages
+            for index_page in index_pages:
+                br.seek(index_page.offset)
+                self.curPageStart = index_page.pageStart
+                self.curReferenceStart = index_page.referenceStart
+
+                br_page: BrPage = br.read_struct(BrPage, None, self)
+                self.chunks.extend(br_page.chunksDict.values())
+                self.pages.append(br_page)
+
+            return
+
         # Assume that the file ends with a nuccChunkPage
         while not br.eof():
             br_page: BrPage = br.read_struct(BrPage, None, self)
@@ -32,14 +48,36 @@ class BrXfbin(BrStruct):
             # Add the page to the br_xfbin
             self.pages.append(br_page)
 
-    def __br_write__(self, br: 'BinaryReader', xfbin: Xfbin):
-        # Store the pages in a separate buffer and merge it with the main buffer later
-        br_page_writer = BinaryReader(endianness=Endian.BIG)
+    def __br_write__(self, br: 'BinaryReader', xfbin: Xfbin, incremental: bool = False):
+        # If incremental is True, pages that were not modified since they were read will be copied as is
+
+        # Write the pages first, as the chunk table depends on the chunks in them
+        # write_xfbin avoids copying the pages again by inserting the chunk table before them instead
+        pages = bytearray()
+        for page_data, _ in self.write_pages(xfbin, incremental):
+            pages += page_data
+
+        # Write the header and the chunk table
+        self.write_chunk_table(br)
 
+        # Write the pages after the table
+        br.write_bytes(pages)
+
+    def write_pages(self, xfbin: Xfbin, incremental: bool = False) -> Iterator[Tuple[memoryview, bool]]:
+        """Writes the pages of an Xfbin one at a time, and yields a memoryview of the bytes of each of them, along with
+        whether the page was copied as is from the file it was read from (when incremental is True).\n
+        Views of the pages that were written are only valid until the next page is requested, so they should be copied
+        before that, while views of the copied pages stay valid as long as the file they were read from.\n
+        The chunk table can be written with write_chunk_table only after all pages were yielded.
+        """
         # First page always has an extra null chunk (doesn't affect anything though)
-        null_chunk = BrNuccChunkNull()
-        null_chunk.nuccChunk = NuccChunkNull()
-        br_page_writer.write_struct(BrChunk(), null_chunk, IterativeDict())
+        with BinaryReader(endianness=Endian.BIG) as br_null_writer:
+            null_chunk = BrNuccChunkNull()
+            null_chunk.nuccChunk = NuccChunkNull()
+            br_null_writer.write_struct(BrChunk(), null_chunk, IterativeDict())
+
+            with br_null_writer.view() as null_view:
+                yield null_view, False
 
         # This will contain all unique chunks
         chunk_map_dict = IterativeDict()
@@ -52,46 +90,57 @@ class BrXfbin(BrStruct):
 
         # Write each page
         for page in xfbin:
-            br_page = BrPage()
+            if incremental and not page.is_modified():
+                source = page.source
 
-            # Write the BrPage
-            br_page_writer.write_struct(br_page, page)
+                # The chunk indices in the copied page still refer to the chunk maps it was read with
+                chunk_map_dict.update_or_next(source.chunk_maps)
+                chunk_references.extend(page.chunk_references)
+                chunk_map_indices.extend(source.chunk_maps)
 
-            # Add the non-existent NuccChunkIndex chunk, as it should not be written as a BrChunk
-            br_page.chunkIndexDict.get_or_next(NuccChunkIndex())
+                yield source.data, True
+                continue
 
-            # Update the global chunk list using this BrPage's chunk index dict
-            chunk_map_dict.update_or_next(br_page.chunkIndexDict)
+            br_page = BrPage()
 
-            chunk_references.extend(br_page.chunkReferences)
+            # Write the BrPage to its own buffer, so that only one page is kept in memory at a time
+            with BinaryReader(endianness=Endian.BIG) as br_page_writer:
+                br_page_writer.write_struct(br_page, page)
 
-            # Add all of the chunks in the current page to the indices list (in order)
-            chunk_map_indices.extend(br_page.chunkIndexDict.keys())
+                # Add the non-existent NuccChunkIndex chunk, as it should not be written as a BrChunk
+                br_page.chunkIndexDict.get_or_next(NuccChunkIndex())
 
-        # After all of the pages have been written, start writing the table
-        br_chunk_table_writer = BinaryReader(endianness=Endian.BIG)
-        br_chunk_table = BrChunkTable()
+                # Update the global chunk list using this BrPage's chunk index dict
+                chunk_map_dict.update_or_next(br_page.chunkIndexDict)
 
-        br_chunk_table.chunkMapDict = chunk_map_dict
-        br_chunk_table.chunkReferences = chunk_references
-        br_chunk_table.chunkMapIndices = chunk_map_indices
+                chunk_references.extend(br_page.chunkReferences)
 
-        br_chunk_table_writer.write_struct(br_chunk_table)
+                # Add all of the chunks in the current page to the indices list (in order)
+                chunk_map_indices.extend(br_page.chunkIndexDict.keys())
 
-        br_header = BrNuccHeader()
-        br_header.chunkTableSize = br_chunk_table_writer.size(
-        ) - br_chunk_table.chunkMapReferencesSize
+                with br_page_writer.view() as page_view:
+                    yield page_view, False
 
-        # Write the header
-        br.write_struct(br_header)
+        self.chunkTable = BrChunkTable()
+        self.chunkTable.chunkMapDict = chunk_map_dict
+        self.chunkTable.chunkReferences = chunk_references
+        self.chunkTable.chunkMapIndices = chunk_map_indices
 
-        # Write the chunk table to the main buffer
-        br.extend(br_chunk_table_writer.buffer())
-        br.seek(br_chunk_table_writer.size(), Whence.CUR)
+    def write_chunk_table(self, br: 'BinaryReader'):
+        """Writes the header and the chunk table of the pages that were written by write_pages."""
+        with BinaryReader(endianness=Endian.BIG) as br_chunk_table_writer:
+            br_chunk_table_writer.write_struct(self.chunkTable)
 
-        # Write the page buffer to the main buffer
-        br.extend(br_page_writer.buffer())
-        br.seek(br_page_writer.size(), Whence.CUR)
+            br_header = BrNuccHeader()
+            br_header.chunkTableSize = br_chunk_table_writer.size(
+            ) - self.chunkTable.chunkMapReferencesSize
+
+            # Write the header
+            br.write_struct(br_header)
+
+            # Write the chunk table to the main buffer
+            with br_chunk_table_writer.view() as table_view:
+                br.write_bytes(table_view)
 
 
 class BrNuccHeader(BrStruct):
@@ -188,13 +237,13 @@ class BrChunkTable(BrStruct):
                 self.filePaths[chunk_map.filePathIndex],
                 self.chunkNames[chunk_map.chunkNameIndex])
 
-    def get_br_nucc_chunk(self, br_chunk: 'BrChunk', page_start_index: int) -> BrNuccChunk:
-        # Get the chunk map of the br_chunk
-        chunk_map = self.chunkMaps[self.chunkMapIndices[page_start_index +
-                                                        br_chunk.chunkMapIndex]]
+    def get_props_from_br_chunk(self, br_chunk: 'BrChunk', page_start_index: int) -> Tuple[str, str, str]:
+        # Get the chunk map of the br_chunk and return its props
+        return self.get_props_from_chunk_map(self.chunkMaps[self.chunkMapIndices[page_start_index + br_chunk.chunkMapIndex]])
 
+    def get_br_nucc_chunk(self, br_chunk: 'BrChunk', page_start_index: int) -> BrNuccChunk:
         # Create and return a BrNuccChunk with the correct type from the map
-        return BrNuccChunk.create_from_nucc_type(*self.get_props_from_chunk_map(chunk_map), br_chunk.data, br_chunk.nuccId, br_chunk.unk)
+        return BrNuccChunk.create_from_nucc_type(*self.get_props_from_br_chunk(br_chunk, page_start_index), br_chunk.data, br_chunk.nuccId, br_chunk.unk)
 
     def __br_write__(self, br: 'BinaryReader'):
         # Set up the indices dictionaries
@@ -270,9 +319,7 @@ class BrChunkTable(BrStruct):
 
 class BrChunkMap(BrStruct):
     def __br_read__(self, br: BinaryReader):
-        self.chunkTypeIndex = br.read_uint32()
-        self.filePathIndex = br.read_uint32()
-        self.chunkNameIndex = br.read_uint32()
+        self.chunkTypeIndex, self.filePathIndex, self.chunkNameIndex = br.read_uint32(3)
 
     def __br_write__(self, br: 'BinaryReader', chunk_tuple: tuple, dict_tuple: Tuple[IterativeDict]):
         # Write each of the type, file path, and name indices
@@ -297,10 +344,10 @@ class BrChunkReference(BrStruct):
 
 class BrChunk(BrStruct):
     def __br_read__(self, br: BinaryReader):
-        self.size = br.read_uint32()
-        self.chunkMapIndex = br.read_uint32()
-        self.nuccId = br.read_uint16() #Changes how some chunks are read
-        self.unk = br.read_uint16() #Some animation chunks have this set to different values other than 0
+        self.offset = br.pos()
+        # nuccId changes how some chunks are read
+        # unk is set to different values other than 0 in some animation chunks
+        self.size, self.chunkMapIndex, self.nuccId, self.unk = br.read_format('2I2H')
         self.data = br.read_bytes(self.size)
 
     def __br_write__(self, br: 'BinaryReader', br_nucc_chunk: BrNuccChunk, chunkIndexDict: IterativeDict, *args):
@@ -308,15 +355,12 @@ class BrChunk(BrStruct):
             chunk_index = chunkIndexDict.get_or_next(br_nucc_chunk.nuccChunk)
             br_internal.write_struct(br_nucc_chunk, chunkIndexDict, *args)
 
-            br.write_uint32(br_internal.size())
-            br.write_uint32(chunk_index)
-
-            # This doesn't affect anything
-            br.write_uint16(0x79)  # nuccId
-            br.write_uint16(0)
+            # The nuccId (0x79) doesn't affect anything
+            br.write_format('2I2H', (br_internal.size(), chunk_index, 0x79, 0))
 
-            br.extend(br_internal.buffer())
-            br.seek(br_internal.size(), Whence.CUR)
+            # Write the chunk's buffer without copying it first
+            with br_internal.view() as chunk_view:
+                br.write_bytes(chunk_view)
 
 
 class BrPage(BrStruct):
@@ -324,14 +368,38 @@ class BrPage(BrStruct):
     chunkIndexDict: IterativeDict
 
     def __br_read__(self, br: BinaryReader, br_xfbin: BrXfbin):
+        # Only contains the chunks that were converted to BrNuccChunks (all of them, unless the BrXfbin is being read lazily)
         self.chunksDict: Dict[int, BrNuccChunk] = dict()
 
+        # Contains all of the BrChunks, which can be converted later using the page start index
+        self.brChunks: Dict[int, BrChunk] = dict()
+        self.pageStart = br_xfbin.curPageStart
+        self.referenceStart = br_xfbin.curReferenceStart
+        self.offset = br.pos()
+
+        # Start of the page without the extra null chunk that the first page has (which is written separately by BrXfbin)
+        self.bodyOffset = self.offset
+        leading_nulls = True
+
         while True:
             # Read a BrChunk
             br_chunk: BrChunk = br.read_struct(BrChunk)
+            self.brChunks[br_chunk.chunkMapIndex] = br_chunk
+
+            if leading_nulls or br_xfbin.lazy:
+                chunk_type = br_xfbin.chunkTable.get_props_from_br_chunk(br_chunk, self.pageStart)[0]
+
+                if leading_nulls:
+                    if chunk_type == 'nuccChunkNull':
+                        self.bodyOffset = br_chunk.offset
+                    else:
+                        leading_nulls = False
+
+                if br_xfbin.lazy and chunk_type != 'nuccChunkPage':
+                    continue
 
             # Convert the BrChunk to a BrNuccChunk
-            chunk = br_xfbin.chunkTable.get_br_nucc_chunk(br_chunk, br_xfbin.curPageStart)
+            chunk = br_xfbin.chunkTable.get_br_nucc_chunk(br_chunk, self.pageStart)
 
             # Add the BrNuccChunk to the dictionary by its local map index (for use when converting BrNuccChunks to NuccChunks)
             self.chunksDict[br_chunk.chunkMapIndex] = chunk
@@ -348,6 +416,10 @@ class BrPage(BrStruct):
                 self.pageChunkReferences = br_xfbin.chunkTable.chunkMapReferences[
                     br_xfbin.curReferenceStart: br_xfbin.curReferenceStart + self.pageChunk.referenceSize]
 
+                self.size = br.pos() - self.offset
+
+                # Keep the page's bytes to be able to copy it as is when writing incrementally
+                self.data = br.view()[self.bodyOffset: br.pos()] if br.is_readonly() else None
                 break
 
     def __br_write__(self, br: 'BinaryReader', page: Page):
@@ -373,7 +445,7 @@ class BrPage(BrStruct):
 
             # Create a new BrNuccChunk from the NuccChunk's type,
             # or create an abstract BrNuccChunk to write the data only if the NuccChunk does not have properties to be processed
-            br_nucc_chunk = BrNuccChunk.get_br_nucc_type_from_str(type(nucc_chunk).__qualname__)() \
+            br_nucc_chunk = NuccChunk.get_br_nucc_type(type(nucc_chunk))() \
                 if nucc_chunk.has_props \
                 else BrNuccChunk()
 
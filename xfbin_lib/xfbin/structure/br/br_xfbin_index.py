@@ -0,0 +1,70 @@
+from ...util import *
+from ..xfbin_index import XfbinIndex, XfbinIndexEntry, XfbinIndexPage
+
+
+class BrXfbinIndex(BrStruct):
+    MAGIC = 'XFBI'
+    VERSION = 1
+
+    def __br_read__(self, br: BinaryReader):
+        self.magic = br.read_str(4)
+        if self.magic != BrXfbinIndex.MAGIC:
+            raise Exception('Invalid magic.')
+
+        self.version = br.read_uint32()
+        if self.version != BrXfbinIndex.VERSION:
+            raise Exception(f'Unsupported index version: {self.version}')
+
+        self.index = XfbinIndex()
+        self.index.fileSize = br.read_uint64()
+        self.index.fileTime = br.read_uint64()
+
+        self.stringCount = br.read_uint32()
+        self.pageCount = br.read_uint32()
+        self.entryCount = br.read_uint32()
+
+        strings = [br.read_str() for _ in range(self.stringCount)]
+        br.align_pos(4)
+
+        for _ in range(self.pageCount):
+            page = XfbinIndexPage()
+            page.offset, page.size, page.pageStart, page.referenceStart = br.read_uint32(4)
+
+            self.index.pages.append(page)
+
+        for _ in range(self.entryCount):
+            entry = XfbinIndexEntry()
+            type_index, path_index, name_index, entry.page, entry.offset, entry.size = br.read_uint32(6)
+            entry.type, entry.filePath, entry.name = strings[type_index], strings[path_index], strings[name_index]
+            entry.hash = bytes(br.read_bytes(XfbinIndexEntry.HASH_SIZE))
+
+            self.index.entries.append(entry)
+
+        self.index.update_dicts()
+
+    def __br_write__(self, br: 'BinaryReader', index: XfbinIndex):
+        strings = IterativeDict()
+        for entry in index.entries:
+            strings.update_or_next((entry.type, entry.filePath, entry.name))
+
+        br.write_str(BrXfbinIndex.MAGIC)
+        br.write_uint32(BrXfbinIndex.VERSION)
+
+        br.write_uint64(index.fileSize)
+        br.write_uint64(index.fileTime)
+
+        br.write_uint32(len(strings))
+        br.write_uint32(len(index.pages))
+        br.write_uint32(len(index.entries))
+
+        for s in strings.keys():
+            br.write_str(s, True)
+        br.align(4)
+
+        for page in index.pages:
+            br.write_uint32((page.offset, page.size, page.pageStart, page.referenceStart))
+
+        for entry in index.entries:
+            br.write_uint32((strings[entry.type], strings[entry.filePath], strings[entry.name],
+                             entry.page, entry.offset, entry.size))
+            br.write_bytes(entry.hash)
@@ -1,8 +1,8 @@
 import io
-from array import array
 #from PIL import Image
 
 from .nut import NutTexture
+from .pixel_converter import join_mipmaps, pad_mipmap, swap_nut_pixels
 from .br.br_dds import BrDDS, BrDDS_Header, BrDDS_PixelFormat, BrDDS_DX10_Header
 from ..util.binary_reader.binary_reader import BinaryReader, Endian
 
@@ -99,34 +99,18 @@ def DDS_to_NutTexture(dds):
 
     if dds.header.pixel_format.fourCC != '':
         nut.pixel_format = nut_pf_fourcc[dds.header.pixel_format.fourCC]
-        nut.mipmaps = list()
-        nut.texture_data = b''
-        for mip in dds.mipmaps:
-            if len(mip) < 16:
-                mip += b'\x00' * (16 - len(mip))
-            nut.mipmaps.append(mip)
-            nut.texture_data += mip
+        nut.mipmaps = [pad_mipmap(mip) for mip in dds.mipmaps]
+        nut.texture_data = join_mipmaps(nut.mipmaps)
 
     elif dds.header.pixel_format.bitmasks:
         nut.pixel_format = nut_pf_bitmasks[dds.header.pixel_format.bitmasks]
-        nut.mipmaps = list()
-        nut.texture_data = b''
-
-        if nut.pixel_format == 17:
-            for mip in dds.mipmaps:
-                mip = array('l', mip)
-                mip.byteswap()
-                nut.mipmaps.append(mip.tobytes())
-                nut.texture_data += mip.tobytes()
 
+        if nut.pixel_format in (14, 17):
+            nut.mipmaps = [swap_nut_pixels(mip, nut.pixel_format) for mip in dds.mipmaps]
         else:
-            for mip in dds.mipmaps:
-                if len(mip) < 16:
-                    mip += b'\x00' * (16 - len(mip))
-                mip = array('u', mip)
-                mip.byteswap()
-                nut.mipmaps.append(mip.tobytes())
-                nut.texture_data += mip.tobytes()
+            nut.mipmaps = [swap_nut_pixels(pad_mipmap(mip), nut.pixel_format) for mip in dds.mipmaps]
+
+        nut.texture_data = join_mipmaps(nut.mipmaps)
 
     nut.mipmap_count = dds.header.mipMapCount
 
@@ -195,21 +179,8 @@ def NutTexture_to_DDS(nuttex: NutTexture):
         else:
             header.pixel_format.flags = 0x40  # DDPF_RGB
 
-        if nuttex.pixel_format in (6, 7, 8):
-            for mip in nuttex.mipmaps:
-                mip = array('h', mip)
-                mip.byteswap()
-                dds.mipmaps.append(mip.tobytes())
-            
-            dds.texture_data = dds.mipmaps[0] 
-            
-        elif nuttex.pixel_format in (14, 17):
-            for mip in nuttex.mipmaps:
-                mip = array('l', mip)
-                mip.byteswap()
-                dds.mipmaps.append(mip.tobytes())
-            
-            dds.texture_data = dds.mipmaps[0]
+        dds.mipmaps = [swap_nut_pixels(mip, nuttex.pixel_format) for mip in nuttex.mipmaps]
+        dds.texture_data = dds.mipmaps[0]
 
     header.pixel_format.size = 32
     if header.mipMapCount > 1:
@@ -0,0 +1,186 @@
+import copyreg
+import hashlib
+import io
+import os
+import pickle
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional
+
+# Should be increased whenever the decoded classes change, to avoid loading entries of older versions
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
+
+
+class DecodeCache:
+    """On-disk cache of decoded chunk bodies, keyed by a hash of the chunk's type, version, and data.\n
+    Entries are pickled to separate files in the cache directory, and the least recently used entries are removed
+    when the total size of the entries goes over max_size.\n
+    Loading the entries can run arbitrary code, so the directory should not be writable by untrusted users (see enable_decode_cache).\n
+    The same directory can be used by multiple processes.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_CACHE_SIZE):
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+
+        os.makedirs(self.path, exist_ok=True)
+
+        # Sizes of the entries, from the least to the most recently used
+        self.entries: Dict[str, int] = OrderedDict()
+        self.size = 0
+
+        # Files are touched when they are used, so their modification times give the order of use between runs
+        files = [f for f in os.scandir(self.path) if f.is_file() and f.name.endswith('.pkl')]
+        for f in sorted(files, key=lambda f: f.stat().st_mtime_ns):
+            self.entries[f.name[:-4]] = f.stat().st_size
+            self.size += f.stat().st_size
+
+        self.evict()
+
+    def get_key(self, chunk_type: str, version: int, data) -> str:
+        key = hashlib.blake2b(digest_size=20)
+        # Include the package's name, as pickles refer to the classes by their module's full name
+        key.update(f'{__name__}:{CACHE_VERSION}:{chunk_type}:{version}:'.encode())
+        key.update(data)
+
+        return key.hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.path, key + '.pkl')
+
+    def get(self, key: str) -> Optional[object]:
+        """Returns the decoded object of an entry, or None if it does not exist."""
+        path = self.get_path(key)
+
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.remove_entry(key)
+            return None
+        except Exception:
+            # Corrupted or incompatible entry
+            self.remove(key)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        if key in self.entries:
+            self.entries.move_to_end(key)
+        else:
+            size = os.path.getsize(path)
+            self.entries[key] = size
+            self.size += size
+
+        return value
+
+    def put(self, key: str, value: object) -> None:
+        """Stores a decoded object. Memoryviews in the object are stored as bytes."""
+        with io.BytesIO() as f:
+            dump_decoded(value, f)
+
+            with f.getbuffer() as data:
+                size = len(data)
+                if size > self.max_size:
+                    return
+
+                path = self.get_path(key)
+                temp_path = f'{path}.{os.getpid()}.tmp'
+
+                try:
+                    # Write to a temporary file first to avoid leaving a partially written entry
+                    with open(temp_path, 'wb') as entry_file:
+                        entry_file.write(data)
+                    os.replace(temp_path, path)
+                except OSError:
+                    return
+
+        self.remove_entry(key)
+        self.entries[key] = size
+        self.size += size
+
+        self.evict()
+
+    def remove_entry(self, key: str) -> None:
+        self.size -= self.entries.pop(key, 0)
+
+    def remove(self, key: str) -> None:
+        self.remove_entry(key)
+
+        try:
+            os.remove(self.get_path(key))
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache is not larger than max_size."""
+        while self.size > self.max_size and self.entries:
+            self.remove(next(iter(self.entries)))
+
+    def clear(self) -> None:
+        for key in list(self.entries):
+            self.remove(key)
+
+
+def reduce_memoryview(view: memoryview):
+    return bytes, (view.tobytes(),)
+
+
+PICKLE_DISPATCH_TABLE = copyreg.dispatch_table.copy()
+PICKLE_DISPATCH_TABLE[memoryview] = reduce_memoryview
+
+
+def dump_decoded(value: object, file: BinaryIO) -> None:
+    """Pickles a decoded object to a file object. Memoryviews in the object are stored as bytes."""
+    pickler = pickle.Pickler(file, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = PICKLE_DISPATCH_TABLE
+    pickler.dump(value)
+
+
+# The cache used while reading XFBINs, or None if it is disabled (default)
+decode_cache: Optional[DecodeCache] = None
+
+
+def enable_decode_cache(path: str, max_size: int = DEFAULT_CACHE_SIZE) -> DecodeCache:
+    """Enables caching decoded NUD, NUT, and ANM chunk bodies in the given directory, so that reading the same
+    chunks again will load them from the cache instead of parsing them.\n
+    The least recently used entries are removed when the cache gets larger than max_size bytes.\n
+    The entries are loaded with pickle, which can run arbitrary code, so the directory should only be writable by
+    trusted users: anyone who can write a file to it can run code in any process that reads XFBINs with the cache.
+    """
+    global decode_cache
+    decode_cache = DecodeCache(path, max_size)
+
+    return decode_cache
+
+
+def disable_decode_cache() -> None:
+    global decode_cache
+    decode_cache = None
+
+
+def get_decode_cache() -> Optional[DecodeCache]:
+    return decode_cache
+
+
+def load_cached(br_chunk) -> Optional[object]:
+    """Returns the cached decoded body of a BrNuccChunk, or None if it is not cached or the cache is disabled.\n
+    The chunk's cache key is kept to be used by store_cached.
+    """
+    br_chunk.cacheKey = None
+
+    if decode_cache is None:
+        return None
+
+    br_chunk.cacheKey = decode_cache.get_key(type(br_chunk).__qualname__, br_chunk.version, br_chunk.data)
+    return decode_cache.get(br_chunk.cacheKey)
+
+
+def store_cached(br_chunk, value: object) -> None:
+    """Stores the decoded body of a BrNuccChunk that was not found by load_cached."""
+    if decode_cache is not None and br_chunk.cacheKey is not None:
+        decode_cache.put(br_chunk.cacheKey, value)
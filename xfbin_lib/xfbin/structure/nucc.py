@@ -1,15 +1,56 @@
 from enum import IntFlag
-from typing import Dict, Iterator, List, Optional, Set
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+import numpy as np
 
 from ..util import *
 from .anm import AnmClump, AnmEntry
 from .br.br_nucc import *
+from .decode_cache import store_cached
 from .br.br_nud import *
 from .br.br_nut import *
 from .nud import Nud
 from .nut import Nut
 
 
+class NuccChunkType:
+    """A registered chunk type: its type string, `NuccChunk` and `BrNuccChunk` classes, and short name (used as the extension of unpacked chunks)."""
+
+    def __init__(self, type_str: str, nucc_type: type, br_nucc_type: type):
+        self.type_str = type_str
+        self.nucc_type = nucc_type
+        self.br_nucc_type = br_nucc_type
+        self.short_str = type_str[len('nuccChunk'):]
+        self.extension = self.short_str.lower()
+
+
+# Registered chunk types by their type strings (both "nuccChunkX" and "NuccChunkX") and by their NuccChunk classes
+NUCC_TYPES_BY_STR: Dict[str, NuccChunkType] = dict()
+NUCC_TYPES_BY_CLASS: Dict[type, NuccChunkType] = dict()
+
+
+def register_nucc_type(nucc_type: type, br_nucc_type: Optional[type] = None, type_str: Optional[str] = None) -> NuccChunkType:
+    """Registers a chunk type to be used when reading and writing XFBINs.\n
+    Subclasses of `NuccChunk` are registered when they are defined, with a type string made from the class name
+    and the `BrNuccChunk` class with the same name prefixed by "Br". This can be called again to override those.
+    """
+    if type_str is None:
+        type_str = nucc_type.__name__[0].lower() + nucc_type.__name__[1:]
+
+    if br_nucc_type is None:
+        br_nucc_type = BrNuccChunk.get_br_nucc_type_from_str(type_str)
+    else:
+        BrNuccChunk.register_br_nucc_type(type_str, br_nucc_type)
+
+    nucc_chunk_type = NuccChunkType(type_str, nucc_type, br_nucc_type)
+
+    NUCC_TYPES_BY_STR[type_str] = nucc_chunk_type
+    NUCC_TYPES_BY_STR[type_str[0].swapcase() + type_str[1:]] = nucc_chunk_type
+    NUCC_TYPES_BY_CLASS[nucc_type] = nucc_chunk_type
+
+    return nucc_chunk_type
+
+
 class NuccChunk:
     filePath: str
     name: str
@@ -19,6 +60,10 @@ class NuccChunk:
 
     chunks: List['NuccChunk']
 
+    # Whether is_modified should also compare the encoded data of this chunk with the data it was read from,
+    # for chunks whose properties are often modified in place
+    compare_encoded_data = False
+
     def __init__(self, file_path, name, type_str = "NuccChunk"):
         self.extension = ''
         self.filePath = file_path
@@ -30,6 +75,89 @@ class NuccChunk:
         self.has_props = False
         self.chunks = list()
 
+        # Set by defer_init_data, and called when an attribute that does not exist yet is accessed
+        self.lazy_init = None
+
+    def __getattr__(self, name: str):
+        # This is only called when the attribute was not found, so initialize the chunk if it was deferred and try again
+        lazy_init = self.__dict__.get('lazy_init')
+        if lazy_init is None:
+            raise AttributeError(f"'{type(self).__qualname__}' object has no attribute '{name}'")
+
+        self.lazy_init = None
+        lazy_init()
+
+        return getattr(self, name)
+
+    def defer_init_data(self, init_data: Callable[[], None]) -> None:
+        """Defers initializing the data of this `NuccChunk` until one of its properties is accessed for the first time.\n
+        The type, file path, name, version, and data of the chunk will still be available without initializing it.
+        """
+        # Remove the default values of the properties so that accessing any of them calls __getattr__
+        defaults = {k: self.__dict__.pop(k) for k in list(self.__dict__) if k not in
+                    ('filePath', 'name', 'type', 'version', 'data', 'has_data')}
+
+        def lazy_init():
+            self.__dict__.update(defaults)
+            init_data()
+
+            # Initializing the chunk does not modify it
+            if self.__dict__.get('source_state') is not None:
+                self.record_source_state()
+
+        self.lazy_init = lazy_init
+
+    def record_source_state(self) -> None:
+        """Records the current properties of this `NuccChunk`, to be able to check if it was modified since it was read (see `is_modified`)."""
+        self.__dict__['source_state'] = {k: v for (k, v) in self.__dict__.items() if k not in ('lazy_init', 'source_state')}
+
+    def mark_dirty(self) -> None:
+        """Marks this `NuccChunk` as modified.\n
+        Only needed when a property was modified in place (for example, the NUT of a texture was edited),
+        as replacing a property with a different object is detected by `is_modified`, and so are changes made in place
+        to chunks that compare their encoded data (clumps, coords, models, and materials) when checked with the chunk maps of their page.
+        """
+        self.__dict__['source_state'] = None
+
+    def is_modified(self, chunk_maps: Optional[List['NuccChunk']] = None) -> bool:
+        """Returns True if this `NuccChunk` was not read from a file, was marked as dirty, or if any of its properties
+        were replaced (or added) since it was read.\n
+        If the chunk maps of the page that the chunk was read from are given, chunks with `compare_encoded_data` are
+        also encoded using them and compared with the data they were read from, to detect changes made in place.
+        """
+        state = self.__dict__.get('source_state')
+        if state is None:
+            return True
+
+        current = {k: v for (k, v) in self.__dict__.items() if k not in ('lazy_init', 'source_state')}
+        if current.keys() != state.keys() or any(current[k] is not v for (k, v) in state.items()):
+            return True
+
+        # Chunks that were not initialized yet cannot have been modified
+        if chunk_maps is None or not self.compare_encoded_data or self.__dict__.get('lazy_init') is not None:
+            return False
+
+        return not self.encodes_to_data(chunk_maps)
+
+    def encodes_to_data(self, chunk_maps: List['NuccChunk']) -> bool:
+        """Returns True if encoding this `NuccChunk` with the given chunk maps gives the same bytes as its data."""
+        chunk_indices = IterativeDict()
+        chunk_indices.update_or_next(chunk_maps)
+        chunk_count = len(chunk_indices)
+
+        br_nucc_chunk = NuccChunk.get_br_nucc_type(type(self))()
+        br_nucc_chunk.nuccChunk = self
+
+        with BinaryReader(endianness=Endian.BIG) as br:
+            br.write_struct(br_nucc_chunk, chunk_indices)
+
+            # Referencing a chunk that is not in the chunk maps changes the page as well
+            if len(chunk_indices) != chunk_count:
+                return False
+
+            with br.view() as view:
+                return view == self.data
+
     def set_data(self, data: bytearray, chunks):
         self.data = data
         self.has_data = True
@@ -54,14 +182,14 @@ class NuccChunk:
         self.chunks = initial_chunks
 
     def get_data(self, file_data_only: bool) -> bytearray:
-        """Returns the data of this chunk when it was first read from the XFBIN as a buffer.\n
+        """Returns a copy of the data of this chunk when it was first read from the XFBIN as a buffer.\n
         If file_data_only is True, will return only the data contained in the formatted file of the chunk.
         (NTP3 .nut for nuccChunkTexture, NDP3 .nud for nuccChunkModel)
         """
-        if file_data_only and hasattr(self, 'file_data'):
-            return getattr(self, 'file_data')
+        data = getattr(self, 'file_data') if (file_data_only and hasattr(self, 'file_data')) else self.data
 
-        return self.data
+        # The data of chunks that were read is a view of the XFBIN's buffer, so it is only copied here
+        return bytearray(data) if data is not None else None
 
     def to_dict(self) -> Dict[str, str]:
         d = dict()
@@ -72,34 +200,54 @@ class NuccChunk:
 
         return d
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        register_nucc_type(cls)
+
     @classmethod
     def get_nucc_type_from_str(cls, type_str: str) -> type:
-        type_name = type_str[0].upper() + type_str[1:]
-        result = globals().get(type_name, None)
+        nucc_chunk_type = NUCC_TYPES_BY_STR.get(type_str)
 
-        if result is None:
-            # Create a new type and add it to the globals
+        if nucc_chunk_type is None:
+            # Create a new type and add it to the globals (it will be registered by __init_subclass__)
+            type_name = type_str[0].upper() + type_str[1:]
             result = type(type_name, (cls,), {})
             globals()[type_name] = result
 
-        return result
+            return result
+
+        return nucc_chunk_type.nucc_type
+
+    @classmethod
+    def get_nucc_chunk_type(cls, nucc_type: type) -> NuccChunkType:
+        nucc_chunk_type = NUCC_TYPES_BY_CLASS.get(nucc_type)
+
+        if nucc_chunk_type is None:
+            # Only NuccChunk itself, or classes that are not NuccChunk subclasses
+            nucc_chunk_type = register_nucc_type(nucc_type)
+
+        return nucc_chunk_type
 
     @classmethod
     def get_nucc_str_from_type(cls, nucc_type: type) -> str:
-        return nucc_type.__name__[0].lower() + nucc_type.__name__[1:]
+        return cls.get_nucc_chunk_type(nucc_type).type_str
 
     @classmethod
     def get_nucc_str_short_from_type(cls, nucc_type: type) -> str:
-        return cls.get_nucc_str_from_type(nucc_type)[len(NuccChunk.__qualname__):]
+        return cls.get_nucc_chunk_type(nucc_type).short_str
+
+    @classmethod
+    def get_br_nucc_type(cls, nucc_type: type) -> type:
+        return cls.get_nucc_chunk_type(nucc_type).br_nucc_type
 
     @classmethod
     def create_from_nucc_type(cls, type_str, file_path, name) -> 'NuccChunk':
         return cls.get_nucc_type_from_str(type_str)(file_path, name, type_str)
 
     @classmethod
-    def get_all_nucc_types(cls):
-        # This will only return types with names that start with this class's name (but are not this class)
-        return [n for (k, n) in globals() if k.startswith(cls.__qualname__) and len(k) > len(cls.__qualname__)]
+    def get_all_nucc_types(cls) -> List[type]:
+        # Returns all registered subclasses of this class (but not this class)
+        return [t for t in NUCC_TYPES_BY_CLASS if t is not cls and issubclass(t, cls)]
 
     def __eq__(self, o: object) -> bool:
         # Treat NuccChunks as ChunkMaps:
@@ -150,8 +298,12 @@ class NuccChunkTexture(NuccChunk):
         self.width = br_chunk.width
         self.height = br_chunk.height
 
-        self.nut = Nut()
-        self.nut.init_data(br_chunk.brNut)
+        if br_chunk.cachedNut is not None:
+            self.nut = br_chunk.cachedNut
+        else:
+            self.nut = Nut()
+            self.nut.init_data(br_chunk.brNut)
+            store_cached(br_chunk, self.nut)
 
 
 class NuccChunkDynamics(NuccChunk):
@@ -215,6 +367,7 @@ class Dynamics2:
 
 
 class NuccChunkClump(NuccChunk):
+    compare_encoded_data = True
 
     def init_data(self, br_chunk: BrNuccChunkClump, chunk_list: List['NuccChunk'], chunk_indices: List[int], chunk_refs: List['ChunkReference'], initial_chunks: List['NuccChunk']):
 
@@ -318,6 +471,8 @@ class ClumpModelGroup:
 
 
 class NuccChunkCoord(NuccChunk):
+    compare_encoded_data = True
+
     def init_data(self, br_chunk: BrNuccChunkCoord, chunk_list: List['NuccChunk'], chunk_indices: List[int], chunk_refs: List['ChunkReference'], initial_chunks: List['NuccChunk']):
         self.data = br_chunk.data
         #self.version = br_chunk.version
@@ -373,6 +528,8 @@ class CoordNode:
 
 
 class NuccChunkModel(NuccChunk):
+    compare_encoded_data = True
+
     def init_data(self, br_chunk: BrNuccChunkModel, chunk_list: List['NuccChunk'], chunk_indices: List[int], chunk_refs: List['ChunkReference'], initial_chunks: List['NuccChunk']):
         self.extension = '.nud'
 
@@ -405,9 +562,14 @@ class NuccChunkModel(NuccChunk):
 
         #self.file_data = br_chunk.nud_data
 
-        # Create a Nud from the BrNud
-        self.nud = Nud()
-        self.nud.init_data(self.name, br_chunk.brNud)
+        # Create a Nud from the BrNud, unless it was loaded from the decode cache
+        if br_chunk.cachedNud is not None:
+            self.nud = br_chunk.cachedNud
+            self.nud.name = self.name
+        else:
+            self.nud = Nud()
+            self.nud.init_data(self.name, br_chunk.brNud)
+            store_cached(br_chunk, self.nud)
 
         # Get the material chunks
         self.material_chunks: List[NuccChunkMaterial] = list()
@@ -453,6 +615,8 @@ class RiggingFlag(IntFlag):
 
 
 class NuccChunkMaterial(NuccChunk):
+    compare_encoded_data = True
+
     def __init__(self, file_path, name, type_str= "NuccChunkMaterial"):
         super().__init__(file_path, name, type_str)
         self.alpha = 0
@@ -545,6 +709,8 @@ class ModelHit:
         self.unk_count = hit.unk_count
         self.flags = hit.flags
         self.vertex_count = hit.mesh_vertex_size * 3
+
+        # (vertex count, 3) float32 array, with 3 vertices for each triangle
         self.mesh_vertices = hit.mesh_vertices
 
 
@@ -585,8 +751,20 @@ class NuccChunkPrimitiveVertex(NuccChunk):
         self.extension = '.primitivevertex'
 
         self.vertex_count = br_chunk.vertex_count
-        self.vertices: List[PrimitiveVertex] = list()
-        self.vertices = [PrimitiveVertex(v.position, v.normal, v.color, v.uv) for v in br_chunk.vertices]
+
+        # Vertex attributes as arrays with a row for each vertex
+        self.positions: np.ndarray = br_chunk.positions  # (n, 3) float32
+        self.normals: np.ndarray = br_chunk.normals  # (n, 3) float32
+        self.colors: np.ndarray = br_chunk.colors  # (n, 4) float32
+        self.uvs: np.ndarray = br_chunk.uvs  # (n, 2) float32
+
+    @property
+    def vertices(self) -> List['PrimitiveVertex']:
+        """List of PrimitiveVertex objects created from the vertex arrays of this chunk each time it is accessed."""
+        def column(array: np.ndarray) -> list:
+            return list(map(tuple, array.tolist()))
+
+        return list(map(PrimitiveVertex, column(self.positions), column(self.normals), column(self.colors), column(self.uvs)))
 
 
 class PrimitiveVertex:
@@ -1,5 +1,6 @@
-from itertools import chain
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 from .br.br_nud import *
 
@@ -24,18 +25,16 @@ class Nud:
                 self.mesh_groups[0].meshes[0].bone_type != NudBoneType.NoBones):
             return (0, 0)
 
-        lower = 0xFF_FF
-        higher = 0
-        for mesh in [m for m in self.mesh_groups[0].meshes if m.vertices and m.vertices[0].bone_ids]:
-            lower = min(lower, min(
-                chain(*map(lambda x: x.bone_ids, mesh.vertices))))
-            higher = max(higher, max(
-                chain(*map(lambda x: x.bone_ids, mesh.vertices))))
+        bone_ids = [m.bone_ids for m in self.mesh_groups[0].meshes if m.has_bones()]
 
-        if lower > higher:
+        if not bone_ids:
             return (0, 0)
 
-        return (lower, higher)
+        return (int(min(ids.min() for ids in bone_ids)), int(max(ids.max() for ids in bone_ids)))
+
+    def get_bounding_sphere(self) -> Tuple[float, float, float, float]:
+        """Returns the bounding sphere (center x, y, z and radius) of all the meshes in this NUD."""
+        return get_bounding_sphere([m.positions for g in self.mesh_groups for m in g.meshes])
 
 
 class NudMeshGroup:
@@ -54,21 +53,66 @@ class NudMeshGroup:
             mesh.init_data(br_mesh)
             self.meshes.append(mesh)
 
+    def get_bounding_sphere(self) -> Tuple[float, float, float, float]:
+        """Returns the bounding sphere (center x, y, z and radius) of the meshes in this group."""
+        return get_bounding_sphere([m.positions for m in self.meshes])
+
 
 class NudMesh:
     MAX_VERTICES = 32_767
     MAX_FACES = 16_383
 
-    vertices: List['NudVertex']
-    faces: List[Tuple[int, int, int]]
     materials: List['NudMaterial']
 
     vertex_type: NudVertexType
     bone_type: NudBoneType
     uv_type: NudUvType
 
+    # Vertex attributes as arrays with a row for each vertex
+    # Attributes that the vertices do not have are None
+    positions: np.ndarray  # (n, 3) float32
+    normals: Optional[np.ndarray]  # (n, 3) float32
+    bitangents: Optional[np.ndarray]  # (n, 3) or (n, 4) float32
+    tangents: Optional[np.ndarray]  # (n, 3) or (n, 4) float32
+    colors: Optional[np.ndarray]  # (n, 4) int
+    uvs: Optional[np.ndarray]  # (n, uv channel count, 2) float32
+    bone_ids: Optional[np.ndarray]  # (n, 4) uint
+    bone_weights: Optional[np.ndarray]  # (n, 4) float32
+
+    def __init__(self):
+        self.positions = np.zeros((0, 3), np.float32)
+        self.normals = self.bitangents = self.tangents = None
+        self.colors = self.uvs = self.bone_ids = self.bone_weights = None
+
+        self.__faces = np.zeros((0, 3), np.uint16)
+
+    @property
+    def vertices(self) -> List['NudVertex']:
+        """New list of NudVertex objects created from the vertex arrays of this mesh each time it is accessed.\n
+        Only kept for compatibility, as creating an object for each vertex is slow: use the vertex arrays instead.\n
+        The arrays are not updated when the list or its vertices are modified, so the list should be assigned again after modifying it.
+        """
+        return self.create_vertices()
+
+    @vertices.setter
+    def vertices(self, vertices: List['NudVertex']):
+        self.set_vertex_arrays(create_vertex_arrays(vertices))
+
+    @property
+    def faces(self) -> np.ndarray:
+        """Array of triangles with a row of 3 vertex indices for each triangle."""
+        return self.__faces
+
+    @faces.setter
+    def faces(self, faces):
+        self.__faces = np.asarray(faces, np.uint16).reshape(-1, 3)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.positions)
+
     def init_data(self, br_mesh: BrNudMesh):
-        self.add_vertices(br_mesh.vertices)
+        self.add_vertices(br_mesh)
         self.add_faces(br_mesh.faces, br_mesh.faceSize)
         self.add_materials(br_mesh.materials)
 
@@ -78,56 +122,83 @@ class NudMesh:
         self.face_flag = br_mesh.faceFlag
 
     def has_bones(self):
-        return bool(self.vertices and self.vertices[0].bone_ids)
+        return self.bone_ids is not None and len(self.bone_ids) > 0
 
     def has_color(self):
-        return bool(self.vertices and self.vertices[0].color)
+        return self.colors is not None and len(self.colors) > 0
 
     def get_uv_channel_count(self):
-        return len(self.vertices[0].uv) if bool(self.vertices and self.vertices[0].uv) else 0
-
-    def add_vertices(self, vertices: List[BrNudVertex]):
-        self.vertices = list()
-        for br_vertex in vertices:
-            vertex = NudVertex()
-            vertex.init_data(br_vertex)
-            self.vertices.append(vertex)
-
-    def add_faces(self, faces: List[int], faceSize: int):
-        faces = iter(faces)
-
+        return self.uvs.shape[1] if (self.uvs is not None and len(self.uvs)) else 0
+
+    def get_bounding_sphere(self) -> Tuple[float, float, float, float]:
+        """Returns the bounding sphere (center x, y, z and radius) of this mesh."""
+        return get_bounding_sphere([self.positions])
+
+    def add_vertices(self, br_mesh: BrNudMesh):
+        self.set_vertex_arrays({
+            'position': br_mesh.positions,
+            'normal': br_mesh.normals,
+            'bitangent': br_mesh.biTangents,
+            'tangent': br_mesh.tangents,
+            'color': br_mesh.colors,
+            'uv': br_mesh.uvs,
+            'bone_ids': br_mesh.boneIds,
+            'bone_weights': br_mesh.boneWeights,
+        })
+
+    def get_vertex_arrays(self) -> Dict[str, Optional[np.ndarray]]:
+        """Returns the vertex attributes of this mesh as a dictionary of arrays, using the field names of the NUD vertex dtypes.
+        Attributes that the vertices do not have are None.
+        """
+        return {
+            'position': self.positions,
+            'normal': self.normals,
+            'bitangent': self.bitangents,
+            'tangent': self.tangents,
+            'color': self.colors,
+            'uv': self.uvs,
+            'bone_ids': self.bone_ids,
+            'bone_weights': self.bone_weights,
+        }
+
+    def set_vertex_arrays(self, arrays: Dict[str, Optional[np.ndarray]]):
+        """Replaces the vertex attributes of this mesh with a dictionary of arrays (see get_vertex_arrays)."""
+        self.positions = arrays['position'] if arrays.get('position') is not None else np.zeros((0, 3), np.float32)
+        self.normals = arrays.get('normal')
+        self.bitangents = arrays.get('bitangent')
+        self.tangents = arrays.get('tangent')
+        self.colors = arrays.get('color')
+        self.uvs = arrays.get('uv')
+        self.bone_ids = arrays.get('bone_ids')
+        self.bone_weights = arrays.get('bone_weights')
+
+    def create_vertices(self) -> List['NudVertex']:
+        """Creates a list of NudVertex objects from the vertex arrays of this mesh."""
+        count = len(self.positions)
+
+        def column(array: Optional[np.ndarray]) -> list:
+            return list(map(tuple, array.tolist())) if array is not None else [None] * count
+
+        positions = column(self.positions)
+        normals = column(self.normals)
+        bitangents = column(self.bitangents)
+        tangents = column(self.tangents)
+        colors = column(self.colors)
+        bone_ids = column(self.bone_ids)
+        bone_weights = column(self.bone_weights)
+
+        uvs = [list(map(tuple, uv)) for uv in self.uvs.tolist()] if self.uvs is not None else [list()] * count
+
+        return list(map(NudVertex, positions, normals, bitangents, tangents, colors, uvs, bone_ids, bone_weights))
+
+    def add_faces(self, faces: np.ndarray, faceSize: int):
         if faceSize & 0x40:
             # 0x40 format does not have -1 indices nor changing directions
-            self.faces = zip(faces, faces, faces)
+            faces = np.asarray(faces, np.uint16)
+            self.faces = faces[:len(faces) - (len(faces) % 3)]
             return
 
-        self.faces = list()
-
-        start_dir = 1
-        f1 = next(faces)
-        f2 = next(faces)
-        face_dir = start_dir
-
-        try:
-            while True:
-                f3 = next(faces)
-
-                if f3 == -1:
-                    f1 = next(faces)
-                    f2 = next(faces)
-                    face_dir = start_dir
-                else:
-                    face_dir = -face_dir
-
-                    if f1 != f2 != f3:
-                        if face_dir > 0:
-                            self.faces.append((f3, f2, f1))
-                        else:
-                            self.faces.append((f2, f3, f1))
-                    f1 = f2
-                    f2 = f3
-        except StopIteration:
-            pass
+        self.faces = decode_triangle_strips(faces)
 
     def add_materials(self, materials: List[BrNudMaterial]):
         self.materials = list()
@@ -139,6 +210,8 @@ class NudMesh:
 
 
 class NudVertex:
+    __slots__ = ('position', 'normal', 'bitangent', 'tangent', 'color', 'uv', 'bone_ids', 'bone_weights')
+
     position: Tuple[float, float, float]
     normal: Tuple[float, float, float]
     bitangent: Tuple[float, float, float]
@@ -150,18 +223,16 @@ class NudVertex:
     bone_ids: Tuple[int, int, int, int]
     bone_weights: Tuple[float, float, float, float]
 
-    def init_data(self, br_vertex: BrNudVertex):
-        self.position = br_vertex.position
-        self.normal = br_vertex.normals
-        self.bitangent = br_vertex.biTangents if br_vertex.biTangents else None
-        self.tangent = br_vertex.tangents if br_vertex.tangents else None
-
-        self.color = tuple(map(lambda x: int(x), br_vertex.color)
-                           ) if br_vertex.color else None
-        self.uv = br_vertex.uv
-
-        self.bone_ids = br_vertex.boneIds
-        self.bone_weights = br_vertex.boneWeights
+    def __init__(self, position=tuple(), normal=tuple(), bitangent=tuple(), tangent=tuple(),
+                 color=tuple(), uv=None, bone_ids=tuple(), bone_weights=tuple()):
+        self.position = position
+        self.normal = normal
+        self.bitangent = bitangent
+        self.tangent = tangent
+        self.color = color
+        self.uv = uv if uv is not None else list()
+        self.bone_ids = bone_ids
+        self.bone_weights = bone_weights
 
     def __eq__(self, o: 'NudVertex') -> bool:
         return all(map(lambda x, y: x == y, self.position, o.position)) \
@@ -177,6 +248,48 @@ class NudVertex:
         return hash(tuple(self.position)) ^ hash(tuple(self.normal)) ^ hash(tuple(self.color)) ^ hash(tuple(self.uv))
 
 
+def create_vertex_arrays(vertices: List[NudVertex]) -> Dict[str, Optional[np.ndarray]]:
+    """Creates a dictionary of vertex attribute arrays (see NudMesh.get_vertex_arrays) from a list of NudVertex objects.
+    Whether each attribute exists is decided by the first vertex.
+    """
+    def column(name: str, dtype) -> Optional[np.ndarray]:
+        if not (vertices and getattr(vertices[0], name)):
+            return None
+
+        return np.array([getattr(v, name) for v in vertices], dtype)
+
+    uvs = column('uv', np.float32)
+
+    return {
+        'position': column('position', np.float32),
+        'normal': column('normal', np.float32),
+        'bitangent': column('bitangent', np.float32),
+        'tangent': column('tangent', np.float32),
+        'color': column('color', np.int32),
+        'uv': uvs.reshape(len(vertices), -1, 2) if uvs is not None else None,
+        'bone_ids': column('bone_ids', np.int64),
+        'bone_weights': column('bone_weights', np.float32),
+    }
+
+
+def get_bounding_sphere(positions: List[Optional[np.ndarray]]) -> Tuple[float, float, float, float]:
+    """Returns a bounding sphere (center x, y, z and radius) of a list of position arrays.
+    The center is the center of their bounding box.
+    """
+    positions = [p for p in positions if p is not None and len(p)]
+
+    if not positions:
+        return (0.0, 0.0, 0.0, 0.0)
+
+    lower = np.min([p.min(axis=0) for p in positions], axis=0)
+    higher = np.max([p.max(axis=0) for p in positions], axis=0)
+    center = (lower + higher) / 2
+
+    radius = max(float(np.sqrt(((p - center) ** 2).sum(axis=1).max())) for p in positions)
+
+    return (*map(float, center), radius)
+
+
 class NudMaterial:
     def init_data(self, material: BrNudMaterial):
         self.flags = material.flags
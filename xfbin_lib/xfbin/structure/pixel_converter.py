@@ -0,0 +1,62 @@
+from typing import Iterable, Union
+
+import numpy as np
+
+# Size in bytes of each pixel of the NUT pixel formats that are byteswapped between DDS (little endian) and NUT (big endian)
+# DXT1, DXT3 and DXT5 (0, 1 and 2) are copied as is
+NUT_PIXEL_SIZES = {
+    6: 2,  # 5.5.5.1
+    7: 2,  # 4.4.4.4
+    8: 2,  # 5.6.5
+    14: 4,  # 8.8.8.X
+    17: 4,  # 8.8.8.8
+}
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def swap_pixel_bytes(data: BytesLike, pixel_size: int) -> bytes:
+    """Reverses the byte order of each pixel of the given size. Trailing bytes that do not make a full pixel are kept as is."""
+    data = memoryview(data).cast('B')
+
+    if pixel_size < 2:
+        return bytes(data)
+
+    end = len(data) - (len(data) % pixel_size)
+    pixels = np.frombuffer(data, f'<u{pixel_size}', end // pixel_size)
+
+    return pixels.astype(f'>u{pixel_size}').tobytes() + bytes(data[end:])
+
+
+def swap_nut_pixels(data: BytesLike, pixel_format: int) -> bytes:
+    """Converts pixels of the given NUT pixel format between little endian (DDS) and big endian (NUT)."""
+    return swap_pixel_bytes(data, NUT_PIXEL_SIZES.get(pixel_format, 0))
+
+
+def reorder_channels(data: BytesLike, source: str, target: str) -> bytes:
+    """Reorders the channels of 8 bits per channel pixels, for example from "BGRA" to "RGBA"."""
+    data = memoryview(data).cast('B')
+
+    channels = len(source)
+    end = len(data) - (len(data) % channels)
+
+    pixels = np.frombuffer(data, np.uint8, end).reshape(-1, channels)
+    result = np.empty((len(pixels), len(target)), np.uint8)
+
+    # Copying each channel separately is faster than indexing all of them at once
+    for i, channel in enumerate(target):
+        result[:, i] = pixels[:, source.index(channel)]
+
+    return result.tobytes() + bytes(data[end:])
+
+
+def pad_mipmap(mip: BytesLike, size: int = 16) -> bytes:
+    """Pads a mipmap with zeros to be at least the given size."""
+    if len(mip) < size:
+        return bytes(mip) + bytes(size - len(mip))
+
+    return bytes(mip)
+
+
+def join_mipmaps(mipmaps: Iterable[BytesLike]) -> bytes:
+    return b''.join(mipmaps)
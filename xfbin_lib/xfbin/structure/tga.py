@@ -1,4 +1,5 @@
 from ..util import *
+from .pixel_converter import reorder_channels
 from enum import Enum
 from itertools import chain
 import numpy as np
@@ -71,34 +72,10 @@ class DataTypes(Enum):
 
 
 def BGRA_to_RGBA(data: bytes) -> bytes:
-    new_data = bytearray(data)
-    for i in range(0, len(new_data), 4):
-        b = new_data[i]
-        g = new_data[i + 1]
-        r = new_data[i + 2]
-        a = new_data[i + 3]
-        new_data[i] = r
-        new_data[i + 1] = g
-        new_data[i + 2] = b
-        new_data[i + 3] = a
-
-    
-    return bytes(new_data)
+    return reorder_channels(data, 'BGRA', 'RGBA')
 
 def BGRA_to_ARGB(data: bytes) -> bytes:
-    new_data = bytearray(data)
-    for i in range(0, len(new_data), 4):
-        b = new_data[i]
-        g = new_data[i + 1]
-        r = new_data[i + 2]
-        a = new_data[i + 3]
-        new_data[i] = a
-        new_data[i + 1] = r
-        new_data[i + 2] = g
-        new_data[i + 3] = b
-
-    
-    return bytes(new_data)
+    return reorder_channels(data, 'BGRA', 'ARGB')
 
 
 def rgbaToTGA(width,height,textureData):
@@ -1,5 +1,7 @@
-from itertools import chain
-from typing import Dict, List, Optional, Tuple, Union
+import gc
+import mmap
+from itertools import chain, count
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 from .nucc import (NuccChunk, NuccChunkClump, NuccChunkMaterial, NuccChunkModelHit, NuccChunkNull,
                    NuccChunkPage, NuccChunkTexture)
@@ -11,23 +13,177 @@ class ChunkReference:
         self.chunk = chunk
 
 
+class ChunkList(list):
+    """A list of NuccChunks that keeps the index of each chunk map (type, file path, and name) and the chunks of each type.\n
+    The indexes are updated when chunks are appended, and rebuilt the next time they are used after any other change.\n
+    """
+
+    # Shared by all ChunkLists, so that a version is never reused by a different list
+    versions = count()
+
+    def __init__(self, chunks: Iterable[NuccChunk] = ()):
+        super().__init__(chunks)
+        self.changed()
+
+    def changed(self):
+        # Changes every time the list is modified
+        self.version = next(ChunkList.versions)
+
+        self.__indices: Optional[Dict[NuccChunk, int]] = None
+        self.__types: Optional[Dict[type, List[NuccChunk]]] = None
+
+    def get_indices(self) -> Dict[NuccChunk, int]:
+        """Returns a dictionary of the index of the first chunk of each chunk map in this list."""
+        if self.__indices is None:
+            self.__indices = dict()
+            for i, chunk in enumerate(self):
+                self.__indices.setdefault(chunk, i)
+
+        return self.__indices
+
+    def get_types(self) -> Dict[type, List[NuccChunk]]:
+        """Returns a dictionary of the chunks of each type in this list, in order."""
+        if self.__types is None:
+            self.__types = dict()
+            for chunk in self:
+                self.__types.setdefault(type(chunk), list()).append(chunk)
+
+        return self.__types
+
+    def find(self, chunk: NuccChunk) -> int:
+        """Returns the index of the first chunk with the same chunk map as the given chunk, or -1 if it does not exist."""
+        return self.get_indices().get(chunk, -1)
+
+    def __contains__(self, chunk) -> bool:
+        return chunk in self.get_indices()
+
+    def index(self, chunk, *args) -> int:
+        if args:
+            return super().index(chunk, *args)
+
+        i = self.find(chunk)
+        if i == -1:
+            raise ValueError(f'{chunk} is not in list')
+
+        return i
+
+    def append(self, chunk: NuccChunk):
+        super().append(chunk)
+
+        indices, types = self.__indices, self.__types
+        self.changed()
+
+        # Keep the indexes instead of rebuilding them
+        if indices is not None:
+            indices.setdefault(chunk, len(self) - 1)
+            self.__indices = indices
+
+        if types is not None:
+            types.setdefault(type(chunk), list()).append(chunk)
+            self.__types = types
+
+    def __setitem__(self, key, value):
+        old = self[key] if isinstance(key, int) else None
+        super().__setitem__(key, value)
+
+        indices = self.__indices
+        self.changed()
+
+        # Replacing a chunk with another chunk of the same chunk map does not change the indices
+        if old is not None and old == value and type(old) is type(value):
+            self.__indices = indices
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.changed()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self.changed()
+        return result
+
+    def __imul__(self, other):
+        result = super().__imul__(other)
+        self.changed()
+        return result
+
+    def extend(self, chunks: Iterable[NuccChunk]):
+        super().extend(chunks)
+        self.changed()
+
+    def insert(self, index: int, chunk: NuccChunk):
+        super().insert(index, chunk)
+        self.changed()
+
+    def remove(self, chunk: NuccChunk):
+        super().remove(chunk)
+        self.changed()
+
+    def pop(self, index: int = -1) -> NuccChunk:
+        result = super().pop(index)
+        self.changed()
+        return result
+
+    def clear(self):
+        super().clear()
+        self.changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.changed()
+
+    def reverse(self):
+        super().reverse()
+        self.changed()
+
+
+class PageSource:
+    """The bytes of a Page in the XFBIN it was read from, along with the state of the Page when it was read.\n
+    Used for copying the Page as is when writing incrementally.
+    """
+
+    def __init__(self, data: memoryview, page: 'Page'):
+        self.data = data
+
+        # The local chunk indices in the data refer to this list
+        self.chunk_maps = tuple(page.initial_page_chunks)
+
+        self.chunks = tuple(c for c in page.chunks if not isinstance(c, (NuccChunkNull, NuccChunkPage)))
+        self.chunk_references = tuple((ref, ref.name, ref.chunk) for ref in page.chunk_references)
+
+
 class Page:
     # Only updated/used when the XFBIN is read for the first time
     # Used for writing the page's JSON to be used when repacking
     initial_page_chunks: List[NuccChunk]
 
     def __init__(self):
-        self.chunks: List[NuccChunk] = list()
+        self.chunks = ChunkList()
         self.chunk_references: List[ChunkReference] = list()
 
+        # Set when the page is read from an XFBIN, and used for writing it incrementally
+        self.source: Optional[PageSource] = None
+
+    @property
+    def chunks(self) -> ChunkList:
+        return self.__chunks
+
+    @chunks.setter
+    def chunks(self, chunks: Iterable[NuccChunk]):
+        # Lists are converted to ChunkLists to keep the chunks indexed
+        self.__chunks = chunks if isinstance(chunks, ChunkList) else ChunkList(chunks)
+
     def __iter__(self):
         return iter(self.chunks)
 
+    def __contains__(self, chunk: NuccChunk) -> bool:
+        return chunk in self.chunks
+
     def get_chunks_by_type(self, nucc_type: Union[str, type]) -> List[NuccChunk]:
         if type(nucc_type) is str:
             nucc_type = NuccChunk.get_nucc_type_from_str(nucc_type)
 
-        return [c for c in self.chunks if type(c) is nucc_type]
+        return list(self.chunks.get_types().get(nucc_type, ()))
 
     def clear(self):
         """Clears the Chunks list of this Page by removing every chunk."""
@@ -38,13 +194,41 @@ class Page:
         self.chunks = [c for c in self.chunks if not isinstance(
             c, (NuccChunkNull, NuccChunkPage))]
 
+    def mark_dirty(self):
+        """Marks this Page as modified, so that it will be written again instead of being copied from the XFBIN it was read from.\n
+        Only needed when a chunk in this Page was modified in place, as adding, removing, or replacing chunks is detected by is_modified,
+        and so are changes made in place to clumps, coords, models, and materials (see NuccChunk.is_modified).\n
+        """
+        self.source = None
+
+    def is_modified(self) -> bool:
+        """Returns True if this Page was not read from an XFBIN, was marked as dirty, or if its chunks or chunk references
+        were changed since it was read.\n
+        """
+        source = self.source
+        if source is None:
+            return True
+
+        chunks = [c for c in self.chunks if not isinstance(c, (NuccChunkNull, NuccChunkPage))]
+        if len(chunks) != len(source.chunks) or any(a is not b for (a, b) in zip(chunks, source.chunks)):
+            return True
+
+        if len(self.chunk_references) != len(source.chunk_references) or \
+                any(ref is not r or ref.name is not name or ref.chunk is not chunk
+                    for (ref, (r, name, chunk)) in zip(self.chunk_references, source.chunk_references)):
+            return True
+
+        return any(c.is_modified(source.chunk_maps) for c in chunks)
+
     def add_chunk(self, chunk: NuccChunk):
         """Adds the given NuccChunk to this Page.\n
         Chunks will be overwritten if they refer to the same chunk map (name, file path, and type match).\n
         """
 
-        if chunk in self.chunks:
-            self.chunks[self.chunks.index(chunk)] = chunk
+        index = self.chunks.find(chunk)
+
+        if index != -1:
+            self.chunks[index] = chunk
         else:
             self.chunks.append(chunk)
 
@@ -53,9 +237,47 @@ class Xfbin:
     def __init__(self):
         self.pages: List[Page] = list()
 
+        # Index of the first page that contains each chunk map
+        # Kept along with the pages and the versions of their chunk lists that it was built from, to update it after they change
+        self.__chunk_pages: Dict[NuccChunk, int] = dict()
+        self.__indexed_pages: List[Tuple[Page, ChunkList, int, Tuple[NuccChunk, ...]]] = list()
+
+        # The memory mapped file that this Xfbin was opened from with open_xfbin, which is closed by close()
+        self.file_map: Optional[mmap.mmap] = None
+
     def __iter__(self):
         return iter(self.pages)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Removes every Page of this Xfbin and closes the file that it was opened from with open_xfbin, if any.\n
+        The chunks (and their data) should not be used after closing the file. If they are still referenced elsewhere,
+        the file will stay mapped until they are released.\n
+        """
+        self.pages.clear()
+        self.__chunk_pages.clear()
+        self.__indexed_pages.clear()
+
+        file_map, self.file_map = self.file_map, None
+        if file_map is None:
+            return
+
+        try:
+            file_map.close()
+        except BufferError:
+            # The chunks and their data can still be in reference cycles (for example, between clumps and their models)
+            gc.collect()
+
+            try:
+                file_map.close()
+            except BufferError:
+                pass
+
     def get_type_chunk_dict(self) -> Dict[Union[str, type], List[NuccChunk]]:
         chunks = list(chain.from_iterable(self.pages))
         result: Dict[type, List[NuccChunk]] = dict()
@@ -98,11 +320,47 @@ class Xfbin:
 
     def get_chunk_page(self, chunk: NuccChunk) -> Optional[Tuple[int, Page]]:
         """Returns a tuple of the index and the Page that contains a chunk map reference of the given NuccChunk, or None if it does not exist."""
-        for i, page in enumerate(self.pages):
-            if chunk in page.chunks:
-                return (i, page)
+        index = self.get_chunk_pages().get(chunk)
 
-        return None
+        if index is None:
+            return None
+
+        return (index, self.pages[index])
+
+    def get_chunk_pages(self) -> Dict[NuccChunk, int]:
+        """Returns a dictionary of the index of the first Page that contains each chunk map.\n
+        Only the pages starting from the first Page that was added, removed, or modified since the last call are indexed again.\n
+        """
+        indexed = self.__indexed_pages
+        chunk_pages = self.__chunk_pages
+
+        # Find the first page that changed
+        start = 0
+        for page, (indexed_page, chunks, version, _) in zip(self.pages, indexed):
+            if page is not indexed_page or page.chunks is not chunks or chunks.version != version:
+                break
+            start += 1
+
+        if start == len(self.pages) == len(indexed):
+            return chunk_pages
+
+        # Remove the chunk maps of the changed pages, then add the chunk maps of the pages again
+        for _, _, _, keys in indexed[start:]:
+            for chunk in keys:
+                if chunk_pages.get(chunk, -1) >= start:
+                    del chunk_pages[chunk]
+
+        del indexed[start:]
+
+        for i in range(start, len(self.pages)):
+            page = self.pages[i]
+            keys = tuple(page.chunks.get_indices())
+            indexed.append((page, page.chunks, page.chunks.version, keys))
+
+            for chunk in keys:
+                chunk_pages.setdefault(chunk, i)
+
+        return chunk_pages
 
     def update_chunk_page(self, chunk: NuccChunk):
         """Overwrites the Page that contains a chunk map reference of the given NuccChunk with the chunk.\n
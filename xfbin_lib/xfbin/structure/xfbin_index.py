@@ -0,0 +1,105 @@
+from hashlib import blake2b
+from typing import Dict, List, Optional
+
+from .br.br_xfbin import BrXfbin
+
+
+class XfbinIndexPage:
+    def __init__(self):
+        # Byte offset and size of the page in the file
+        self.offset = 0
+        self.size = 0
+
+        # Start of this page's indices and references in the chunk table
+        self.pageStart = 0
+        self.referenceStart = 0
+
+
+class XfbinIndexEntry:
+    # Size of the content hash of each chunk in bytes
+    HASH_SIZE = 16
+
+    def __init__(self):
+        self.type = ''
+        self.filePath = ''
+        self.name = ''
+
+        self.page = 0
+
+        # Byte offset of the chunk's header and size of its data in the file
+        self.offset = 0
+        self.size = 0
+
+        self.hash = bytes(XfbinIndexEntry.HASH_SIZE)
+
+    @staticmethod
+    def get_hash(data) -> bytes:
+        return blake2b(data, digest_size=XfbinIndexEntry.HASH_SIZE).digest()
+
+
+class XfbinIndex:
+    """An index of the chunks in an XFBIN file, used for finding chunks without reading the whole file."""
+
+    def __init__(self):
+        # Size and modification time of the XFBIN file that this index was created from
+        self.fileSize = 0
+        self.fileTime = 0
+
+        self.pages: List[XfbinIndexPage] = list()
+        self.entries: List[XfbinIndexEntry] = list()
+
+        self.update_dicts()
+
+    def init_data(self, br_xfbin: BrXfbin, file_size: int, file_time: int):
+        self.fileSize = file_size
+        self.fileTime = file_time
+
+        table = br_xfbin.chunkTable
+
+        self.pages = list()
+        self.entries = list()
+
+        for i, br_page in enumerate(br_xfbin.pages):
+            page = XfbinIndexPage()
+            page.offset = br_page.offset
+            page.size = br_page.size
+            page.pageStart = br_page.pageStart
+            page.referenceStart = br_page.referenceStart
+
+            self.pages.append(page)
+
+            for br_chunk in br_page.brChunks.values():
+                entry = XfbinIndexEntry()
+                entry.type, entry.filePath, entry.name = table.get_props_from_br_chunk(br_chunk, br_page.pageStart)
+                entry.page = i
+                entry.offset = br_chunk.offset
+                entry.size = br_chunk.size
+                entry.hash = XfbinIndexEntry.get_hash(br_chunk.data)
+
+                self.entries.append(entry)
+
+        self.update_dicts()
+
+    def update_dicts(self):
+        """Updates the name and type dictionaries of this index. Should be called after modifying the entries list."""
+        self.name_dict: Dict[str, List[XfbinIndexEntry]] = dict()
+        self.type_dict: Dict[str, List[XfbinIndexEntry]] = dict()
+
+        for entry in self.entries:
+            self.name_dict.setdefault(entry.name, list()).append(entry)
+            self.type_dict.setdefault(entry.type, list()).append(entry)
+
+    def get_entry(self, name: str, chunk_type: Optional[str] = None) -> Optional[XfbinIndexEntry]:
+        """Returns the first entry with the given name (and type, if given), or None if it does not exist."""
+        for entry in self.name_dict.get(name, list()):
+            if chunk_type is None or entry.type == chunk_type:
+                return entry
+
+        return None
+
+    def get_entries_by_type(self, chunk_type: str) -> List[XfbinIndexEntry]:
+        return list(self.type_dict.get(chunk_type, list()))
+
+    def is_valid_for(self, file_size: int, file_time: int) -> bool:
+        """Returns True if this index was created from a file with the given size and modification time."""
+        return self.fileSize == file_size and self.fileTime == file_time
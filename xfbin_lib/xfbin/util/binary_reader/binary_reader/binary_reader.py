@@ -3,10 +3,11 @@ __copyright__ = "Copyright 2021, SutandoTsukai181"
 __license__ = "MIT"
 __version__ = "1.4.3"
 
+import re
 import struct
 from contextlib import contextmanager
 from enum import Flag, IntEnum
-from typing import Tuple, Union, Any, Iterable
+from typing import Dict, Tuple, Union, Any, Iterable
 
 FMT = {
     "b": 1, "B": 1, "s": 1,
@@ -16,6 +17,14 @@ FMT = {
 }
 
 
+# Compiled structs for each endianness, keyed by (count, format) for single types, or by format for records
+STRUCTS: Dict[str, Dict[Union[Tuple[int, str], str], struct.Struct]] = {"<": dict(), ">": dict()}
+STRUCTS_MAX_SIZE = 0x400
+
+# Searches for null terminators in buffers without copying them (re accepts any bytes-like object)
+NULL_PATTERN = re.compile(b'\x00')
+
+
 class Endian(Flag):
     LITTLE = False
     BIG = True
@@ -38,32 +47,47 @@ class BrStruct:
 
 
 class BinaryReader:
-    """A buffer reader/writer containing a mutable bytearray."""
-    __buf: bytearray
+    """A buffer reader/writer containing a mutable bytearray, or a read-only memoryview of an existing buffer."""
+    __buf: Union[bytearray, memoryview]
     __idx: int
     __endianness: Endian
     __encoding: str
+    __readonly: bool
+    __find_buf: Any
+    __structs: Dict[Union[Tuple[int, str], str], struct.Struct]
     endianness: str
 
-    def __init__(self, buffer: bytearray = bytearray(), endianness: Endian = Endian.LITTLE, encoding='utf-8'):
+    def __init__(self, buffer: bytearray = bytearray(), endianness: Endian = Endian.LITTLE, encoding='utf-8', readonly: bool = False):
         """Constructs a BinaryReader with the given buffer, endianness, and encoding and sets its position to 0.\n
         If buffer is not given, a new bytearray() is created. If endianness is not given, it is set to little endian.\n
-        Default encoding is UTF-8. Will throw an exception if encoding is unknown.
-        """
-        self.__buf = bytearray(buffer)
-        self.__endianness = endianness
+        Default encoding is UTF-8. Will throw an exception if encoding is unknown.\n
+        If readonly is `True`, the buffer will not be copied. The BinaryReader will instead use a memoryview of
+        the given buffer (which can be any bytes-like object, such as bytes or an mmap), `read_bytes` will return
+        memoryview slices of it, and all write methods will throw an exception.
+        """
+        self.__readonly = readonly
+        if readonly:
+            self.__buf = memoryview(buffer).cast('B')
+
+            # A view of a whole bytes or mmap object can be searched with the object's find method
+            obj = self.__buf.obj
+            self.__find_buf = obj if hasattr(obj, 'find') and len(obj) == self.__buf.nbytes else None
+        else:
+            self.__buf = bytearray(buffer)
+            self.__find_buf = None
         self.__idx = 0
         self.set_encoding(encoding)
-        if self.__endianness == Endian.BIG:
-            self.endianness = ">"
-        else:
-            self.endianness = "<"
+        self.set_endian(endianness)
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.__buf.clear()
+        if self.__readonly:
+            # Slices that were returned by read_bytes stay valid after releasing the view
+            self.__buf.release()
+        else:
+            self.__buf.clear()
 
     def pos(self) -> int:
         """Returns the current position in the buffer."""
@@ -88,10 +112,25 @@ class BinaryReader:
         """Returns the buffer as a bytearray."""
         return bytearray(self.__buf)
 
+    def view(self) -> memoryview:
+        """Returns a read-only memoryview of the buffer without copying it.\n
+        If the BinaryReader is not read-only, the view should be released before writing to the buffer again.
+        """
+        return memoryview(self.__buf).toreadonly()
+
+    def is_readonly(self) -> bool:
+        """Returns True if the BinaryReader was constructed with `readonly`."""
+        return self.__readonly
+
+    def __check_writable(self) -> None:
+        if self.__readonly:
+            raise TypeError('Cannot write to a read-only BinaryReader.')
+
     def pad(self, size: int) -> None:
         """Pads the buffer by 0s with the given size and advances the buffer position.\n
         Will advance the buffer position only if the position was at the end of the buffer.
         """
+        self.__check_writable()
         if self.__idx == len(self.__buf):
             self.__idx += size
         self.__buf.extend(b'\x00' * size)
@@ -119,6 +158,7 @@ class BinaryReader:
         """Extends the BinaryReader's buffer with the given buffer.\n
         Does not advance buffer position.
         """
+        self.__check_writable()
         self.__buf.extend(buffer)
 
     def trim(self, size: int) -> int:
@@ -168,6 +208,22 @@ class BinaryReader:
     def set_endian(self, endianness: Endian) -> None:
         """Sets the endianness of the BinaryReader."""
         self.__endianness = endianness
+        self.endianness = ">" if endianness else "<"
+        self.__structs = STRUCTS[self.endianness]
+
+    def __get_struct(self, key: Union[Tuple[int, str], str]) -> struct.Struct:
+        # Compile the struct only once for each format
+        compiled = self.__structs.get(key)
+
+        if compiled is None:
+            # Counts can be arbitrary, so don't let the cache grow indefinitely
+            if len(self.__structs) >= STRUCTS_MAX_SIZE:
+                self.__structs.clear()
+
+            compiled = self.__structs[key] = struct.Struct(
+                f'{self.endianness}{key[0]}{key[1]}' if isinstance(key, tuple) else f'{self.endianness}{key}')
+
+        return compiled
 
     def set_encoding(self, encoding: str) -> None:
         """Sets the default encoding of the BinaryReader when reading/writing strings.\n
@@ -178,22 +234,59 @@ class BinaryReader:
 
     @staticmethod
     def is_iterable(x) -> bool:
-        return hasattr(x, '__iter__') and not isinstance(x, (str, bytes))
+        # Numbers are checked first, as that is the most common case (and int flags are iterable since Python 3.11)
+        return not isinstance(x, (int, float, str, bytes)) and hasattr(x, '__iter__')
 
     def __read_type(self, format: str, count=1):
         i = self.__idx
-        size = FMT[format] * count
-        self.__idx += size
+        compiled = self.__structs.get((count, format)) or self.__get_struct((count, format))
+        self.__idx += compiled.size
+
+        if self.__idx > len(self.__buf):
+            raise ValueError('Cannot read farther than buffer length.')
+
+        return compiled.unpack_from(self.__buf, i)
+
+    def read_format(self, format: str) -> Tuple:
+        """Reads a record of multiple values using a struct format string without the byte order character (e.g. "3f", "I2H").\n
+        The BinaryReader's endianness will be used, and the values will be returned as a tuple.\n
+        This is faster than reading each of the record's values separately.
+        """
+        i = self.__idx
+        compiled = self.__structs.get(format) or self.__get_struct(format)
+        self.__idx += compiled.size
+
+        if self.__idx > len(self.__buf):
+            raise ValueError('Cannot read farther than buffer length.')
+
+        return compiled.unpack_from(self.__buf, i)
 
-        if self.__past_eof(self.__idx):
+    def read_bytes(self, size=1) -> Union[bytes, memoryview]:
+        """Reads a bytes object with the given size from the current position.\n
+        If the BinaryReader is read-only, a memoryview slice of the buffer will be returned instead of a copy.
+        """
+        i = self.__idx
+        if size < 0 or self.__past_eof(i + size):
             raise ValueError('Cannot read farther than buffer length.')
 
-        end = ">" if self.__endianness else "<"
-        return struct.unpack_from(f'{end}{count}{format}', self.__buf, i)
+        self.__idx += size
+        if self.__readonly:
+            return self.__buf[i:self.__idx]
+
+        # Slicing through a memoryview avoids copying the bytes into a bytearray before copying them into bytes
+        with memoryview(self.__buf) as view:
+            return bytes(view[i:self.__idx])
 
-    def read_bytes(self, size=1) -> bytes:
-        """Reads a bytes object with the given size from the current position."""
-        return self.__read_type("s", size)[0]
+    def __find_null(self, start: int) -> int:
+        if not self.__readonly:
+            return self.__buf.find(b'\x00', start)
+
+        if self.__find_buf is not None:
+            return self.__find_buf.find(b'\x00', start)
+
+        # memoryview does not have a find method, and views of slices cannot use the find method of their object
+        match = NULL_PATTERN.search(self.__buf, start)
+        return match.start() if match else -1
 
     def read_str(self, size=None, encoding=None) -> str:
         """Reads a string with the given size from the current position.\n
@@ -203,17 +296,17 @@ class BinaryReader:
         encode = encoding or self.__encoding
 
         if size is None:
-            end_idx = self.__buf.find(b'\x00', self.__idx)
+            end_idx = self.__find_null(self.__idx)
             if end_idx == -1:
                 end_idx = len(self.__buf)
-            string = self.__buf[self.__idx:end_idx]
+            string = bytes(self.__buf[self.__idx:end_idx])
             self.__idx = end_idx + 1
             return string.decode(encode)
 
         if size < 0:
             raise ValueError('size cannot be negative')
 
-        return self.read_bytes(size).split(b'\x00', 1)[0].decode(encode)
+        return bytes(self.read_bytes(size)).split(b'\x00', 1)[0].decode(encode)
 
     def read_str_to_token(self, token: str, encoding=None) -> str:
         """Reads a string until a string token is found.\n
@@ -333,22 +426,64 @@ class BinaryReader:
 
     def __write_type(self, format: str, value: Any, is_iterable: bool = False) -> None:
         """Writes a value or iterable of values to the buffer using the given format."""
+        if self.__readonly:
+            raise TypeError('Cannot write to a read-only BinaryReader.')
+
         i = self.__idx
         count = len(value) if is_iterable or isinstance(value, bytes) else 1
-        size = FMT[format] * count
+        compiled = self.__structs.get((count, format)) or self.__get_struct((count, format))
+        self.__idx += compiled.size
 
-        if i + size > len(self.__buf):
-            self.__buf.extend(b'\x00' * (i + size - len(self.__buf)))
-        self.__idx += size
+        if i == len(self.__buf):
+            # Appending to the end of the buffer is the most common case
+            self.__buf += compiled.pack(*value) if is_iterable else compiled.pack(value)
+            return
+
+        if self.__idx > len(self.__buf):
+            self.__buf.extend(b'\x00' * (self.__idx - len(self.__buf)))
 
         if is_iterable:
-            struct.pack_into(f'{self.endianness}{count}{format}', self.__buf, i, *value)
+            compiled.pack_into(self.__buf, i, *value)
         else:
-            struct.pack_into(f'{self.endianness}{count}{format}', self.__buf, i, value)
+            compiled.pack_into(self.__buf, i, value)
+
+    def write_format(self, format: str, values: Iterable) -> None:
+        """Writes a record of multiple values using a struct format string without the byte order character (e.g. "3f", "I2H").\n
+        The BinaryReader's endianness will be used.\n
+        This is faster than writing each of the record's values separately.
+        """
+        if self.__readonly:
+            raise TypeError('Cannot write to a read-only BinaryReader.')
+
+        i = self.__idx
+        compiled = self.__structs.get(format) or self.__get_struct(format)
+        self.__idx += compiled.size
+
+        if i == len(self.__buf):
+            self.__buf += compiled.pack(*values)
+            return
+
+        if self.__idx > len(self.__buf):
+            self.__buf.extend(b'\x00' * (self.__idx - len(self.__buf)))
+
+        compiled.pack_into(self.__buf, i, *values)
 
     def write_bytes(self, value: bytes) -> None:
-        """Writes a bytes object to the buffer."""
-        self.__write_type("s", value, is_iterable=False)
+        """Writes a bytes object to the buffer.\n
+        Any bytes-like object (bytearray, memoryview, etc) can be given as well.
+        """
+        self.__check_writable()
+        if not isinstance(value, bytes):
+            value = memoryview(value).cast('B')
+
+        i = self.__idx
+        size = len(value)
+
+        if i + size > len(self.__buf):
+            self.__buf.extend(b'\x00' * (i + size - len(self.__buf)))
+        self.__idx += size
+
+        self.__buf[i:self.__idx] = value
 
     def write_str(self, string: str, null: bool = False, encoding: str = None) -> int:
         """Writes a whole string to the buffer.\n
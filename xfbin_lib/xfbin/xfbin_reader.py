@@ -1,14 +1,34 @@
-from typing import List, Union
+import io
+import mmap
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple, Union
 
 from .structure.br.br_xfbin import *
+from .structure.br.br_xfbin_index import BrXfbinIndex
+from .structure.decode_cache import dump_decoded, enable_decode_cache, get_decode_cache
 from .structure.nucc import NuccChunk
-from .structure.xfbin import Page, Xfbin
+from .structure.xfbin import Page, PageSource, Xfbin
+from .structure.xfbin_index import XfbinIndex, XfbinIndexPage
 from .util import *
 
+# Chunk types that are decoded in other processes when reading with multiple processes.
+# Other chunks are fast enough to decode that sending them between processes would take longer than decoding them
+# (NUT textures are mostly sliced from the chunk's data, which would have to be copied back).
+PARALLEL_CHUNK_TYPES = {'nuccChunkModel', 'nuccChunkAnm', 'nuccChunkModelHit',
+                        'nuccChunkModelPrimitiveBatch', 'nuccChunkPrimitiveVertex'}
 
-def read_xfbin(file: Union[str, bytearray]) -> Xfbin:
+# Size of the header of a BrChunk, before its data
+CHUNK_HEADER_SIZE = 0xC
+
+
+def read_xfbin(file: Union[str, bytearray], processes: int = 0) -> Xfbin:
     """Reads an XFBIN file and returns an Xfbin object.
+    The file is read in read-only mode, so the chunks' data will be memoryview slices of the file buffer instead of copies.
+    If a bytes-like object is given, it should not be resized while the returned Xfbin is still in use.
     :param file: Path to file as a string, or bytes-like object containing the file
+    :param processes: Number of processes for decoding the pages' chunks in parallel (see decode_pages), or 0 to decode them in this process
     :return: The Xfbin object
     """
     if isinstance(file, str):
@@ -17,9 +37,216 @@ def read_xfbin(file: Union[str, bytearray]) -> Xfbin:
     else:
         file_bytes = file
 
-    with BinaryReader(file_bytes, Endian.BIG, 'cp932') as br:
-        br_xfbin: BrXfbin = br.read_struct(BrXfbin)
+    with BinaryReader(file_bytes, Endian.BIG, 'cp932', readonly=True) as br:
+        if processes > 1:
+            # Only find the pages and their chunks first, then decode the chunks
+            br_xfbin: BrXfbin = br.read_struct(BrXfbin, None, True)
+            decode_pages(br_xfbin, processes, file if isinstance(file, str) else None)
+        else:
+            br_xfbin: BrXfbin = br.read_struct(BrXfbin)
+
+    return create_xfbin(br_xfbin)
+
+
+def decode_pages(br_xfbin: BrXfbin, processes: int, path: Optional[str] = None) -> None:
+    """Converts the BrChunks of a lazily read BrXfbin to BrNuccChunks, decoding the pages' chunks of PARALLEL_CHUNK_TYPES
+    in a pool of processes (one task for each page) while the rest of the chunks are decoded in this process.
+    :param br_xfbin: BrXfbin object that was read lazily
+    :param processes: Number of processes in the pool
+    :param path: Path of the file the BrXfbin was read from, to let the processes read the chunks' data from it instead of sending it to them
+    """
+    table = br_xfbin.chunkTable
+
+    # Chunks to be decoded by the pool for each page
+    tasks: List[Tuple[BrPage, list]] = list()
+
+    for br_page in br_xfbin.pages:
+        page_chunks = list()
+
+        for index, br_chunk in br_page.brChunks.items():
+            if index in br_page.chunksDict:
+                continue
+
+            props = table.get_props_from_br_chunk(br_chunk, br_page.pageStart)
+            if props[0] in PARALLEL_CHUNK_TYPES:
+                data = (br_chunk.offset + CHUNK_HEADER_SIZE, br_chunk.size) if path else bytes(br_chunk.data)
+                page_chunks.append((index, *props, data, br_chunk.nuccId, br_chunk.unk))
+
+        if page_chunks:
+            tasks.append((br_page, page_chunks))
+
+    cache = get_decode_cache()
+    cache_args = (cache.path, cache.max_size) if cache is not None else None
+
+    with ProcessPoolExecutor(min(processes, max(1, len(tasks))), initializer=init_decode_worker, initargs=(cache_args,)) as executor:
+        futures = [(br_page, executor.submit(decode_page_chunks, path, page_chunks)) for (br_page, page_chunks) in tasks]
+
+        # Decode the rest of the chunks while the pool is busy
+        for br_page in br_xfbin.pages:
+            for index, br_chunk in br_page.brChunks.items():
+                if index not in br_page.chunksDict and table.get_props_from_br_chunk(br_chunk, br_page.pageStart)[0] not in PARALLEL_CHUNK_TYPES:
+                    br_page.chunksDict[index] = table.get_br_nucc_chunk(br_chunk, br_page.pageStart)
+
+        # Merge the decoded chunks into their pages, giving them back the data that was not sent with them
+        for br_page, future in futures:
+            for index, br_nucc_chunk in pickle.loads(future.result()):
+                br_nucc_chunk.data = br_page.brChunks[index].data
+                br_page.chunksDict[index] = br_nucc_chunk
+
+    br_xfbin.chunks = [c for br_page in br_xfbin.pages for c in br_page.chunksDict.values()]
+
+
+def init_decode_worker(cache_args: Optional[Tuple[str, int]]) -> None:
+    # Use the same decode cache as the main process
+    if cache_args is not None:
+        enable_decode_cache(*cache_args)
+
+
+def decode_page_chunks(path: Optional[str], page_chunks: List[tuple]) -> bytes:
+    """Decodes chunks of a page in a worker process of decode_pages, and returns the pickled list of (index, BrNuccChunk).
+    The data of each chunk is either its (offset, size) in the file at path, or its bytes.
+    """
+    file_map = None
+    if path is not None:
+        with open(path, 'rb') as f:
+            file_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    results = list()
+    for (index, type_str, file_path, name, data, version, unk) in page_chunks:
+        if file_map is not None:
+            offset, size = data
+            data = memoryview(file_map)[offset: offset + size]
+
+        br_nucc_chunk = BrNuccChunk.create_from_nucc_type(type_str, file_path, name, data, version, unk)
+
+        # The main process already has the data
+        br_nucc_chunk.data = None
+        results.append((index, br_nucc_chunk))
+
+    # Pickle the results here, as they can contain memoryviews of the data that have to be stored as bytes
+    with io.BytesIO() as f:
+        dump_decoded(results, f)
+        return f.getvalue()
+
+
+def open_xfbin(path: str, lazy: bool = True) -> Xfbin:
+    """Opens an XFBIN file by memory mapping it and returns an Xfbin object.
+    If lazy is True, only the chunk table and the offsets of the chunks in each page will be read, and each chunk
+    will be initialized the first time one of its properties is accessed.
+    The file will stay mapped until the returned Xfbin is closed (it can be used in a with statement), and the
+    file cannot be overwritten or deleted on some platforms until then.
+    :param path: Path to file as a string
+    :param lazy: Whether to defer initializing the chunks until they are used
+    :return: The Xfbin object
+    """
+    with open(path, 'rb') as f:
+        file_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with BinaryReader(file_map, Endian.BIG, 'cp932', readonly=True) as br:
+        br_xfbin: BrXfbin = br.read_struct(BrXfbin, None, lazy)
+
+    xfbin = create_xfbin(br_xfbin)
+    xfbin.file_map = file_map
+
+    return xfbin
+
+
+def read_xfbin_index(path: str, write_sidecar: bool = True) -> XfbinIndex:
+    """Returns an index of the chunks in an XFBIN file.
+    The index is loaded from the "<path>.idx" sidecar file if it exists and was created from a file with the same size and modification time.
+    Otherwise, it is created from the chunk table and the chunk headers of the file, and written to the sidecar file if write_sidecar is True.
+    :param path: Path to file as a string
+    :param write_sidecar: Whether to write the sidecar file when the index is created
+    :return: The XfbinIndex object
+    """
+    stat = os.stat(path)
+    index_path = path + '.idx'
+
+    if os.path.isfile(index_path):
+        try:
+            with open(index_path, 'rb') as f:
+                index: XfbinIndex = BinaryReader(f.read()).read_struct(BrXfbinIndex).index
+
+            if index.is_valid_for(stat.st_size, stat.st_mtime_ns):
+                return index
+        except Exception:
+            # The sidecar file is corrupted or was written by a different version, so create it again
+            pass
+
+    index = XfbinIndex()
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+        with BinaryReader(file_map, Endian.BIG, 'cp932', readonly=True) as br:
+            br_xfbin: BrXfbin = br.read_struct(BrXfbin, None, True)
+
+        index.init_data(br_xfbin, stat.st_size, stat.st_mtime_ns)
+
+        # Release the chunks' data before the file is closed
+        del br_xfbin
+
+    if write_sidecar:
+        br = BinaryReader()
+        br.write_struct(BrXfbinIndex(), index)
+
+        try:
+            # Write to a temporary file first to avoid leaving a partially written index
+            with open(index_path + '.tmp', 'wb') as f:
+                f.write(br.buffer())
+            os.replace(index_path + '.tmp', index_path)
+        except OSError:
+            pass
+
+    return index
+
+
+def read_xfbin_chunk(path: str, name: str, chunk_type: Optional[str] = None) -> Optional[NuccChunk]:
+    """Reads a single chunk from an XFBIN file by seeking directly to its page using the file's index (see read_xfbin_index).
+    Only the chunk table and the page that contains the chunk will be read, and the chunk will be initialized lazily.
+    The file is not kept open, as the chunk's data refers to a copy of the page.
+    :param path: Path to file as a string
+    :param name: Name of the chunk
+    :param chunk_type: Type of the chunk as a string (for example, "nuccChunkModel"), or None to return the first chunk with the given name
+    :return: The NuccChunk object, or None if it does not exist in the file
+    """
+    index = read_xfbin_index(path)
+    entry = index.get_entry(name, chunk_type)
+
+    if entry is None:
+        return None
 
+    page = index.pages[entry.page]
+
+    # Read the header and the chunk table (everything before the first page), followed by the page
+    with open(path, 'rb') as f:
+        file_bytes = bytearray(f.read(index.pages[0].offset))
+        table_size = len(file_bytes)
+
+        f.seek(page.offset)
+        file_bytes += f.read(page.size)
+
+    # The page is at the end of the chunk table in the copy
+    copy_page = XfbinIndexPage()
+    copy_page.offset = table_size
+    copy_page.size = page.size
+    copy_page.pageStart = page.pageStart
+    copy_page.referenceStart = page.referenceStart
+
+    with BinaryReader(file_bytes, Endian.BIG, 'cp932', readonly=True) as br:
+        br_xfbin: BrXfbin = br.read_struct(BrXfbin, None, True, [copy_page])
+
+    for chunk in create_xfbin(br_xfbin).pages[0]:
+        if chunk.type == entry.type and chunk.filePath == entry.filePath and chunk.name == entry.name:
+            return chunk
+
+    return None
+
+
+def create_xfbin(br_xfbin: BrXfbin) -> Xfbin:
+    """Creates an Xfbin object from a BrXfbin.
+    Chunks that were not converted to BrNuccChunks while reading the BrXfbin will be initialized lazily.
+    :param br_xfbin: BrXfbin object
+    :return: The Xfbin object
+    """
     table = br_xfbin.chunkTable
 
     # Create NuccChunks with the correct type from the chunk map
@@ -39,17 +266,47 @@ def read_xfbin(file: Union[str, bytearray]) -> Xfbin:
         page.chunk_references = list(map(lambda x: ChunkReference(
             table.chunkNames[x.chunkNameIndex], chunks[x.chunkMapIndex]), br_page.pageChunkReferences))
 
-        for index in br_page.chunksDict:
+        for index in br_page.brChunks:
             # Get the NuccChunk corresponding to the current BrNuccChunk
             chunk: NuccChunk = chunks[br_page.pageChunkIndices[index]]
 
-            # Initialize the NuccChunk's data using the BrNuccChunk, the list of chunks, and the indices from the page
-            chunk.init_data(br_page.chunksDict[index], chunks, br_page.pageChunkIndices, page.chunk_references, page.initial_page_chunks)
+            if index in br_page.chunksDict:
+                # Initialize the NuccChunk's data using the BrNuccChunk, the list of chunks, and the indices from the page
+                chunk.init_data(br_page.chunksDict[index], chunks, br_page.pageChunkIndices, page.chunk_references, page.initial_page_chunks)
+            else:
+                # Keep the properties that do not need the BrNuccChunk, and convert the BrChunk when the chunk is used
+                chunk.version = br_page.brChunks[index].nuccId
+                chunk.data = br_page.brChunks[index].data
+                chunk.has_data = True
+
+                chunk.defer_init_data(create_chunk_initializer(
+                    chunk, br_xfbin, br_page, br_page.brChunks[index], chunks, page))
 
             # Add the chunk to the page
             page.chunks.append(chunk)
 
+        # Record the page's bytes and chunks to be able to check if they were modified when writing incrementally
+        if br_page.data is not None:
+            for chunk in page.chunks:
+                chunk.record_source_state()
+            page.source = PageSource(br_page.data, page)
+
         # Add the page to the xfbin
         xfbin.pages.append(page)
 
     return xfbin
+
+
+def create_chunk_initializer(chunk: NuccChunk, br_xfbin: BrXfbin, br_page: BrPage, br_chunk: BrChunk, chunks: List[NuccChunk], page: Page):
+    def init_data():
+        # Initializing a chunk can set properties of other chunks (for example, clumps set the coords of their models),
+        # which should not count as modifying them
+        unmodified = [c for c in page.chunks if c is not chunk and not c.is_modified()]
+
+        br_nucc_chunk = br_xfbin.chunkTable.get_br_nucc_chunk(br_chunk, br_page.pageStart)
+        chunk.init_data(br_nucc_chunk, chunks, br_page.pageChunkIndices, page.chunk_references, page.initial_page_chunks)
+
+        for c in unmodified:
+            c.record_source_state()
+
+    return init_data
@@ -1,23 +1,99 @@
+import os
+import shutil
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO
+
 from .structure.br.br_xfbin import *
 from .structure.xfbin import Xfbin
 from .util import *
 
+# Written pages are kept in memory until they reach this size, and are stored in a temporary file after that
+PAGE_SPOOL_SIZE = 32 * 1024 * 1024
+
 
-def write_xfbin(xfbin: Xfbin) -> bytearray:
+def write_xfbin(xfbin: Xfbin, incremental: bool = False) -> bytearray:
     """Writes an XFBIN object to memory and returns a bytearray.
+    If incremental is True, pages that were read from an XFBIN and were not modified since then will be copied as is
+    instead of being written again. Clumps, coords, models and materials are compared with the data they were read from,
+    but other chunks that were modified in place should be marked with mark_dirty() first.
     :param xfbin: Xfbin object
+    :param incremental: Whether to copy the unmodified pages from the XFBIN they were read from
     :return: A bytearray containing the written xfbin
     """
 
-    br = BinaryReader(endianness=Endian.BIG)
+    br_xfbin = BrXfbin()
+
+    # Copy each page to the result as soon as it is written, instead of keeping all of them until the chunk table is written
+    result = bytearray()
+    for page_data, _ in br_xfbin.write_pages(xfbin, incremental):
+        result += page_data
+
+    with BinaryReader(endianness=Endian.BIG) as br:
+        br_xfbin.write_chunk_table(br)
+
+        # Insert the header and the chunk table before the pages, which moves the pages without copying them to another buffer
+        with br.view() as table_view:
+            result[:0] = table_view
+
+    return result
+
+
+def write_xfbin_to_file(xfbin: Xfbin, file: BinaryIO, incremental: bool = False) -> None:
+    """Writes an XFBIN object to a binary file object.
+    Only one page is written in memory at a time, and the written pages are spooled to a temporary file
+    (after reaching PAGE_SPOOL_SIZE) until the chunk table is done, as the table comes before the pages.
+    Pages that are copied as is (when incremental is True) are written directly from the XFBIN they were read from.
+    :param xfbin: Xfbin object
+    :param file: File object opened for writing in binary mode
+    :param incremental: Whether to copy the unmodified pages from the XFBIN they were read from
+    """
+    br_xfbin = BrXfbin()
+
+    with SpooledTemporaryFile(PAGE_SPOOL_SIZE) as spool:
+        # Each page is either a memoryview of the XFBIN it was copied from, or the offset and size of a page in the spool
+        pages = list()
+
+        for page_data, copied in br_xfbin.write_pages(xfbin, incremental):
+            if copied:
+                pages.append(page_data)
+            else:
+                pages.append((spool.tell(), len(page_data)))
+                spool.write(page_data)
+
+        # Write the header and the chunk table
+        with BinaryReader(endianness=Endian.BIG) as br:
+            br_xfbin.write_chunk_table(br)
+
+            with br.view() as table_view:
+                file.write(table_view)
+
+        # Write the pages in order
+        for page in pages:
+            if isinstance(page, memoryview):
+                file.write(page)
+                continue
+
+            offset, size = page
+            spool.seek(offset)
+            copy_file_range(spool, file, size)
+
+
+def copy_file_range(source: BinaryIO, destination: BinaryIO, size: int, buffer_size: int = shutil.COPY_BUFSIZE) -> None:
+    buffer = bytearray(min(size, buffer_size))
+
+    with memoryview(buffer) as view:
+        while size > 0:
+            read = source.readinto(view[:min(size, buffer_size)])
+            if not read:
+                raise EOFError('Unexpected end of the page spool.')
 
-    # Everything will be handled by the BrXfbin
-    br.write_struct(BrXfbin(), xfbin)
+            destination.write(view[:read])
+            size -= read
 
-    return br.buffer()
 
+def write_xfbin_to_path(xfbin: Xfbin, path: str, incremental: bool = False) -> None:
+    # Write to a temporary file first, as the pages that are copied as is could be memory mapped from the same path
+    with open(path + '.tmp', 'wb') as f:
+        write_xfbin_to_file(xfbin, f, incremental)
 
-def write_xfbin_to_path(xfbin: Xfbin, path: str) -> None:
-    file = write_xfbin(xfbin)
-    with open(path, 'wb') as f:
-        f.write(file)
+    os.replace(path + '.tmp', path)